@@ -0,0 +1,128 @@
+import threading
+
+import numpy as np
+
+from plots.radiosonde.line_collections import add_isopleth_collection
+
+# Isopleth points in (T, p) are shared by every diagram and style drawing the same isopleths,
+# while each backdrop is cached per diagram configuration
+_geometry_cache = {}
+_geometry_cache_lock = threading.Lock()
+_backdrop_cache = {}
+_backdrop_cache_lock = threading.Lock()
+
+
+class IsoplethSpec(object):
+    """
+    Describes one styled group of isopleths on a diagram backdrop, e.g. the thin isotherms every 1 degC.
+    The specification is hashable so that it can be used to key the backdrop cache.
+    """
+
+    def __init__(self, points_func, args, levels, kwargs):
+        """
+        :param points_func: function returning the (temperature, pressure) data points of every isopleth
+            in the group as 2-D arrays with one row per level, called as points_func(*args, levels)
+        :type points_func: callable
+        :param args: leading positional arguments of points_func
+        :type args: tuple
+        :param levels: isopleth values to draw
+        :type levels: list-like
+        :param kwargs: line style passed on to matplotlib
+        :type kwargs: dict
+        """
+        self.points_func = points_func
+        self.args = tuple(args)
+        self.levels = tuple(float(level) for level in levels)
+        self.kwargs = dict(kwargs)
+
+    def geometry_key(self):
+        """Identifies the isopleth points regardless of their line style."""
+        return self.points_func, self.args, self.levels
+
+    def _key(self):
+        return self.geometry_key(), tuple(sorted(self.kwargs.items()))
+
+    def __eq__(self, other):
+        return isinstance(other, IsoplethSpec) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+
+class Backdrop(object):
+    """
+    Static isopleth geometry of a diagram, computed once per diagram configuration.
+    The stored arrays are read-only as they are shared by every diagram drawn in the process.
+    """
+
+    def __init__(self, isopleth_specs):
+        """
+        :param isopleth_specs: isopleth groups making up the backdrop
+        :type isopleth_specs: tuple of IsoplethSpec
+        """
+        self.isopleth_specs = tuple(isopleth_specs)
+        self.families = [get_isopleth_geometry(spec) + (spec.kwargs,) for spec in self.isopleth_specs]
+
+    def draw(self, axes, transform):
+        """
+        Adds the cached isopleths to a set of axes as one LineCollection per isopleth group
+        :param axes: axes to draw on
+        :type axes: matplotlib.axes.Axes
+        :param transform: transform from diagram data coordinates to display coordinates
+        :type transform: matplotlib.transforms.Transform
+        :return: the created collections
+        :rtype: list
+        """
+        return [add_isopleth_collection(axes, transform, kwargs, x_points, y_points)
+                for x_points, y_points, kwargs in self.families]
+
+
+def _calculate_isopleth_geometry(spec):
+    x_points, y_points = spec.points_func(*spec.args, np.asarray(spec.levels))
+    x_points = np.array(x_points, dtype=float)
+    y_points = np.array(y_points, dtype=float)
+    x_points.setflags(write=False)
+    y_points.setflags(write=False)
+    return x_points, y_points
+
+
+def get_isopleth_geometry(spec):
+    """
+    Returns the cached data points of an isopleth group, calculating them on first use
+    :param spec: isopleth group
+    :type spec: IsoplethSpec
+    :return: read-only x and y data points, one row per isopleth
+    :rtype: tuple
+    """
+    key = spec.geometry_key()
+    with _geometry_cache_lock:
+        geometry = _geometry_cache.get(key)
+        if geometry is None:
+            geometry = _calculate_isopleth_geometry(spec)
+            _geometry_cache[key] = geometry
+    return geometry
+
+
+def get_backdrop(isopleth_specs):
+    """
+    Returns the cached backdrop for a diagram configuration, building it on first use
+    :param isopleth_specs: isopleth groups making up the backdrop
+    :type isopleth_specs: tuple of IsoplethSpec
+    :return: backdrop geometry
+    :rtype: Backdrop
+    """
+    key = tuple(isopleth_specs)
+    with _backdrop_cache_lock:
+        backdrop = _backdrop_cache.get(key)
+        if backdrop is None:
+            backdrop = Backdrop(key)
+            _backdrop_cache[key] = backdrop
+    return backdrop
+
+
+def clear_backdrop_cache():
+    """Discards all cached backdrops and isopleth points, e.g. after changing the thermodynamic constants."""
+    with _backdrop_cache_lock:
+        _backdrop_cache.clear()
+    with _geometry_cache_lock:
+        _geometry_cache.clear()
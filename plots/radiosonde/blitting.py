@@ -0,0 +1,55 @@
+class BlitManager(object):
+    """
+    Redraws the animated artists of a figure over a cached copy of everything else, e.g. the live profiles
+    of a diagram over its backdrop.
+    The background is captured on every full draw of the canvas, so it follows resizing and zooming, and
+    each update only restores it and draws the animated artists.
+    """
+
+    def __init__(self, canvas):
+        """
+        :param canvas: canvas of the figure, which must support copy_from_bbox, as the Agg based ones do
+        :type canvas: matplotlib.backend_bases.FigureCanvasBase
+        """
+        self.canvas = canvas
+        self._background = None
+        self._artists = []
+        self._draw_event_id = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        # Saved figures already include the animated artists and are drawn on other renderers
+        if event is not None and (event.canvas is not self.canvas or self.canvas.is_saving()):
+            return
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        figure = self.canvas.figure
+        for artist in self._artists:
+            figure.draw_artist(artist)
+
+    def add_artist(self, artist):
+        """
+        Marks an artist as animated and draws it on every update
+        :param artist: artist of the managed figure
+        :type artist: matplotlib.artist.Artist
+        """
+        if artist.figure is not self.canvas.figure:
+            raise ValueError("The artist does not belong to the managed figure")
+        artist.set_animated(True)
+        self._artists.append(artist)
+
+    def update(self):
+        """Redraws the animated artists over the cached background, drawing the whole figure the first time."""
+        if self._background is None:
+            # The draw event captures the background and draws the animated artists
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_animated()
+            self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+    def disconnect(self):
+        """Stops following draws of the canvas."""
+        self.canvas.mpl_disconnect(self._draw_event_id)
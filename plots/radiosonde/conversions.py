@@ -0,0 +1,72 @@
+import numpy as np
+
+from constants.thermodynamics import CONST_KELVIN, CONST_CP_AIR, CONST_P0, CONST_GAS_CONST_AIR, CONST_EPSILON, \
+    CONST_GAS_CONST_VAP, CONST_LATENT_HEAT_VAP_WATER, CONST_ES0
+
+
+def convert_pressure_temperature_to_pressure_theta(pressure, temperature):
+    """
+    Transform pressure and temperature into pressure and potential temperature.
+    :param pressure: pressure in hPa
+    :type pressure: list-like
+    :param temperature: temperature in degC
+    :type temperature: list-like
+    :return: Pressure in hPa, potential temperature in degC
+    :rtype: tuple
+    """
+    pressure, temperature = np.asarray(pressure), np.asarray(temperature)
+
+    temperature_kelvin = temperature + CONST_KELVIN
+
+    theta_kelvin = temperature_kelvin * (CONST_P0 / pressure) ** (CONST_GAS_CONST_AIR / CONST_CP_AIR)
+    theta = theta_kelvin - CONST_KELVIN
+    return pressure, theta
+
+
+def convert_temperature_theta_to_temperature_pressure(temperature, theta):
+    """
+    Transform temperature and potential temperature into temperature and pressure
+    :param temperature: temperature in degC
+    :type temperature: list-like
+    :param theta: potential temperature in degC
+    :type theta: list-like
+    :return: Pressure in hPa, potential temperature in degC
+    :rtype: tuple
+    """
+    temperature, theta = np.asarray(temperature), np.asarray(theta)
+
+    temperature_kelvin = temperature + CONST_KELVIN
+    theta_kelvin = theta + CONST_KELVIN
+
+    pressure = CONST_P0 * (temperature_kelvin / theta_kelvin) ** (CONST_CP_AIR / CONST_GAS_CONST_AIR)
+    return temperature, pressure
+
+
+def convert_pressure_theta_to_temperature_theta(pressure, theta):
+    """
+    Transform pressure and potential temperature into pressure and temperature.
+    :param pressure: pressure in hPa
+    :type pressure: list-like
+    :param theta: potential temperature in degC
+    :type theta: list-like
+    :return: Pressure in hPa, temperature in degC
+    :rtype: tuple
+    """
+    pressure, theta = np.asarray(pressure), np.asarray(theta)
+
+    theta_kelvin = theta + CONST_KELVIN
+
+    temperature_kelvin = theta_kelvin * (CONST_P0 / pressure) ** (-CONST_GAS_CONST_AIR / CONST_CP_AIR)
+    temperature = temperature_kelvin - CONST_KELVIN
+    return temperature, theta
+
+
+def convert_pressure_mixing_ratio_to_temperature(pressure, mixing_ratio):
+    mixing_ratio_unitless = mixing_ratio / 1000
+    es = (mixing_ratio_unitless * pressure) / (mixing_ratio_unitless + CONST_EPSILON)
+    temperature_kelvin = 1.0 / (
+            (1.0 / CONST_KELVIN) - CONST_GAS_CONST_VAP / CONST_LATENT_HEAT_VAP_WATER * np.log(es / CONST_ES0))
+
+    temperature = temperature_kelvin - CONST_KELVIN
+
+    return temperature
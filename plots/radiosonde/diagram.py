@@ -0,0 +1,550 @@
+import functools
+
+import numpy as np
+
+import matplotlib.pyplot as plt
+from scipy.interpolate import interp1d
+import plots.radiosonde.isopleths as isopleths
+import plots.radiosonde.labels as labels
+from plots.radiosonde.backdrop import IsoplethSpec, get_backdrop
+from plots.radiosonde.blitting import BlitManager
+from plots.radiosonde.export import DEFAULT_EXPORT_FORMATS, export_figure
+from radiosonde.prune import decimate_profile
+from radiosonde.stations import STATION_LOOKUP_FILEPATH, get_station_name
+
+ISOPLETH_COLOR = "#23CE1F"
+MIXING_RATIO_LEVELS = np.array([0.10, 0.15, 0.20, 0.30, 0.40, 0.50, 0.60, 0.80, 1, 1.5, 2, 2.5, 3, 4, 5, 6, 7, 8, 9,
+                                10, 12, 14, 16, 18, 20, 24, 28, 32, 36, 40, 44, 48, 52, 56, 60, 68, 80])
+
+
+def standard_isopleths(moist_adiabat_linewidth=0.08, mixing_ratio_min_temperature=-50):
+    """
+    Builds the isopleth groups drawn on the backdrop of every diagram.
+    The points are in temperature and pressure, so groups with the same levels are calculated once
+    and shared by every diagram type.
+    :param moist_adiabat_linewidth: line width of the moist adiabats every 2 degC
+    :type moist_adiabat_linewidth: float
+    :param mixing_ratio_min_temperature: temperature in degC below which mixing ratio lines are not drawn
+    :type mixing_ratio_min_temperature: float
+    :return: isopleth groups
+    :rtype: tuple of IsoplethSpec
+    """
+    return (
+        # Isotherms
+        IsoplethSpec(isopleths.isotherm_family, (50, 1050), np.arange(-90, 70, 1),
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.08}),
+        IsoplethSpec(isopleths.isotherm_family, (50, 1050), np.arange(-90, 70, 10),
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.30}),
+        # Isentropes
+        IsoplethSpec(isopleths.isentrope_family, (-90, 70, 50, 1050), np.arange(-90, 250, 10),
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.08}),
+        # Isobars
+        IsoplethSpec(isopleths.isobar_family, (-90, 70), np.arange(50, 1051, 10),
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.08}),
+        IsoplethSpec(isopleths.isobar_family, (-90, 70), np.arange(100, 1051, 100),
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.30}),
+        # Moist adiabats
+        IsoplethSpec(isopleths.moist_adiabat_family, (-50, 1050, 1000), np.arange(-40, 70, 10),
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.30}),
+        IsoplethSpec(isopleths.moist_adiabat_family, (-50, 1050, 1000), np.arange(-40, 70, 2),
+                     {"color": ISOPLETH_COLOR, "linewidth": moist_adiabat_linewidth}),
+        # Mixing ratios
+        IsoplethSpec(isopleths.mixing_ratio_family, (mixing_ratio_min_temperature, 50, 1050), MIXING_RATIO_LEVELS,
+                     {"color": ISOPLETH_COLOR, "linewidth": 0.25, "linestyle": "--"}),
+    )
+
+
+class LabelSpec(object):
+    """Describes one group of isopleth labels, e.g. the isotherm labels along the 1000 hPa isobar."""
+
+    def __init__(self, label_func, args, levels, text_kwargs=None):
+        """
+        :param label_func: function from plots.radiosonde.labels drawing one label,
+            called as label_func(*args, axes, transform, level, **text_kwargs)
+        :type label_func: callable
+        :param args: leading positional arguments of label_func
+        :type args: tuple
+        :param levels: isopleth values to label
+        :type levels: list-like
+        :param text_kwargs: text style overriding the defaults of label_func
+        :type text_kwargs: dict
+        """
+        self.label_func = label_func
+        self.args = tuple(args)
+        self.levels = levels
+        self.text_kwargs = {} if text_kwargs is None else dict(text_kwargs)
+
+    def draw(self, axes, transform):
+        return [self.label_func(*self.args, axes, transform, level, **self.text_kwargs) for level in self.levels]
+
+
+# Isopleths and labels shared by the diagrams with the same layout. The isopleths are static, so each group is
+# calculated once and reused by every diagram through the backdrop cache.
+# Tephigram and skew-T log-p diagram
+STANDARD_ISOPLETHS = standard_isopleths()
+
+STANDARD_LABELS = (
+    # Isotherm Labels
+    LabelSpec(labels.isotherm_label, (1000,), np.arange(-40, 70, 10)),
+    LabelSpec(labels.isotherm_label, (190,), np.arange(-80, 0, 10)),
+    # Isentrope Labels
+    LabelSpec(labels.isentrope_label, (-45,), np.arange(-40, 220, 20)),
+    # Isobar Labels
+    LabelSpec(labels.isobar_label, ('isotherm', -90), np.array([50, 60, 70, 80, 90, 100, 150, 200])),
+    LabelSpec(labels.isobar_label, ('isentrope', 0), np.array([300])),
+    LabelSpec(labels.isobar_label, ('isentrope', -10), np.arange(400, 1050, 100)),
+    # Mixing Ratio Labels
+    LabelSpec(labels.mixing_ratio_label, (1054, 'right'), MIXING_RATIO_LEVELS),
+    LabelSpec(labels.mixing_ratio_label, (496, 'left'), MIXING_RATIO_LEVELS),
+)
+
+# Stuve diagram and emagram, whose horizontal axis is temperature
+TEMPERATURE_AXIS_ISOPLETHS = standard_isopleths(moist_adiabat_linewidth=0.12, mixing_ratio_min_temperature=-70)
+
+TEMPERATURE_AXIS_LABELS = (
+    # Isotherm Labels
+    LabelSpec(labels.isotherm_label, (990,), np.arange(-80, 60, 10), {"fontsize": 6}),
+    # Isobar Labels
+    LabelSpec(labels.isobar_label, ('isotherm', -61), np.arange(100, 1050, 100), {"fontsize": 6.5}),
+    # Mixing Ratio Labels
+    LabelSpec(labels.mixing_ratio_label, (1070, 'left'), MIXING_RATIO_LEVELS, {"fontsize": 4, "rotation": 300}),
+    LabelSpec(labels.mixing_ratio_label, (49.5, 'right'), MIXING_RATIO_LEVELS, {"fontsize": 4, "rotation": 300}),
+)
+
+
+class ThermodynamicDiagram(object):
+    """
+    Generates a thermodynamic diagram of one or more pressure and temperature datasets.
+    Everything on the diagram is plotted in temperature and pressure, and a diagram type only supplies
+    the transform from (T, p) to its plotting grid together with its backdrop, labels and layout.
+    """
+
+    # Transform class from temperature in degC and pressure in hPa to x,y plotting grid coordinates
+    transform_class = None
+    # Name the transform is also stored under on the diagram and its axes, e.g. 'skewt' for axes.skewt_transform
+    transform_alias = None
+    isopleth_specs = ()
+    label_specs = ()
+    aspect = 1.0
+    xlim = None
+    ylim = None
+    # Default horizontal position of wind barbs, as a fraction of the axes width
+    barb_gutter = 0.95
+    title_kwargs = dict(xy=(0.02, 0.92), fontsize=20)
+    # Whether Dorset titles and file names include the launch location
+    dorset_location = False
+
+    def __init__(self, figure=None):
+        """
+        :param figure: existing figure to clear and draw on, e.g. one reused for a batch of diagrams,
+            or None for a new figure
+        :type figure: matplotlib.figure.Figure
+        """
+        if figure is None:
+            self.figure = plt.figure(figsize=(7.8565, 11.1055))
+        else:
+            figure.clear()
+            figure.set_size_inches(7.8565, 11.1055)
+            self.figure = figure
+
+        # Diagram transformation
+        self.diagram_transform = self.transform_class()
+
+        # Intialise subplot
+        self.axes = self.figure.add_subplot()
+        self.axes.axis('off')
+        self.axes.set_axis_off()
+
+        # No borders
+        self.figure.subplots_adjust(left=0, bottom=0, right=1.0, top=1.0, wspace=None, hspace=None)
+
+        # Drawing
+        self.transform = self.diagram_transform + self.axes.transData
+        self.axes.diagram_transform = self.diagram_transform
+        self.axes.diagram_inverse = self.diagram_transform.inverted()
+        if self.transform_alias is not None:
+            setattr(self, f"{self.transform_alias}_transform", self.diagram_transform)
+            setattr(self.axes, f"{self.transform_alias}_transform", self.diagram_transform)
+            setattr(self.axes, f"{self.transform_alias}_inverse", self.axes.diagram_inverse)
+
+        # Draw isopleths from the cached backdrop geometry
+        get_backdrop(self.isopleth_specs).draw(self.axes, self.transform)
+
+        # Isopleth labels
+        for label_spec in self.label_specs:
+            label_spec.draw(self.axes, self.transform)
+
+        # Retain aspect ratio
+        self.axes.set_aspect(self.aspect)
+
+        # Limits
+        self.axes.set_xlim(*self.xlim)
+        self.axes.set_ylim(*self.ylim)
+
+        # Initialise blank profile lists
+        self._profiles = []
+        self.axes.tephigram_profiles = self._profiles
+        # Blit manager of the live profiles and barbs, created with the first of them
+        self._live_artists = None
+
+    def plot_profile(self, pressures, temperatures, **kwargs):
+        profile = Profile(pressures, temperatures, self.axes)
+        profile.plot(**kwargs)
+        self._profiles.append(profile)
+        return profile
+
+    def plot_barbs(self, pressures, wind_speeds, wind_directions, **kwargs):
+        barbs = Barbs(pressures, wind_speeds, wind_directions, self.axes)
+        kwargs.setdefault("gutter", self.barb_gutter)
+        barbs.plot(**kwargs)
+        return barbs
+
+    def _blit_manager(self):
+        if self._live_artists is None:
+            self._live_artists = BlitManager(self.figure.canvas)
+        return self._live_artists
+
+    def plot_live_profile(self, capacity=4096, **kwargs):
+        """
+        Starts a profile that grows as levels arrive during an ascent, through Profile.append.
+        The line is redrawn by refresh_live() over a cached copy of the rest of the diagram.
+        :param capacity: number of levels to allocate room for, the buffer grows beyond it as needed
+        :type capacity: int
+        :return: the empty profile
+        :rtype: Profile
+        """
+        profile = Profile([], [], self.axes, capacity=capacity)
+        profile.plot(**kwargs)
+        self._profiles.append(profile)
+        self._blit_manager().add_artist(profile.line)
+        return profile
+
+    def plot_live_barbs(self, **kwargs):
+        """
+        Starts a column of wind barbs that is replaced as levels arrive, through Barbs.update.
+        The barbs are redrawn by refresh_live() over a cached copy of the rest of the diagram.
+        :return: the empty column
+        :rtype: Barbs
+        """
+        barbs = self.plot_barbs([], [], [], **kwargs)
+        self._blit_manager().add_artist(barbs.barbs)
+        return barbs
+
+    def refresh_live(self):
+        """Redraws the live profiles and barbs after new levels have been added, drawing everything the first time."""
+        if self._live_artists is not None:
+            self._live_artists.update()
+
+    def plot_main_title(self, metadata, **kwargs):
+        title = Title(metadata, self.axes)
+        title.plot_main_title(**dict(self.title_kwargs, **kwargs))
+
+    def plot_dorset_title(self, metadata):
+        title = DorsetTitle(metadata, self.axes, include_location=self.dorset_location)
+        title.plot_main_title()
+
+    def read_metadata(self, metadata,
+                      sonde_lookup_filepath=STATION_LOOKUP_FILEPATH):
+        self.station_id = f"{metadata.loc['WMO_BLCK_NMBR', 'info']:02.0f}" \
+                          f"{metadata.loc['WMO_STTN_NMBR', 'info']:03.0f}"
+        self.year = f"{metadata.loc['YEAR', 'info']:.0f}"
+        self.month = f"{metadata.loc['MONTH', 'info']:02.0f}"
+        self.day = f"{metadata.loc['DAY', 'info']:02.0f}"
+        self.hour = f"{metadata.loc['HOUR', 'info']:02.0f}"
+        self.minute = f"{metadata.loc['MINT', 'info']:02.0f}"
+        station_name = get_station_name(self.station_id, sonde_lookup_filepath)
+        if station_name is not None:
+            self.station_name = station_name
+
+    def read_metadata_dorset(self, metadata):
+        self.station_id = metadata.loc['LOCATION', 'info'] if self.dorset_location else None
+        self.year = f"{metadata.loc['YEAR', 'info']:.0f}"
+        self.month = f"{metadata.loc['MONTH', 'info']:02.0f}"
+        self.day = f"{metadata.loc['DAY', 'info']:02.0f}"
+        self.hour = f"{metadata.loc['HOUR', 'info']:02.0f}"
+        self.minute = f"{metadata.loc['MINT', 'info']:02.0f}"
+
+    def save_tephi(self, output_dir, full_name=None, formats=DEFAULT_EXPORT_FORMATS, pgf=False):
+        """
+        Saves the diagram, named after the station and observation time unless a name is given
+        :param output_dir: directory to save to
+        :type output_dir: str
+        :param full_name: file name without the extension
+        :type full_name: str
+        :param formats: (format, DPI) of each output, with a DPI of None for vector formats
+        :type formats: list of tuple
+        :param pgf: typeset PDF output with LaTeX through the pgf backend
+        :type pgf: bool
+        :return: time in seconds taken by each output, keyed by its path
+        :rtype: dict
+        """
+        if full_name is None:
+            full_name = f"{self.station_name}_{self.station_id}_" \
+                        f"{self.year}{self.month}{self.day}{self.hour}{self.minute}Z"
+        return export_figure(self.figure, f"{output_dir}/{full_name}", formats=formats, pgf=pgf)
+
+    def save_tephi_manual(self, output_path, **kwargs):
+        self.figure.savefig(output_path, bbox_inches='tight', pad_inches=0, **kwargs)
+
+
+class Title:
+    """Generate a title for the diagram"""
+
+    def __init__(self, metadata, axes,
+                 sonde_lookup_filepath=STATION_LOOKUP_FILEPATH):
+        self.axes = axes
+        self.station_id = f"{metadata.loc['WMO_BLCK_NMBR', 'info']:02.0f}" \
+                          f"{metadata.loc['WMO_STTN_NMBR', 'info']:03.0f}"
+        self.year = f"{metadata.loc['YEAR', 'info']:.0f}"
+        self.month = f"{metadata.loc['MONTH', 'info']:02.0f}"
+        self.day = f"{metadata.loc['DAY', 'info']:02.0f}"
+        self.hour = f"{metadata.loc['HOUR', 'info']:02.0f}"
+        self.minute = f"{metadata.loc['MINT', 'info']:02.0f}"
+        station_name = get_station_name(self.station_id, sonde_lookup_filepath)
+        if station_name is not None:
+            self.station_name = station_name
+            self.plot_title = f"{self.station_name} {self.station_id}\n" \
+                              f"{self.year}-{self.month}-{self.day} {self.hour}{self.minute}Z"
+        else:
+            self.plot_title = f"{self.station_id} " \
+                              f"{self.year}-{self.month}-{self.day} {self.hour}{self.minute}Z"
+
+    def plot_main_title(self, **kwargs):
+        kwargs = dict(dict(xy=(0.02, 0.92), fontsize=20), **kwargs)
+        self.axes.annotate(self.plot_title, xytext=(0, 0), xycoords='axes fraction',
+                           textcoords='offset points', **kwargs)
+
+
+class DorsetTitle(object):
+
+    def __init__(self, metadata, axes, include_location=True):
+        self.axes = axes
+        self.year = f"{metadata.loc['YEAR', 'info']:.0f}"
+        self.month = f"{metadata.loc['MONTH', 'info']:02.0f}"
+        self.day = f"{metadata.loc['DAY', 'info']:02.0f}"
+        self.hour = f"{metadata.loc['HOUR', 'info']:02.0f}"
+        self.minute = f"{metadata.loc['MINT', 'info']:02.0f}"
+        self.plot_title = f"{self.year}-{self.month}-{self.day} {self.hour}{self.minute}Z"
+        if include_location:
+            self.station_id = metadata.loc['LOCATION', 'info']
+            self.plot_title = f"{self.station_id}\n{self.plot_title}"
+
+    def plot_main_title(self, **kwargs):
+        kwargs = dict(dict(xy=(0.02, 0.92), fontsize=20), **kwargs)
+        self.axes.annotate(self.plot_title, xytext=(0, 0), xycoords='axes fraction',
+                           textcoords='offset points', **kwargs)
+
+
+class Profile:
+    """
+    Generate a temperature profile on a diagram.
+    The levels are held in a preallocated buffer that grows as levels are appended, e.g. from a sonde
+    that is still ascending, and the drawn line is updated in place.
+    """
+
+    def __init__(self, pressures, temperatures, axes, capacity=0):
+        """
+        :param pressures: pressures in hPa
+        :type pressures: list-like
+        :param temperatures: temperatures in degC
+        :type temperatures: list-like
+        :param axes: axes of the diagram
+        :type axes: matplotlib.axes.Axes
+        :param capacity: number of levels to allocate room for, e.g. the expected length of an ascent
+        :type capacity: int
+        """
+        pressures, temperatures = np.asarray(pressures, dtype=float), np.asarray(temperatures, dtype=float)
+        assert pressures.shape == temperatures.shape
+        self.axes = axes
+        self._transform = self.axes.diagram_transform + self.axes.transData
+        self._levels = np.empty((max(capacity, pressures.size), 2))
+        self._size = 0
+        self._decimation = None
+        # Levels drawn when the profile is decimated
+        self._decimated_levels = None
+        self.line = None
+        self._extend(pressures.ravel(), temperatures.ravel())
+
+    def _extend(self, pressures, temperatures):
+        size = self._size + pressures.size
+        if size > self._levels.shape[0]:
+            # Grow geometrically so that appending one level at a time stays cheap
+            levels = np.empty((max(size, 2 * self._levels.shape[0], 64), 2))
+            levels[:self._size] = self._levels[:self._size]
+            self._levels = levels
+        self._levels[self._size:size, 0] = temperatures
+        self._levels[self._size:size, 1] = pressures
+        self._size = size
+        self.temperatures = self._levels[:size, 0]
+        self.pressures = self._levels[:size, 1]
+
+    def _decimate(self, anchor=0):
+        # The levels kept before the anchor are final, so only the levels from it onward are decimated again
+        levels = decimate_profile(self.pressures[anchor:], self.temperatures[anchor:], *self._decimation) + anchor
+        self._decimated_levels = np.concatenate((self._decimated_levels[self._decimated_levels < anchor], levels))
+
+    def _line_data(self):
+        pressures, temperatures = self.pressures, self.temperatures
+        if self._decimation is not None:
+            pressures, temperatures = pressures[self._decimated_levels], temperatures[self._decimated_levels]
+        return temperatures, pressures
+
+    def plot(self, decimate=False, temperature_tolerance=0.1, pressure_tolerance=0.002, **kwargs):
+        """
+        Draws the profile
+        :param decimate: draw only the levels needed to keep the line within the tolerances,
+            which shrinks the drawing of 1-2 Hz soundings with no visible change
+        :type decimate: bool
+        :param temperature_tolerance: largest temperature difference in degC between a dropped level and the line
+        :type temperature_tolerance: float
+        :param pressure_tolerance: largest pressure difference between a dropped level and the line,
+            as a fraction of the pressure of the level
+        :type pressure_tolerance: float
+        :return: the line
+        :rtype: matplotlib.lines.Line2D
+        """
+        if "zorder" not in kwargs:
+            kwargs["zorder"] = 10
+
+        self._decimation = (temperature_tolerance, pressure_tolerance) if decimate else None
+        if decimate:
+            self._decimated_levels = np.empty(0, dtype=np.intp)
+            self._decimate()
+        (self.line,) = self.axes.plot(
+            *self._line_data(), transform=self._transform, **kwargs
+        )
+        return self.line
+
+    def append(self, pressures, temperatures):
+        """
+        Adds levels to the end of the profile and updates the drawn line in place.
+        A decimated profile is only decimated again from the last level kept before the previous end,
+        so each append costs about the number of levels since that level rather than the whole profile
+        :param pressures: pressures in hPa, a single level or several
+        :type pressures: float or list-like
+        :param temperatures: temperatures in degC
+        :type temperatures: float or list-like
+        :return: the line, or None if the profile has not been drawn
+        :rtype: matplotlib.lines.Line2D
+        """
+        pressures = np.asarray(pressures, dtype=float).ravel()
+        temperatures = np.asarray(temperatures, dtype=float).ravel()
+        assert pressures.shape == temperatures.shape
+        self._extend(pressures, temperatures)
+        if self._decimation is not None:
+            kept = self._decimated_levels
+            self._decimate(kept[-2] if kept.size >= 2 else 0)
+        if self.line is not None:
+            self.line.set_data(*self._line_data())
+        return self.line
+
+
+@functools.lru_cache(maxsize=64)
+def _sampled_gutter(transform_class, gutter, x_limits, y_limits):
+    """
+    Samples the temperature along a vertical line of a diagram without a closed form for it, once per
+    diagram type, gutter and limits, returning an interpolator from pressure to temperature.
+    """
+    axesfrac_y_points = np.linspace(0, 1, 1001)
+    axesfrac_x_points = np.ones_like(axesfrac_y_points) * gutter
+    data_xy = np.column_stack((x_limits[0] + axesfrac_x_points * (x_limits[1] - x_limits[0]),
+                               y_limits[0] + axesfrac_y_points * (y_limits[1] - y_limits[0])))
+    temperature_pressure_points = transform_class().inverted().transform(data_xy)
+    temperature, pressure = temperature_pressure_points[:, 0], temperature_pressure_points[:, 1]
+    return interp1d(pressure, temperature, fill_value="extrapolate")
+
+
+class Barbs:
+    """
+    Generate one column of wind barbs on a diagram.
+    The barbs are drawn as a single matplotlib Barbs artist on the diagram's own axes, positioned in x,y grid
+    coordinates that are transformed once, so redrawing only applies the affine data transform.
+    """
+
+    def __init__(self, pressures, wind_speeds, wind_directions, axes):
+        self.axes = axes
+        self.pressures = pressures
+        self.wind_speeds = wind_speeds
+        self.wind_directions = wind_directions
+        self.barbs = None
+        self._gutter = None
+        self._u = None
+        self._v = None
+        self._kwargs = None
+        self._custom_kwargs = None
+        self._custom = dict(
+            color=["barbcolor", "color", "edgecolor", "facecolor"],
+            linewidth=["lw", "linewidth"],
+            linestyle=["ls", "linestyle"],
+        )
+
+    def _uv(self, magnitude, angle):
+        angle = np.deg2rad(angle)
+        u = magnitude * np.sin(angle)
+        v = magnitude * np.cos(angle)
+        return u, v
+
+    def _set_data(self, pressures, wind_speeds, wind_directions):
+        if hasattr(pressures, "__next__"):
+            pressures = list(pressures)
+        if hasattr(wind_speeds, "__next__"):
+            wind_speeds = list(wind_speeds)
+        if hasattr(wind_directions, "__next__"):
+            wind_directions = list(wind_directions)
+        self.pressures, self.wind_speeds, self.wind_directions = \
+            np.asarray(pressures), np.asarray(wind_speeds), np.asarray(wind_directions)
+        self._u, self._v = self._uv(self.wind_speeds, self.wind_directions)
+
+    def _grid_positions(self):
+        temperatures, pressures = self._calculate_barb_positions(self.pressures)
+        return self.axes.diagram_transform.transform(np.column_stack((temperatures, pressures)).astype(float))
+
+    def _make_barb(self, x_coords, y_coords, u, v):
+        barb = self.axes.barbs(x_coords, y_coords, u, v, transform=self.axes.transData, **self._kwargs)
+        return barb
+
+    def _calculate_barb_positions(self, pressures):
+        x_limits = tuple(self.axes.viewLim.intervalx)
+        temperature_at_x = getattr(self.axes.diagram_transform, "temperature_at_x", None)
+        if temperature_at_x is not None:
+            gutter_x = x_limits[0] + self._gutter * (x_limits[1] - x_limits[0])
+            temperatures = temperature_at_x(gutter_x, pressures)
+        else:
+            interp_func = _sampled_gutter(type(self.axes.diagram_transform), self._gutter, x_limits,
+                                          tuple(self.axes.viewLim.intervaly))
+            temperatures = interp_func(pressures)
+
+        return temperatures, pressures
+
+    def plot(self, **kwargs):
+        self._gutter = kwargs.pop("gutter", 0.95)
+        self._kwargs = dict(length=5, linewidth=0.2, zorder=10)
+        self._kwargs.update(kwargs)
+        self._custom_kwargs = dict(
+            color=None, linewidth=1.0, zorder=self._kwargs["zorder"]
+        )
+        self._set_data(self.pressures, self.wind_speeds, self.wind_directions)
+
+        grid_xy = self._grid_positions()
+        self.barbs = self._make_barb(grid_xy[:, 0], grid_xy[:, 1], self._u, self._v)
+        return self.barbs
+
+    def update(self, pressures, wind_speeds, wind_directions):
+        """
+        Replaces the winds of the column in place, keeping the existing artist and its style,
+        e.g. as new levels arrive during an ascent. The number of barbs may change.
+        :param pressures: pressures in hPa
+        :type pressures: list-like
+        :param wind_speeds: wind speeds in knots
+        :type wind_speeds: list-like
+        :param wind_directions: directions the wind blows towards in degrees
+        :type wind_directions: list-like
+        :return: the updated artist
+        :rtype: matplotlib.quiver.Barbs
+        """
+        self._set_data(pressures, wind_speeds, wind_directions)
+        grid_xy = self._grid_positions()
+        # Barbs masks its offsets by the winds, so the positions are set before the winds that match them
+        self.barbs.x, self.barbs.y = grid_xy[:, 0], grid_xy[:, 1]
+        self.barbs.set_UVC(self._u, self._v)
+        return self.barbs
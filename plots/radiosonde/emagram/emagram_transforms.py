@@ -1,76 +1,10 @@
 import numpy as np
 from matplotlib.transforms import Transform
 
-from constants.thermodynamics import CONST_KELVIN, CONST_TO, CONST_CP_AIR, CONST_P0, CONST_GAS_CONST_AIR, \
-    CONST_EPSILON, CONST_GAS_CONST_VAP, CONST_LATENT_HEAT_VAP_WATER, CONST_ES0
-
-
-# def convert_pressure_temperature_to_pressure_theta(pressure, temperature):
-#     """
-#     Transform pressure and temperature into pressure and potential temperature.
-#     :param pressure: pressure in hPa
-#     :type pressure: list-like
-#     :param temperature: temperature in degC
-#     :type temperature: list-like
-#     :return: Pressure in hPa, potential temperature in degC
-#     :rtype: tuple
-#     """
-#     pressure, temperature = np.asarray(pressure), np.asarray(temperature)
-#
-#     temperature_kelvin = temperature + CONST_KELVIN
-#
-#     theta_kelvin = temperature_kelvin * (CONST_P0 / pressure) ** (CONST_GAS_CONST_AIR / CONST_CP_AIR)
-#     theta = theta_kelvin - CONST_KELVIN
-#     return pressure, theta
-#
-
-def convert_temperature_theta_to_temperature_pressure(temperature, theta):
-    """
-    Transform temperature and potential temperature into temperature and pressure
-    :param temperature: temperature in degC
-    :type temperature: list-like
-    :param theta: potential temperature in degC
-    :type theta: list-like
-    :return: Pressure in hPa, potential temperature in degC
-    :rtype: tuple
-    """
-    temperature, theta = np.asarray(temperature), np.asarray(theta)
-
-    temperature_kelvin = temperature + CONST_KELVIN
-    theta_kelvin = theta + CONST_KELVIN
-
-    pressure = CONST_P0 * (temperature_kelvin / theta_kelvin) ** (CONST_CP_AIR / CONST_GAS_CONST_AIR)
-    return temperature, pressure
-
-
-def convert_pressure_theta_to_temperature_theta(pressure, theta):
-    """
-    Transform pressure and potential temperature into pressure and temperature.
-    :param pressure: pressure in hPa
-    :type pressure: list-like
-    :param theta: potential temperature in degC
-    :type theta: list-like
-    :return: Pressure in hPa, temperature in degC
-    :rtype: tuple
-    """
-    pressure, theta = np.asarray(pressure), np.asarray(theta)
-
-    theta_kelvin = theta + CONST_KELVIN
-
-    temperature_kelvin = theta_kelvin * (CONST_P0 / pressure) ** (-CONST_GAS_CONST_AIR / CONST_CP_AIR)
-    temperature = temperature_kelvin - CONST_KELVIN
-    return temperature, theta
-
-
-def convert_pressure_mixing_ratio_to_temperature(pressure, mixing_ratio):
-    mixing_ratio_unitless = mixing_ratio / 1000
-    es = (mixing_ratio_unitless * pressure) / (mixing_ratio_unitless + CONST_EPSILON)
-    temperature_kelvin = 1.0 / (
-            (1.0 / CONST_KELVIN) - CONST_GAS_CONST_VAP / CONST_LATENT_HEAT_VAP_WATER * np.log(es / CONST_ES0))
-
-    temperature = temperature_kelvin - CONST_KELVIN
-
-    return temperature
+from constants.thermodynamics import CONST_P0
+from plots.radiosonde.conversions import convert_pressure_temperature_to_pressure_theta, \
+    convert_temperature_theta_to_temperature_pressure, convert_pressure_theta_to_temperature_theta, \
+    convert_pressure_mixing_ratio_to_temperature
 
 
 def convert_temperature_pressure_to_xy(temperature, pressure):
@@ -116,6 +50,21 @@ def convert_xy_to_temperature_pressure(x_coords, y_coords):
     return temperature, pressure
 
 
+def convert_x_pressure_to_temperature(x_coords, pressure):
+    """
+    Finds the temperature at which an isobar reaches an x grid coordinate, which is the temperature itself
+    :param x_coords: x coordinates on grid
+    :type x_coords: list-like
+    :param pressure: pressure in hPa
+    :type pressure: list-like
+    :return: temperature in degC
+    :rtype: list-like
+    """
+    x_coords, pressure = np.broadcast_arrays(x_coords, pressure)
+
+    return x_coords.astype(float)
+
+
 class EmagramTransform(Transform):
     """Inherits matplotlib.transforms.Transform as a custom transformation class to convert
     temperature and potential temperature to x,y plotting grid coordinates"""
@@ -132,6 +81,10 @@ class EmagramTransform(Transform):
     def inverted(self):
         return EmagramTransformInverse()
 
+    def temperature_at_x(self, x_coords, pressures):
+        """Closed-form temperatures at which isobars reach x grid coordinates, e.g. to place wind barbs."""
+        return convert_x_pressure_to_temperature(x_coords, pressures)
+
 
 class EmagramTransformInverse(Transform):
     """Inverse transformation of TephigramTransform class"""
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import matplotlib as mpl
+from matplotlib.backends.backend_agg import RendererAgg
+
+# Outputs of save_tephi: format and DPI, None for vector formats
+DEFAULT_EXPORT_FORMATS = (('pdf', None), ('png', 300))
+VECTOR_FORMATS = ('pdf', 'svg', 'eps', 'ps')
+
+
+def tight_bbox(figure, dpi, pad_inches=0):
+    """
+    Calculates the tight bounding box of a figure once, as savefig does for bbox_inches='tight'
+    :param figure: figure to export
+    :type figure: matplotlib.figure.Figure
+    :param dpi: resolution the text is measured at, that of the raster outputs
+    :type dpi: float
+    :param pad_inches: padding around the box
+    :type pad_inches: float
+    :return: bounding box in inches
+    :rtype: matplotlib.transforms.Bbox
+    """
+    original_dpi = figure.dpi
+    try:
+        figure.dpi = dpi
+        renderer = RendererAgg(figure.bbox.width, figure.bbox.height, dpi)
+        return figure.get_tightbbox(renderer).padded(pad_inches)
+    finally:
+        figure.dpi = original_dpi
+
+
+class _RendererBuffer:
+    """File-like target for the rgba format, which the Agg canvas writes its renderer's buffer to in one call."""
+
+    def __init__(self):
+        self.pixels = None
+
+    def seek(self, offset, whence=0):
+        return 0
+
+    def write(self, data):
+        # The renderer's buffer is shaped (height, width, 4), so its size is taken as the renderer drew it
+        self.pixels = np.array(data, dtype=np.uint8)
+        return self.pixels.nbytes
+
+
+def _render_rgba(figure, dpi, bbox_inches):
+    """Draws a figure once into an RGBA pixel array."""
+    buffer = _RendererBuffer()
+    figure.savefig(buffer, format='rgba', dpi=dpi, bbox_inches=bbox_inches, pad_inches=0)
+    if buffer.pixels is None or buffer.pixels.ndim != 3:
+        raise ValueError("The renderer did not return an image")
+    return buffer.pixels
+
+
+def export_figure(figure, output_stem, formats=DEFAULT_EXPORT_FORMATS, pgf=False, pad_inches=0):
+    """
+    Saves a figure in several formats, cropped to the figure's tight bounding box.
+    The bounding box is calculated once for every output, each raster resolution is drawn once and
+    encoded to all the raster formats at that resolution, and vector formats use matplotlib's own
+    backends unless PGF output is requested.
+    :param figure: figure to export
+    :type figure: matplotlib.figure.Figure
+    :param output_stem: output path without the extension, to which the DPI is added as '_{dpi}dpi' for a format
+        listed at more than one DPI
+    :type output_stem: str
+    :param formats: (format, DPI) of each output, with a DPI of None for vector formats
+    :type formats: list of tuple
+    :param pgf: typeset PDF output with LaTeX through the pgf backend, which is much slower
+    :type pgf: bool
+    :param pad_inches: padding around the tight bounding box
+    :type pad_inches: float
+    :return: time in seconds taken by each output, keyed by its path
+    :rtype: dict
+    """
+    formats = [tuple(output) for output in formats]
+    if len(set(formats)) != len(formats):
+        raise ValueError(f"Each (format, DPI) can only be exported once, got {formats}")
+    repeated_formats = {fmt for fmt, _ in formats if sum(other == fmt for other, _ in formats) > 1}
+
+    raster_dpis = [dpi for fmt, dpi in formats if fmt not in VECTOR_FORMATS]
+    start = time.perf_counter()
+    bbox_inches = tight_bbox(figure, max(raster_dpis, default=figure.dpi), pad_inches)
+    layout_seconds = time.perf_counter() - start
+
+    timings = {}
+    rendered = {}
+    for fmt, dpi in formats:
+        if fmt in repeated_formats:
+            output_path = f"{output_stem}_{dpi}dpi.{fmt}"
+        else:
+            output_path = f"{output_stem}.{fmt}"
+        start = time.perf_counter()
+        if fmt == 'pdf' and pgf:
+            # LaTeX measures the text itself, so the pgf backend finds its own bounding box
+            figure.savefig(output_path, bbox_inches='tight', pad_inches=pad_inches, backend='pgf')
+        elif fmt in VECTOR_FORMATS:
+            figure.savefig(output_path, format=fmt, dpi=dpi, bbox_inches=bbox_inches, pad_inches=0)
+        else:
+            if dpi not in rendered:
+                rendered[dpi] = _render_rgba(figure, dpi, bbox_inches)
+            mpl.image.imsave(output_path, rendered[dpi], format=fmt, origin='upper', dpi=dpi)
+        timings[output_path] = time.perf_counter() - start
+    # The shared layout is charged to the first output
+    if timings:
+        timings[next(iter(timings))] += layout_seconds
+    return timings
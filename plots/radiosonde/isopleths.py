@@ -0,0 +1,178 @@
+import numpy as np
+
+from plots.radiosonde.conversions import convert_pressure_theta_to_temperature_theta, \
+    convert_temperature_theta_to_temperature_pressure, convert_pressure_mixing_ratio_to_temperature
+from radiosonde.calc_moist_adiabat import clip_moist_adiabats
+from radiosonde.moist_adiabat_table import TABLE_MIN_PRESSURE, get_moist_adiabat_table
+
+# The isopleths of every diagram are calculated in temperature and pressure, and each diagram's transform
+# then projects them onto its own grid
+
+
+def isotherm(min_pressure, max_pressure, axes, transform, kwargs, temperature):
+    temperatures, pressures = isotherm_family(min_pressure, max_pressure, [temperature])
+    (line,) = axes.plot(temperatures[0], pressures[0], transform=transform, **kwargs)
+
+    return line
+
+
+def isotherm_family(min_pressure, max_pressure, temperatures):
+    """
+    Calculates the points along a family of isotherms at once
+    :param min_pressure: pressure in hPa
+    :type min_pressure: float
+    :param max_pressure: pressure in hPa
+    :type max_pressure: float
+    :param temperatures: temperatures in degC
+    :type temperatures: list-like
+    :return: temperatures in degC, pressures in hPa, one row per isotherm
+    :rtype: tuple
+    """
+    steps = 1000
+    temperatures = np.asarray(temperatures, dtype=float)[:, np.newaxis]
+    pressures = np.linspace(min_pressure, max_pressure, steps)[np.newaxis, :]
+
+    return np.broadcast_to(temperatures, (temperatures.shape[0], steps)).copy(), \
+        np.broadcast_to(pressures, (temperatures.shape[0], steps)).copy()
+
+
+def isentropes(min_temperature, max_temperature, min_pressure, max_pressure, axes, transform, kwargs, theta):
+    temperatures, pressures = isentrope_family(min_temperature, max_temperature, min_pressure, max_pressure, [theta])
+    (line,) = axes.plot(temperatures[0], pressures[0], transform=transform, **kwargs)
+
+    return line
+
+
+def isentrope_family(min_temperature, max_temperature, min_pressure, max_pressure, thetas):
+    """
+    Calculates the points along a family of isentropes at once
+    :param min_temperature: temperature in degC
+    :type min_temperature: float
+    :param max_temperature: temperature in degC
+    :type max_temperature: float
+    :param min_pressure: pressure in hPa
+    :type min_pressure: float
+    :param max_pressure: pressure in hPa
+    :type max_pressure: float
+    :param thetas: potential temperatures in degC
+    :type thetas: list-like
+    :return: temperatures in degC, pressures in hPa, one row per isentrope
+    :rtype: tuple
+    """
+    steps = 1000
+    thetas = np.asarray(thetas, dtype=float)
+    temperature_at_min_pressure, _ = convert_pressure_theta_to_temperature_theta(min_pressure, thetas)
+    temperature_at_max_pressure, _ = convert_pressure_theta_to_temperature_theta(max_pressure, thetas)
+    min_temperatures = np.where(temperature_at_min_pressure > min_temperature,
+                                temperature_at_min_pressure, min_temperature)
+    max_temperatures = np.where(temperature_at_max_pressure < max_temperature,
+                                temperature_at_max_pressure, max_temperature)
+
+    temperatures = np.linspace(min_temperatures, max_temperatures, steps, axis=1)
+    _, pressures = convert_temperature_theta_to_temperature_pressure(temperatures, thetas[:, np.newaxis])
+
+    return temperatures, pressures
+
+
+def isobar(min_temperature, max_temperature, axes, transform, kwargs, pressure):
+    temperatures, pressures = isobar_family(min_temperature, max_temperature, [pressure])
+    (line,) = axes.plot(temperatures[0], pressures[0], transform=transform, **kwargs)
+
+    return line
+
+
+def isobar_family(min_temperature, max_temperature, pressures):
+    """
+    Calculates the points along a family of isobars at once
+    :param min_temperature: temperature in degC
+    :type min_temperature: float
+    :param max_temperature: temperature in degC
+    :type max_temperature: float
+    :param pressures: pressures in hPa
+    :type pressures: list-like
+    :return: temperatures in degC, pressures in hPa, one row per isobar
+    :rtype: tuple
+    """
+    steps = 1000
+    pressures = np.asarray(pressures, dtype=float)[:, np.newaxis]
+    temperatures = np.linspace(min_temperature, max_temperature, steps)[np.newaxis, :]
+
+    return np.broadcast_to(temperatures, (pressures.shape[0], steps)).copy(), \
+        np.broadcast_to(pressures, (pressures.shape[0], steps)).copy()
+
+
+def moist_adiabat(min_temperature, max_pressure, init_pressure, axes, transform, kwargs, theta_es):
+    temps, pressures = moist_adiabat_points(min_temperature, max_pressure, init_pressure, theta_es)
+    (line,) = axes.plot(temps, pressures, transform=transform, **kwargs)
+
+    return line
+
+
+def moist_adiabat_points(min_temperature, max_pressure, init_pressure, theta_es):
+    temps, pressures = moist_adiabat_family(min_temperature, max_pressure, init_pressure, [theta_es])
+    temps_filter = np.where(np.isfinite(temps[0]))
+
+    return temps[0][temps_filter], pressures[0][temps_filter]
+
+
+def moist_adiabat_family(min_temperature, max_pressure, init_pressure, theta_es_levels,
+                         min_pressure=TABLE_MIN_PRESSURE):
+    """
+    Calculates the points along a family of moist adiabats at once.
+    Each adiabat is cut off where it becomes colder than min_temperature, the points beyond are set to NaN.
+    :param min_temperature: temperature in degC
+    :type min_temperature: float
+    :param max_pressure: pressure in hPa
+    :type max_pressure: float
+    :param init_pressure: pressure in hPa at which the adiabats are labelled by temperature
+    :type init_pressure: float
+    :param theta_es_levels: temperatures in degC of the adiabats at init_pressure
+    :type theta_es_levels: list-like
+    :param min_pressure: pressure in hPa, no lower than the bottom of the moist adiabat table
+    :type min_pressure: float
+    :return: temperatures in degC, pressures in hPa, one row per adiabat
+    :rtype: tuple
+    """
+    steps = 1000
+    pressures = np.geomspace(max(min_pressure, TABLE_MIN_PRESSURE), max_pressure, steps)
+    table = get_moist_adiabat_table()
+    theta_w_levels = table.theta_w(init_pressure, theta_es_levels)
+    temps = table.temperature(theta_w_levels[:, np.newaxis], pressures)
+    pressures, temps = clip_moist_adiabats(pressures, temps, min_temperature)
+
+    return temps, pressures
+
+
+def mixing_ratio(min_temperature, min_pressure, max_pressure, axes, transform, kwargs, r_vs):
+    temps, pressures = mixing_ratio_family(min_temperature, min_pressure, max_pressure, [r_vs])
+    temps_filter = np.where(np.isfinite(temps[0]))
+    (line,) = axes.plot(temps[0][temps_filter], pressures[0][temps_filter], transform=transform, **kwargs)
+
+    return line
+
+
+def mixing_ratio_family(min_temperature, min_pressure, max_pressure, r_vs_levels):
+    """
+    Calculates the points along a family of saturated mixing ratio lines at once.
+    Points colder than min_temperature are set to NaN.
+    :param min_temperature: temperature in degC
+    :type min_temperature: float
+    :param min_pressure: pressure in hPa
+    :type min_pressure: float
+    :param max_pressure: pressure in hPa
+    :type max_pressure: float
+    :param r_vs_levels: saturated mixing ratios in g/kg
+    :type r_vs_levels: list-like
+    :return: temperatures in degC, pressures in hPa, one row per mixing ratio
+    :rtype: tuple
+    """
+    steps = 1000
+    r_vs_levels = np.asarray(r_vs_levels, dtype=float)[:, np.newaxis]
+    pressures = np.linspace(min_pressure, max_pressure, steps)[np.newaxis, :]
+    temps = convert_pressure_mixing_ratio_to_temperature(pressures, r_vs_levels)
+
+    # Points colder than min_temperature are masked out with NaN
+    temps = np.where(temps > min_temperature, temps, np.nan)
+    pressures = np.where(np.isfinite(temps), pressures, np.nan)
+
+    return temps, pressures
@@ -0,0 +1,41 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+
+
+def isopleth_segments(x_points, y_points):
+    """
+    Splits a family of isopleths into one (N, 2) segment per isopleth, dropping non-finite points
+    :param x_points: x data coordinates, one row per isopleth
+    :type x_points: 2-D array-like
+    :param y_points: y data coordinates, one row per isopleth
+    :type y_points: 2-D array-like
+    :return: segments
+    :rtype: list
+    """
+    x_points, y_points = np.atleast_2d(x_points), np.atleast_2d(y_points)
+    segments = []
+    for x_row, y_row in zip(x_points, y_points):
+        finite = np.isfinite(x_row) & np.isfinite(y_row)
+        segments.append(np.column_stack((x_row[finite], y_row[finite])))
+    return segments
+
+
+def add_isopleth_collection(axes, transform, kwargs, x_points, y_points):
+    """
+    Draws a whole family of isopleths as a single LineCollection artist
+    :param axes: axes to draw on
+    :type axes: matplotlib.axes.Axes
+    :param transform: transform from diagram data coordinates to display coordinates
+    :type transform: matplotlib.transforms.Transform
+    :param kwargs: line style shared by the whole family
+    :type kwargs: dict
+    :param x_points: x data coordinates, one row per isopleth
+    :type x_points: 2-D array-like
+    :param y_points: y data coordinates, one row per isopleth
+    :type y_points: 2-D array-like
+    :return: the collection
+    :rtype: matplotlib.collections.LineCollection
+    """
+    collection = LineCollection(isopleth_segments(x_points, y_points), transform=transform, **kwargs)
+    axes.add_collection(collection, autolim=False)
+    return collection
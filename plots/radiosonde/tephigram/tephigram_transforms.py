@@ -1,76 +1,14 @@
+import weakref
+
 import numpy as np
+from matplotlib.path import Path
 from matplotlib.transforms import Transform
+from scipy.special import lambertw
 
-from constants.thermodynamics import CONST_KELVIN, CONST_TO, CONST_CP_AIR, CONST_P0, CONST_GAS_CONST_AIR, CONST_EPSILON, \
-    CONST_GAS_CONST_VAP, CONST_LATENT_HEAT_VAP_WATER, CONST_ES0
-
-
-def convert_pressure_temperature_to_pressure_theta(pressure, temperature):
-    """
-    Transform pressure and temperature into pressure and potential temperature.
-    :param pressure: pressure in hPa
-    :type pressure: list-like
-    :param temperature: temperature in degC
-    :type temperature: list-like
-    :return: Pressure in hPa, potential temperature in degC
-    :rtype: tuple
-    """
-    pressure, temperature = np.asarray(pressure), np.asarray(temperature)
-
-    temperature_kelvin = temperature + CONST_KELVIN
-
-    theta_kelvin = temperature_kelvin * (CONST_P0 / pressure) ** (CONST_GAS_CONST_AIR / CONST_CP_AIR)
-    theta = theta_kelvin - CONST_KELVIN
-    return pressure, theta
-
-
-def convert_temperature_theta_to_temperature_pressure(temperature, theta):
-    """
-    Transform temperature and potential temperature into temperature and pressure
-    :param temperature: temperature in degC
-    :type temperature: list-like
-    :param theta: potential temperature in degC
-    :type theta: list-like
-    :return: Pressure in hPa, potential temperature in degC
-    :rtype: tuple
-    """
-    temperature, theta = np.asarray(temperature), np.asarray(theta)
-
-    temperature_kelvin = temperature + CONST_KELVIN
-    theta_kelvin = theta + CONST_KELVIN
-
-    pressure = CONST_P0 * (temperature_kelvin / theta_kelvin) ** (CONST_CP_AIR / CONST_GAS_CONST_AIR)
-    return temperature, pressure
-
-
-def convert_pressure_theta_to_temperature_theta(pressure, theta):
-    """
-    Transform pressure and potential temperature into pressure and temperature.
-    :param pressure: pressure in hPa
-    :type pressure: list-like
-    :param theta: potential temperature in degC
-    :type theta: list-like
-    :return: Pressure in hPa, temperature in degC
-    :rtype: tuple
-    """
-    pressure, theta = np.asarray(pressure), np.asarray(theta)
-
-    theta_kelvin = theta + CONST_KELVIN
-
-    temperature_kelvin = theta_kelvin * (CONST_P0 / pressure) ** (-CONST_GAS_CONST_AIR / CONST_CP_AIR)
-    temperature = temperature_kelvin - CONST_KELVIN
-    return temperature, theta
-
-
-def convert_pressure_mixing_ratio_to_temperature(pressure, mixing_ratio):
-    mixing_ratio_unitless = mixing_ratio / 1000
-    es = (mixing_ratio_unitless * pressure) / (mixing_ratio_unitless + CONST_EPSILON)
-    temperature_kelvin = 1.0 / (
-            (1.0 / CONST_KELVIN) - CONST_GAS_CONST_VAP / CONST_LATENT_HEAT_VAP_WATER * np.log(es / CONST_ES0))
-
-    temperature = temperature_kelvin - CONST_KELVIN
-
-    return temperature
+from constants.thermodynamics import CONST_KELVIN, CONST_TO, CONST_P0, CONST_GAS_CONST_AIR, CONST_CP_AIR
+from plots.radiosonde.conversions import convert_pressure_temperature_to_pressure_theta, \
+    convert_temperature_theta_to_temperature_pressure, convert_pressure_theta_to_temperature_theta, \
+    convert_pressure_mixing_ratio_to_temperature
 
 
 def convert_temperature_theta_to_xy(temperature, theta):
@@ -119,9 +57,69 @@ def convert_xy_to_temperature_theta(x_coords, y_coords):
     return temperature, theta
 
 
-class TephigramTransform(Transform):
-    """Inherits matplotlib.transforms.Transform as a custom transformation class to convert
-    temperature and potential temperature to x,y plotting grid coordinates"""
+def convert_temperature_pressure_to_xy(temperature, pressure):
+    """
+    Converts temperature, pressure coordinates into the x,y grid coordinates of the tephigram
+    by way of the potential temperature
+    :param temperature: dry-bulb temperature in degC
+    :type temperature: list-like
+    :param pressure: pressure in hPa
+    :type pressure: list-like
+    :return: grid coordinates x,y
+    :rtype: tuple
+    """
+    _, theta = convert_pressure_temperature_to_pressure_theta(pressure, temperature)
+    return convert_temperature_theta_to_xy(temperature, theta)
+
+
+def convert_xy_to_temperature_pressure(x_coords, y_coords):
+    """
+    Inverse conversion of convert_temperature_pressure_to_xy()
+    :param x_coords: x coordinates on grid
+    :type x_coords: list-like
+    :param y_coords: y coordinates on grid
+    :type y_coords: list-like
+    :return: temperature in degC, pressure in hPa
+    :rtype: tuple
+    """
+    return convert_temperature_theta_to_temperature_pressure(*convert_xy_to_temperature_theta(x_coords, y_coords))
+
+
+# Constant terms of the fused tephigram kernels
+_LOG_TO = np.log(CONST_TO)
+_KAPPA = CONST_GAS_CONST_AIR / CONST_CP_AIR
+_LOG_P0_TERM = _KAPPA * np.log(CONST_P0) - _LOG_TO
+
+
+def convert_x_pressure_to_temperature(x_coords, pressure):
+    """
+    Finds the temperature at which an isobar reaches an x grid coordinate, the inverse of
+    convert_temperature_pressure_to_xy() along a vertical line of the grid.
+    With u = T/TO, x = ln(u) + u + kappa ln(P0/p), so u = W(exp(x - kappa ln(P0/p))) on the principal
+    branch of the Lambert W function.
+    :param x_coords: x coordinates on grid
+    :type x_coords: list-like
+    :param pressure: pressure in hPa
+    :type pressure: list-like
+    :return: temperature in degC
+    :rtype: list-like
+    """
+    x_coords, pressure = np.asarray(x_coords), np.asarray(pressure)
+
+    temperature_ratio = lambertw(np.exp(x_coords - _KAPPA * np.log(CONST_P0 / pressure))).real
+
+    return temperature_ratio * CONST_TO - CONST_KELVIN
+
+
+class _CachedPathTransform(Transform):
+    """
+    Non-affine transform that keeps the transformed copy of every path it is given, so that after a pan,
+    zoom or redraw only the affine part of the drawing is repeated for unchanged artists, such as the
+    isopleth collections, as Line2D already does through matplotlib's TransformedPath.
+    A path is recognised by identity together with its vertex array, so paths whose vertices are replaced
+    are transformed again, and an entry is dropped once its path is garbage collected.
+    The forward and inverse transforms are created in pairs and returned by each other's inverted().
+    """
 
     # Override attributes
     input_dims = 2
@@ -129,28 +127,135 @@ class TephigramTransform(Transform):
     is_separable = False
     has_inverse = True
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._path_cache = weakref.WeakKeyDictionary()
+        self._inverse = None
+
+    def _paired_inverse(self, inverse_class):
+        if self._inverse is None:
+            self._inverse = inverse_class()
+            self._inverse._inverse = self
+        return self._inverse
+
+    def transform_path_non_affine(self, path):
+        cached = self._path_cache.get(path)
+        if cached is not None and cached[0] is path.vertices:
+            return cached[1]
+        transformed_path = Path._fast_from_codes_and_verts(self.transform_non_affine(path.vertices), path.codes,
+                                                           path)
+        self._path_cache[path] = (path.vertices, transformed_path)
+        return transformed_path
+
+    def __getstate__(self):
+        # Weak references cannot be pickled, so the cache is rebuilt after unpickling
+        return {**super().__getstate__(), '_path_cache': None}
+
+    def __setstate__(self, data_dict):
+        super().__setstate__(data_dict)
+        self._path_cache = weakref.WeakKeyDictionary()
+
+
+class TephigramTransform(_CachedPathTransform):
+    """Inherits matplotlib.transforms.Transform as a custom transformation class to convert
+    temperature and potential temperature to x,y plotting grid coordinates.
+    The conversion of convert_temperature_theta_to_xy() is fused into one pass over a preallocated
+    (N, 2) output."""
+
     def transform_non_affine(self, values):
-        return np.concatenate(convert_temperature_theta_to_xy(values[:, 0:1], values[:, 1:2]), axis=1)
+        values = np.asarray(values, dtype=float)
+        xy = np.empty(values.shape)
+        x_coords, y_coords = xy[..., 0], xy[..., 1]
+        # y holds T/TO and x holds ln(theta/TO) until they are combined
+        np.add(values[..., 0], CONST_KELVIN, out=y_coords)
+        y_coords /= CONST_TO
+        np.add(values[..., 1], CONST_KELVIN, out=x_coords)
+        np.log(x_coords, out=x_coords)
+        x_coords -= _LOG_TO
+        x_coords += y_coords
+        # ln(theta/TO) - T/TO = x - 2 T/TO
+        y_coords *= -2.0
+        y_coords += x_coords
+        return xy
 
     def inverted(self):
-        return TephigramTransformInverse()
+        return self._paired_inverse(TephigramTransformInverse)
 
 
-class TephigramTransformInverse(Transform):
+class TephigramTransformInverse(_CachedPathTransform):
     """Inverse transformation of TephigramTransform class"""
 
-    # Override attributes
-    input_dims = 2
-    output_dims = 2
-    is_separable = False
-    has_inverse = True
+    def transform_non_affine(self, values):
+        values = np.asarray(values, dtype=float)
+        temperature_theta = np.empty(values.shape)
+        temperature, theta = temperature_theta[..., 0], temperature_theta[..., 1]
+        np.subtract(values[..., 0], values[..., 1], out=temperature)
+        temperature *= CONST_TO / 2
+        temperature -= CONST_KELVIN
+        np.add(values[..., 0], values[..., 1], out=theta)
+        theta *= 0.5
+        np.exp(theta, out=theta)
+        theta *= CONST_TO
+        theta -= CONST_KELVIN
+        return temperature_theta
+
+    def inverted(self):
+        return self._paired_inverse(TephigramTransform)
+
+
+class TephigramPressureTransform(_CachedPathTransform):
+    """Transformation of temperature and pressure to the x,y plotting grid coordinates of the tephigram,
+    used to draw the tephigram with the same (T, p) data as the other diagrams.
+    ln(theta/TO) is expanded to ln(T) - kappa ln(p) + kappa ln(P0) - ln(TO), so no potential
+    temperature is formed."""
 
     def transform_non_affine(self, values):
-        return np.concatenate(convert_xy_to_temperature_theta(values[:, 0:1], values[:, 1:2]), axis=1)
+        values = np.asarray(values, dtype=float)
+        xy = np.empty(values.shape)
+        x_coords, y_coords = xy[..., 0], xy[..., 1]
+        # y holds the temperature in K, then T/TO, and x holds ln(theta/TO) until they are combined
+        np.add(values[..., 0], CONST_KELVIN, out=y_coords)
+        np.log(values[..., 1], out=x_coords)
+        x_coords *= -_KAPPA
+        x_coords += np.log(y_coords)
+        x_coords += _LOG_P0_TERM
+        y_coords /= CONST_TO
+        x_coords += y_coords
+        y_coords *= -2.0
+        y_coords += x_coords
+        return xy
 
     def inverted(self):
-        return TephigramTransform()
+        return self._paired_inverse(TephigramPressureTransformInverse)
 
+    def temperature_at_x(self, x_coords, pressures):
+        """Closed-form temperatures at which isobars reach x grid coordinates, e.g. to place wind barbs."""
+        return convert_x_pressure_to_temperature(x_coords, pressures)
+
+
+class TephigramPressureTransformInverse(_CachedPathTransform):
+    """Inverse transformation of TephigramPressureTransform class.
+    The pressure is P0 exp((ln((x - y) / 2) - (x + y) / 2) / kappa)."""
+
+    def transform_non_affine(self, values):
+        values = np.asarray(values, dtype=float)
+        temperature_pressure = np.empty(values.shape)
+        temperature, pressure = temperature_pressure[..., 0], temperature_pressure[..., 1]
+        np.add(values[..., 0], values[..., 1], out=pressure)
+        pressure *= -0.5
+        # The temperature holds (x - y) / 2 = T/TO until the pressure is found
+        np.subtract(values[..., 0], values[..., 1], out=temperature)
+        temperature *= 0.5
+        pressure += np.log(temperature)
+        pressure /= _KAPPA
+        np.exp(pressure, out=pressure)
+        pressure *= CONST_P0
+        temperature *= CONST_TO
+        temperature -= CONST_KELVIN
+        return temperature_pressure
+
+    def inverted(self):
+        return self._paired_inverse(TephigramPressureTransform)
 
 if __name__ == '__main__':
     print(convert_temperature_theta_to_xy(0, 0))
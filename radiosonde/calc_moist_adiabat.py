@@ -0,0 +1,189 @@
+import numpy as np
+
+from constants.thermodynamics import CONST_ES0, CONST_GAS_CONST_AIR, CONST_GAS_CONST_VAP, \
+    CONST_LATENT_HEAT_VAP_WATER, CONST_EPSILON, CONST_KELVIN, CONST_CP_AIR
+
+
+def moist_adiabat_lapse_rate(pressure, temperature):
+    """Calculate the rate of change of temperature with pressure along a pseudo-adiabat.
+
+    Parameters
+    ----------
+    pressure : Pressure in hPa
+    temperature : Temperature in degC
+
+    Returns
+    -------
+    dT/dp in degC per hPa, broadcast over the inputs
+
+    Notes
+    -----
+    Uses the Clausius-Clapeyron equation with a constant latent heat for the saturation
+    vapour pressure, as in the isopleths drawn on the thermodynamic diagrams.
+    """
+    temperature_kelvin = np.asarray(temperature) + CONST_KELVIN
+    pressure = np.asarray(pressure)
+    cc_equation_exp = (CONST_LATENT_HEAT_VAP_WATER / CONST_GAS_CONST_VAP) * (
+            (1.0 / CONST_KELVIN) - (1.0 / temperature_kelvin))
+    e_s = CONST_ES0 * np.exp(cc_equation_exp)
+    r_vs = e_s * CONST_EPSILON / pressure
+    lrwbt = (CONST_LATENT_HEAT_VAP_WATER * r_vs) / (CONST_GAS_CONST_AIR * temperature_kelvin)
+    numerator = ((CONST_GAS_CONST_AIR * temperature_kelvin) / (CONST_CP_AIR * pressure)) * (1.0 + lrwbt)
+    denominator = 1.0 + (lrwbt * ((CONST_EPSILON * CONST_LATENT_HEAT_VAP_WATER) / (CONST_CP_AIR * temperature_kelvin)))
+    return numerator / denominator
+
+
+def _log_pressure_gradient(log_pressure, temperature, lapse_rate):
+    pressure = np.exp(log_pressure)
+    return pressure * lapse_rate(pressure, temperature)
+
+
+def _rk4_step(log_pressure, temperature, step, lapse_rate):
+    k1 = _log_pressure_gradient(log_pressure, temperature, lapse_rate)
+    k2 = _log_pressure_gradient(log_pressure + 0.5 * step, temperature + 0.5 * step * k1, lapse_rate)
+    k3 = _log_pressure_gradient(log_pressure + 0.5 * step, temperature + 0.5 * step * k2, lapse_rate)
+    k4 = _log_pressure_gradient(log_pressure + step, temperature + step * k3, lapse_rate)
+    return temperature + step * (k1 + 2.0 * k2 + 2.0 * k3 + k4) / 6.0
+
+
+def _integrate_nodes(temperature, log_pressure_start, log_pressure_end, max_step, lapse_rate):
+    """Integrates every adiabat over evenly spaced log-pressure nodes, returning nodes, temperatures and gradients."""
+    substeps = max(1, int(np.ceil(abs(log_pressure_end - log_pressure_start) / max_step)))
+    log_pressure_nodes = np.linspace(log_pressure_start, log_pressure_end, substeps + 1)
+    step = log_pressure_nodes[1] - log_pressure_nodes[0]
+    temperature_nodes = [temperature]
+    for log_pressure in log_pressure_nodes[:-1]:
+        temperature = _rk4_step(log_pressure, temperature, step, lapse_rate)
+        temperature_nodes.append(temperature)
+    temperature_nodes = np.column_stack(temperature_nodes)
+    gradient_nodes = _log_pressure_gradient(log_pressure_nodes, temperature_nodes, lapse_rate)
+    return log_pressure_nodes, temperature_nodes, gradient_nodes
+
+
+def _hermite_interpolate(log_pressures, log_pressure_nodes, temperature_nodes, gradient_nodes):
+    """Cubic Hermite interpolation between integration nodes, which keeps the fourth order accuracy of RK4."""
+    interval = np.clip(np.searchsorted(log_pressure_nodes, log_pressures) - 1, 0, log_pressure_nodes.size - 2)
+    step = log_pressure_nodes[interval + 1] - log_pressure_nodes[interval]
+    t = (log_pressures - log_pressure_nodes[interval]) / step
+    h00 = (1 + 2 * t) * (1 - t) ** 2
+    h10 = t * (1 - t) ** 2
+    h01 = t ** 2 * (3 - 2 * t)
+    h11 = t ** 2 * (t - 1)
+    return (h00 * temperature_nodes[:, interval] + h10 * step * gradient_nodes[:, interval]
+            + h01 * temperature_nodes[:, interval + 1] + h11 * step * gradient_nodes[:, interval + 1])
+
+
+def moist_adiabats(pressures, theta_es, reference_pressure=1000.0, max_step=0.05,
+                   lapse_rate=moist_adiabat_lapse_rate):
+    """Calculate a family of pseudo-adiabats on a shared pressure grid.
+    Every adiabat is integrated at once with a fourth order Runge-Kutta scheme in log-pressure,
+    outwards from `reference_pressure` in both directions, and evaluated on the grid by cubic
+    Hermite interpolation between the integration nodes.
+
+    Parameters
+    ----------
+    pressures : Pressure grid in hPa, in any order
+    theta_es : Temperatures in degC of the adiabats at `reference_pressure`
+    reference_pressure : Pressure in hPa at which the adiabats are labelled, defaults to 1000 hPa
+    max_step : Largest integration step in log-pressure
+    lapse_rate : Function of pressure in hPa and temperature in degC returning dT/dp in degC per hPa,
+        defaults to `moist_adiabat_lapse_rate`
+
+    Returns
+    -------
+    Temperatures in degC with shape (number of adiabats, number of pressures)
+
+    Notes
+    -----
+    With the default `max_step` the curves agree with a converged solution to better than 1e-4 K
+    between 1 and 1100 hPa, for adiabats between -40 and 70 degC.
+    """
+    log_pressures = np.log(np.asarray(pressures, dtype=float))
+    theta_es = np.atleast_1d(np.asarray(theta_es, dtype=float))
+    log_reference = np.log(reference_pressure)
+
+    # Integrate upwards (decreasing pressure) and downwards from the reference pressure
+    up_nodes, up_temperatures, up_gradients = _integrate_nodes(
+        theta_es, log_reference, min(log_pressures.min(), log_reference), max_step, lapse_rate)
+    down_nodes, down_temperatures, down_gradients = _integrate_nodes(
+        theta_es, log_reference, max(log_pressures.max(), log_reference), max_step, lapse_rate)
+
+    log_pressure_nodes = np.concatenate((up_nodes[:0:-1], down_nodes))
+    temperature_nodes = np.concatenate((up_temperatures[:, :0:-1], down_temperatures), axis=1)
+    gradient_nodes = np.concatenate((up_gradients[:, :0:-1], down_gradients), axis=1)
+
+    return _hermite_interpolate(log_pressures, log_pressure_nodes, temperature_nodes, gradient_nodes)
+
+
+def moist_adiabat_parcels(pressure, temperature, reference_pressure, max_step=0.05,
+                          lapse_rate=moist_adiabat_lapse_rate):
+    """Calculate the temperatures of saturated parcels taken along their own moist adiabats.
+    Unlike `moist_adiabats`, each parcel has its own starting and final pressure. All parcels are
+    integrated together with the same number of fourth order Runge-Kutta steps in log-pressure,
+    each parcel's step being its own log-pressure change divided by the number of steps.
+
+    Parameters
+    ----------
+    pressure : Final pressure of each parcel
+    temperature : Starting temperature of each parcel
+    reference_pressure : Starting pressure of each parcel
+    max_step : Largest integration step in log-pressure
+    lapse_rate : Function of pressure and temperature returning dT/dp in matching units,
+        defaults to `moist_adiabat_lapse_rate` in degC and hPa
+
+    Returns
+    -------
+    Final temperatures, broadcast over the inputs. Parcels with a NaN input are NaN.
+    """
+    log_pressure, log_end, temperature = np.broadcast_arrays(
+        np.log(np.asarray(reference_pressure, dtype=float)), np.log(np.asarray(pressure, dtype=float)),
+        np.asarray(temperature, dtype=float))
+    span = log_end - log_pressure
+    largest_span = np.nanmax(np.abs(span), initial=0.0)
+    substeps = max(1, int(np.ceil(largest_span / max_step)))
+    step = span / substeps
+    for i in range(substeps):
+        temperature = _rk4_step(log_pressure + i * step, temperature, step, lapse_rate)
+    return temperature
+
+
+def clip_moist_adiabats(pressures, temperatures, min_temperature):
+    """Cut a family of adiabats off where they first become colder than `min_temperature`.
+    The last retained point of each adiabat is moved onto the `min_temperature` isotherm and
+    the colder points beyond it are set to NaN.
+
+    Parameters
+    ----------
+    pressures : 1-D pressure grid in hPa, in increasing order
+    temperatures : Temperatures in degC, one row per adiabat, as returned by `moist_adiabats`
+    min_temperature : Cut-off temperature in degC
+
+    Returns
+    -------
+    Pressures and temperatures with shape (number of adiabats, number of pressures)
+    """
+    temperatures = np.array(temperatures, dtype=float)
+    pressures = np.broadcast_to(np.asarray(pressures, dtype=float), temperatures.shape).copy()
+    columns = temperatures.shape[1]
+
+    colder = temperatures < min_temperature
+    rows = np.nonzero(colder.any(axis=1))[0]
+    last_colder = columns - 1 - np.argmax(colder[rows, ::-1], axis=1)
+
+    # Adiabats colder than min_temperature everywhere are dropped entirely
+    temperatures[rows[last_colder == columns - 1]] = np.nan
+    pressures[rows[last_colder == columns - 1]] = np.nan
+    rows, column = rows[last_colder < columns - 1], last_colder[last_colder < columns - 1]
+
+    warm_temperature, cold_temperature = temperatures[rows, column + 1], temperatures[rows, column]
+    fraction = (min_temperature - warm_temperature) / (cold_temperature - warm_temperature)
+    log_warm_pressure, log_cold_pressure = np.log(pressures[rows, column + 1]), np.log(pressures[rows, column])
+    crossing_pressure = np.exp(log_warm_pressure + fraction * (log_cold_pressure - log_warm_pressure))
+
+    beyond = np.arange(columns)[np.newaxis, :] < column[:, np.newaxis]
+    temperatures[rows] = np.where(beyond, np.nan, temperatures[rows])
+    pressures[rows] = np.where(beyond, np.nan, pressures[rows])
+    temperatures[rows, column] = min_temperature
+    pressures[rows, column] = crossing_pressure
+
+    return pressures, temperatures
@@ -0,0 +1,355 @@
+from collections import namedtuple
+
+import numpy as np
+import constants.thermodynamics as therm_consts
+from radiosonde.calc_moist_adiabat import moist_adiabat_parcels
+from radiosonde.calc_wetbulb import lcl, mixing_ratio, moist_lapse_rate, saturation_vapor_pressure, vapor_pressure
+from radiosonde.calc_wetbulb import dewpoint as dewpoint_from_vapor_pressure
+from radiosonde.moist_adiabat_table import get_moist_adiabat_table
+
+KAPPA = therm_consts.CONST_GAS_CONST_AIR / therm_consts.CONST_CP_AIR
+REFERENCE_PRESSURE = therm_consts.CONST_P0 * 100  # Pa
+
+# Levels, indices and integrals derived from the traces of lifted parcels, one element per parcel.
+# Pressures are in Pa, temperatures in K, CAPE and CIN in J/kg, and parcel_temperature holds the trace of each
+# parcel on the levels of the sounding, NaN below its starting level.
+ParcelAscent = namedtuple('ParcelAscent', ['start_pressure', 'start_temperature', 'start_dewpoint',
+                                           'lcl_pressure', 'lcl_temperature', 'lfc_pressure', 'lfc_temperature',
+                                           'el_pressure', 'el_temperature', 'cape', 'cin', 'parcel_temperature'])
+
+
+def potential_temperature(pressure, temperature):
+    """Calculate the potential temperature.
+
+    Parameters
+    ----------
+    pressure : Atmospheric pressure in Pa
+    temperature : Air temperature in K
+
+    Returns
+    -------
+    Potential temperature in K
+    """
+    return temperature * (REFERENCE_PRESSURE / pressure) ** KAPPA
+
+
+def equivalent_potential_temperature(pressure, temperature, dewpoint):
+    """Calculate the equivalent potential temperature.
+
+    Parameters
+    ----------
+    pressure : Atmospheric pressure in Pa
+    temperature : Air temperature in K
+    dewpoint : Dewpoint in K
+
+    Returns
+    -------
+    Equivalent potential temperature in K
+
+    Notes
+    -----
+    Uses [Bolton1980]_ eq. 39, with the temperature at the LCL from eq. 15.
+    """
+    pressure, temperature, dewpoint = (np.asarray(value, dtype=float) for value in (pressure, temperature, dewpoint))
+    e = saturation_vapor_pressure(dewpoint)
+    r = mixing_ratio(e, pressure)
+    t_l = 56.0 + 1.0 / (1.0 / (dewpoint - 56.0) + np.log(temperature / dewpoint) / 800.0)
+    th_l = temperature * (REFERENCE_PRESSURE / (pressure - e)) ** KAPPA * (temperature / t_l) ** (0.28 * r)
+    return th_l * np.exp((3036.0 / t_l - 1.78) * r * (1.0 + 0.448 * r))
+
+
+def _interpolate_levels(log_pressure, values, log_pressure_at):
+    """
+    Interpolates rows of values on the levels of a sounding linearly in log-pressure,
+    one point per row, returning NaN outside the sounding
+    """
+    levels = log_pressure.size
+    above = np.clip(np.searchsorted(-log_pressure, -log_pressure_at, side='right'), 1, levels - 1)
+    below = above - 1
+    rows = np.arange(values.shape[0])
+    fraction = (log_pressure_at - log_pressure[below]) / (log_pressure[above] - log_pressure[below])
+    interpolated = values[rows, below] + fraction * (values[rows, above] - values[rows, below])
+    # Points at a level take its value even if the neighbouring level is NaN, e.g. below the start of a parcel
+    interpolated = np.where(log_pressure_at == log_pressure[below], values[rows, below], interpolated)
+    outside = (log_pressure_at > log_pressure[0]) | (log_pressure_at < log_pressure[-1])
+    return np.where(outside, np.nan, interpolated)
+
+
+def _layer_integral(log_pressure, buoyancy, bottom, top, negative_only=False):
+    """
+    Integrates the buoyancy of each parcel over log-pressure between its own bottom and top,
+    treating the buoyancy as linear in log-pressure between levels
+    """
+    upper, lower = log_pressure[1:], log_pressure[:-1]
+    layer_top = np.maximum(upper, top[:, np.newaxis])
+    layer_bottom = np.minimum(lower, bottom[:, np.newaxis])
+    slope = (buoyancy[:, 1:] - buoyancy[:, :-1]) / (upper - lower)
+    top_buoyancy = buoyancy[:, :-1] + (layer_top - lower) * slope
+    bottom_buoyancy = buoyancy[:, :-1] + (layer_bottom - lower) * slope
+    depth = layer_bottom - layer_top
+    area = depth * (top_buoyancy + bottom_buoyancy) / 2.0
+    if negative_only:
+        least, most = np.minimum(top_buoyancy, bottom_buoyancy), np.maximum(top_buoyancy, bottom_buoyancy)
+        # Where the buoyancy changes sign within a layer only the triangle below zero is counted
+        crossing_area = depth * least * least / (2.0 * (least - most))
+        area = np.where(most <= 0, area, np.where(least >= 0, 0.0, crossing_area))
+    area = np.where((depth > 0) & np.isfinite(area), area, 0.0)
+    return area.sum(axis=1)
+
+
+def parcel_temperatures(pressure, start_pressure, start_temperature, start_dewpoint, method='rk4'):
+    """Calculate the temperatures of parcels lifted from their starting states through the levels of a sounding.
+    Each parcel rises along its dry adiabat to its LCL and along its moist adiabat above.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    start_pressure : Starting pressure in Pa of each parcel
+    start_temperature : Starting temperature in K of each parcel
+    start_dewpoint : Starting dewpoint in K of each parcel
+    method : How the parcels are taken up the moist adiabats
+        'rk4' integrates every parcel at once from level to level with `calc_moist_adiabat.moist_adiabat_parcels`;
+        'table' interpolates in the Bolton `moist_adiabat_table`, falling back to 'rk4' for
+        parcels that leave the table between 50 and 1050 hPa.
+
+    Returns
+    -------
+    LCL pressures, LCL temperatures, and parcel temperatures with one row per parcel and one column per level,
+    NaN at levels below the starting pressure of the parcel
+    """
+    pressure = np.asarray(pressure, dtype=float)
+    start_pressure, start_temperature, start_dewpoint = (np.atleast_1d(np.asarray(value, dtype=float)) for value in
+                                                         (start_pressure, start_temperature, start_dewpoint))
+    lcl_pressure, lcl_temperature = lcl(start_pressure, start_temperature, start_dewpoint)
+    dry = start_temperature[:, np.newaxis] * (pressure / start_pressure[:, np.newaxis]) ** KAPPA
+    saturated = pressure < lcl_pressure[:, np.newaxis]
+
+    if method == 'rk4':
+        moist = _moist_ascent(pressure, lcl_pressure, lcl_temperature)
+    elif method == 'table':
+        table = get_moist_adiabat_table('bolton')
+        moist = table.moist_lapse(pressure / 100, lcl_temperature[:, np.newaxis] - therm_consts.CONST_KELVIN,
+                                  lcl_pressure[:, np.newaxis] / 100) + therm_consts.CONST_KELVIN
+        outside = np.any(saturated & np.isnan(moist), axis=1) & np.isfinite(lcl_temperature)
+        if outside.any():
+            moist[outside] = _moist_ascent(pressure, lcl_pressure[outside], lcl_temperature[outside])
+    else:
+        raise ValueError(f"Unknown parcel method '{method}', expected 'rk4' or 'table'")
+
+    temperatures = np.where(saturated, moist, dry)
+    temperatures[pressure > start_pressure[:, np.newaxis]] = np.nan
+    return lcl_pressure, lcl_temperature, temperatures
+
+
+def _moist_ascent(pressure, lcl_pressure, lcl_temperature):
+    """Integrates saturated parcels up from their LCLs, one level at a time for all parcels at once."""
+    temperatures = np.full((lcl_pressure.size, pressure.size), np.nan)
+    current_pressure, current_temperature = lcl_pressure.copy(), lcl_temperature.copy()
+    for level, level_pressure in enumerate(pressure):
+        # Parcels still below this level keep their state, and are given no span to integrate over
+        saturated = level_pressure < current_pressure
+        next_pressure = np.where(saturated, level_pressure, current_pressure)
+        current_temperature = moist_adiabat_parcels(next_pressure, current_temperature, current_pressure,
+                                                    lapse_rate=moist_lapse_rate)
+        current_pressure = next_pressure
+        temperatures[:, level] = np.where(saturated, current_temperature, np.nan)
+    return temperatures
+
+
+def lift_parcels(pressure, temperature, start_pressure, start_temperature, start_dewpoint, method='rk4'):
+    """Calculate the LCL, LFC, EL, CAPE and CIN of parcels lifted through a sounding.
+    The trace of each parcel is calculated once, and every level and integral is derived from it.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    temperature : Temperatures in K of the levels of the sounding
+    start_pressure : Starting pressure in Pa of each parcel
+    start_temperature : Starting temperature in K of each parcel
+    start_dewpoint : Starting dewpoint in K of each parcel
+    method : How the parcels are taken up the moist adiabats, as in `parcel_temperatures`
+
+    Returns
+    -------
+    ParcelAscent with one element per parcel
+
+    Notes
+    -----
+    The buoyancy of a parcel is its temperature excess over the environment, taken as linear in log-pressure
+    between levels. As in MetPy's `cape_cin`, the LFC is the bottom of the lowest layer of positive buoyancy
+    above the LCL, or the LCL itself if the parcel is buoyant there, and the EL is the top of the highest
+    layer of positive buoyancy above the LFC. The EL is NaN if the parcel is still buoyant at the top of the
+    sounding, and the CAPE is then integrated to the top.
+    The CAPE is :math:`R_d \\int_{EL}^{LFC} (T_p - T_e) d \\ln p`, including any negative layers in between,
+    and the CIN is the same integral of only the negative buoyancy from the starting level to the LFC.
+    Parcels without an LFC have NaN for the LFC and EL, and zero CAPE and CIN.
+    """
+    pressure, temperature = np.asarray(pressure, dtype=float), np.asarray(temperature, dtype=float)
+    lcl_pressure, lcl_temperature, parcel_temperature = parcel_temperatures(
+        pressure, start_pressure, start_temperature, start_dewpoint, method=method)
+    start_pressure, start_temperature, start_dewpoint = (np.atleast_1d(np.asarray(value, dtype=float)) for value in
+                                                         (start_pressure, start_temperature, start_dewpoint))
+    log_pressure = np.log(pressure)
+    buoyancy = parcel_temperature - temperature
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_lcl = np.log(lcl_pressure)
+        lcl_buoyancy = _interpolate_levels(log_pressure, buoyancy, log_lcl)
+
+        # Log-pressure at which the buoyancy crosses zero within each layer between levels
+        lower, upper = buoyancy[:, :-1], buoyancy[:, 1:]
+        crossing = log_pressure[:-1] + lower / (lower - upper) * (log_pressure[1:] - log_pressure[:-1])
+        rising = (lower <= 0) & (upper > 0)
+        sinking = (lower > 0) & (upper <= 0)
+
+        lowest_rising = np.where(rising & (crossing <= log_lcl[:, np.newaxis]), crossing, -np.inf).max(axis=1)
+        log_lfc = np.where(lcl_buoyancy > 0, log_lcl, lowest_rising)
+        log_lfc = np.where(np.isfinite(log_lfc), log_lfc, np.nan)
+
+        highest_sinking = np.where(sinking & (crossing < log_lfc[:, np.newaxis]), crossing, np.inf).min(axis=1)
+        log_el = np.where(np.isfinite(highest_sinking) & ~(buoyancy[:, -1] > 0), highest_sinking, np.nan)
+
+        has_lfc = np.isfinite(log_lfc)
+        cape_top = np.where(np.isnan(log_el), log_pressure[-1], log_el)
+        cape = therm_consts.CONST_GAS_CONST_AIR * _layer_integral(log_pressure, buoyancy, log_lfc, cape_top)
+        cin = therm_consts.CONST_GAS_CONST_AIR * _layer_integral(log_pressure, buoyancy, np.log(start_pressure),
+                                                                 log_lfc, negative_only=True)
+        cape = np.where(has_lfc, np.maximum(cape, 0.0), 0.0)
+        cin = np.where(has_lfc, cin, 0.0)
+
+        lfc_pressure, el_pressure = np.exp(log_lfc), np.exp(log_el)
+        lfc_temperature = np.where(lcl_buoyancy > 0, lcl_temperature,
+                                   _interpolate_levels(log_pressure, parcel_temperature, log_lfc))
+        el_temperature = _interpolate_levels(log_pressure, parcel_temperature, log_el)
+
+    return ParcelAscent(start_pressure, start_temperature, start_dewpoint, lcl_pressure, lcl_temperature,
+                        lfc_pressure, lfc_temperature, el_pressure, el_temperature, cape, cin, parcel_temperature)
+
+
+def surface_based_parcel(pressure, temperature, dewpoint):
+    """Return the starting state of the parcel lifted from the lowest level of a sounding.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    temperature : Temperatures in K
+    dewpoint : Dewpoints in K
+
+    Returns
+    -------
+    Pressure, temperature, dewpoint of the parcel and the index of its level
+    """
+    return pressure[0], temperature[0], dewpoint[0], 0
+
+
+def most_unstable_parcel(pressure, temperature, dewpoint, depth=30000.0):
+    """Return the starting state of the parcel with the highest equivalent potential temperature
+    within `depth` of the lowest level of a sounding.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    temperature : Temperatures in K
+    dewpoint : Dewpoints in K
+    depth : Depth in Pa of the layer searched, defaults to 300 hPa as in MetPy
+
+    Returns
+    -------
+    Pressure, temperature, dewpoint of the parcel and the index of its level
+    """
+    pressure, temperature, dewpoint = (np.asarray(value, dtype=float) for value in (pressure, temperature, dewpoint))
+    theta_e = equivalent_potential_temperature(pressure, temperature, dewpoint)
+    theta_e = np.where(pressure >= pressure[0] - depth, theta_e, np.nan)
+    index = int(np.nanargmax(theta_e))
+    return pressure[index], temperature[index], dewpoint[index], index
+
+
+def mixed_layer_parcel(pressure, temperature, dewpoint, depth=10000.0):
+    """Return the starting state of the parcel at the lowest level of a sounding with the mean potential
+    temperature and mixing ratio of the layer `depth` above it.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    temperature : Temperatures in K
+    dewpoint : Dewpoints in K
+    depth : Depth in Pa of the mixed layer, defaults to 100 hPa as in MetPy
+
+    Returns
+    -------
+    Pressure, temperature, dewpoint of the parcel and the index of its level
+
+    Notes
+    -----
+    The means are weighted by pressure, with the top of the layer interpolated linearly in log-pressure.
+    """
+    pressure, temperature, dewpoint = (np.asarray(value, dtype=float) for value in (pressure, temperature, dewpoint))
+    theta = potential_temperature(pressure, temperature)
+    r = mixing_ratio(saturation_vapor_pressure(dewpoint), pressure)
+
+    top_pressure = max(pressure[0] - depth, pressure[-1])
+    inside = pressure > top_pressure
+    layer_pressure = np.append(pressure[inside], top_pressure)
+    log_pressure, log_top = np.log(pressure[::-1]), np.log(top_pressure)
+    layer_theta = np.append(theta[inside], np.interp(log_top, log_pressure, theta[::-1]))
+    layer_r = np.append(r[inside], np.interp(log_top, log_pressure, r[::-1]))
+    weights = np.diff(layer_pressure) / (top_pressure - pressure[0])
+    mean_theta = np.sum(weights * (layer_theta[1:] + layer_theta[:-1]) / 2.0)
+    mean_r = np.sum(weights * (layer_r[1:] + layer_r[:-1]) / 2.0)
+
+    parcel_temperature = mean_theta * (pressure[0] / REFERENCE_PRESSURE) ** KAPPA
+    parcel_dewpoint = dewpoint_from_vapor_pressure(vapor_pressure(pressure[0], mean_r)) + therm_consts.CONST_KELVIN
+    return pressure[0], parcel_temperature, parcel_dewpoint, 0
+
+
+def parcel_ascents(pressure, temperature, dewpoint, most_unstable_depth=30000.0, mixed_layer_depth=10000.0,
+                   method='rk4'):
+    """Calculate the surface-based, most-unstable and mixed-layer parcels of a sounding with one vectorised ascent.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    temperature : Temperatures in K
+    dewpoint : Dewpoints in K
+    most_unstable_depth : Depth in Pa searched for the most unstable parcel
+    mixed_layer_depth : Depth in Pa of the mixed layer
+    method : How the parcels are taken up the moist adiabats, as in `parcel_temperatures`
+
+    Returns
+    -------
+    Dict of ParcelAscent with scalar fields and a 1-D parcel_temperature, keyed by 'surface_based',
+    'most_unstable' and 'mixed_layer', and a dict of the index of the level each parcel starts from
+    """
+    pressure, temperature, dewpoint = (np.asarray(value, dtype=float) for value in (pressure, temperature, dewpoint))
+    kinds = ('surface_based', 'most_unstable', 'mixed_layer')
+    starts = (surface_based_parcel(pressure, temperature, dewpoint),
+              most_unstable_parcel(pressure, temperature, dewpoint, depth=most_unstable_depth),
+              mixed_layer_parcel(pressure, temperature, dewpoint, depth=mixed_layer_depth))
+    start_pressure, start_temperature, start_dewpoint, indices = (np.array(values) for values in zip(*starts))
+    ascent = lift_parcels(pressure, temperature, start_pressure, start_temperature, start_dewpoint, method=method)
+
+    ascents = {kind: ParcelAscent(*(field[num] for field in ascent)) for num, kind in enumerate(kinds)}
+    return ascents, dict(zip(kinds, indices.tolist()))
+
+
+def every_level_ascents(pressure, temperature, dewpoint, method='rk4'):
+    """Calculate the ascent of a parcel from every level of a sounding at once, e.g. to profile the CAPE
+    available to parcels from each level.
+
+    Parameters
+    ----------
+    pressure : Pressures in Pa of the levels of the sounding, decreasing from the surface upwards
+    temperature : Temperatures in K
+    dewpoint : Dewpoints in K
+    method : How the parcels are taken up the moist adiabats, as in `parcel_temperatures`
+
+    Returns
+    -------
+    ParcelAscent with one element per level
+
+    Notes
+    -----
+    The parcel traces take (levels x levels) memory, so high resolution soundings are best thinned first,
+    e.g. with `prune.prune_profile`.
+    """
+    return lift_parcels(pressure, temperature, pressure, temperature, dewpoint, method=method)
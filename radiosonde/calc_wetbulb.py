@@ -1,7 +1,8 @@
 import numpy as np
 import scipy.integrate as si
-import scipy.optimize as so
 import constants.thermodynamics as therm_consts
+from radiosonde.calc_moist_adiabat import moist_adiabat_parcels
+from radiosonde.moist_adiabat_table import get_moist_adiabat_table
 
 
 def vapor_pressure(pressure, mixing_ratio):
@@ -131,11 +132,17 @@ def dewpoint(vapor_pressure):
     return 243.5 * val / (17.67 - val)
 
 
+def _saturation_temperature(pressure, mixing_ratio):
+    """Temperature in K at which air with ``mixing_ratio`` saturates at ``pressure``."""
+    return dewpoint(vapor_pressure(pressure, mixing_ratio)) + therm_consts.CONST_KELVIN
+
+
 def lcl(pressure, temperature, dewpoint, max_iters=50, eps=1e-5):
     """Calculate the lifted condensation level (LCL) from the starting point.
     The starting state for the parcel is defined by `temperature`, `dewpoint`,
-    and `pressure`. If these are arrays, this function will return a LCL
-    for every index. This function does work with surface grids as a result.
+    and `pressure`. These may be arrays of any shape that broadcast together, such as
+    every level of a sounding or every column of a model grid, and an LCL is returned
+    for every element.
 
     Parameters
     ----------
@@ -156,36 +163,72 @@ def lcl(pressure, temperature, dewpoint, max_iters=50, eps=1e-5):
 
     Notes
     -----
-    This function is implemented using an iterative approach to solve for the
-    LCL. The basic algorithm is:
-    1. Find the dewpoint from the LCL pressure and starting mixing ratio
-    2. Find the LCL pressure from the starting temperature and dewpoint
-    3. Iterate until convergence
-    The function is guaranteed to finish by virtue of the `max_iters` counter.
-    Only functions on 1D profiles (not higher-dimension vertical cross sections or grids).
-    Since this function returns scalar values when given a profile, this will return Pint
+    This function solves for the LCL pressure at which the dewpoint of the parcel, found from
+    the LCL pressure and starting mixing ratio, equals its dry adiabatic temperature.
+    The iteration starts from the LCL temperature of [Bolton1980]_ eq. 15 and takes Newton steps
+    in log-pressure, which converge within two or three steps. All elements are iterated together,
+    and the loop stops as soon as every element has converged.
+    Elements with a NaN input, or whose iteration breaks down, return NaN.
+    A RuntimeError is raised if any other element has not converged after `max_iters`.
     """
-
-    def _lcl_iter(p, p0, w, t):
-        nonlocal nan_mask
-        td = globals()['dewpoint'](vapor_pressure(p, w)) + therm_consts.CONST_KELVIN
-        p_new = (p0 * (td / t) ** (therm_consts.CONST_CP_AIR / therm_consts.CONST_GAS_CONST_AIR))  # .m
-        nan_mask = nan_mask | np.isnan(p_new)
-        return np.where(np.isnan(p_new), p, p_new)
-
-    # Handle nans by creating a mask that gets set by our _lcl_iter function if it
-    # ever encounters a nan, at which point pressure is set to p, stopping iteration.
-    nan_mask = False
+    pressure, temperature, dewpoint = np.broadcast_arrays(np.abs(np.asarray(pressure, dtype=float)),
+                                                          np.asarray(temperature, dtype=float),
+                                                          np.asarray(dewpoint, dtype=float))
     w = mixing_ratio(saturation_vapor_pressure(dewpoint), pressure)
-    lcl_p = so.fixed_point(_lcl_iter, np.abs(pressure), args=(np.abs(pressure), w, temperature),
-                           xtol=eps, maxiter=max_iters)
-    lcl_p = np.where(nan_mask, np.nan, lcl_p)
-
+    exponent = therm_consts.CONST_CP_AIR / therm_consts.CONST_GAS_CONST_AIR
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_start_p, log_start_t = np.log(pressure), np.log(temperature)
+        # Log of the vapor pressure relative to CONST_ES0 is the log LCL pressure plus this offset
+        vapor_offset = np.log(w / (therm_consts.CONST_EPSILON + w) / (therm_consts.CONST_ES0 * 100))
+
+        bolton_t = 1.0 / (1.0 / (dewpoint - 56.0) + np.log(temperature / dewpoint) / 800.0) + 56.0
+        log_p = log_start_p + exponent * (np.log(bolton_t) - log_start_t)
+
+        for _ in range(max_iters):
+            # Dewpoint at the current LCL estimate, as in `dewpoint`, and its derivative with log-pressure
+            val = log_p + vapor_offset
+            td = 243.5 * val / (17.67 - val) + therm_consts.CONST_KELVIN
+            dtd = 243.5 * 17.67 / np.square(17.67 - val)
+            step = (log_p - log_start_p - exponent * (np.log(td) - log_start_t)) / (1.0 - exponent * dtd / td)
+            log_p = log_p - step
+            # NaN steps come from NaN inputs or a broken down iteration, which stay NaN
+            if not np.any(np.abs(step) >= eps):
+                break
+        else:
+            raise RuntimeError(f'LCL failed to converge after {max_iters} iterations')
+
+    lcl_p = np.exp(log_p)
     # np.isclose needed if surface is LCL due to precision error with np.log in dewpoint.
     # Causes issues with parcel_profile_with_lcl if removed. Issue #1187
-    lcl_p = np.where(np.isclose(lcl_p, np.abs(pressure)), np.abs(pressure), lcl_p)
+    lcl_p = np.where(np.abs(lcl_p - pressure) <= 1e-8 + 1e-5 * pressure, pressure, lcl_p)
+
+    return lcl_p, _saturation_temperature(lcl_p, w)
 
-    return lcl_p, globals()['dewpoint'](vapor_pressure(lcl_p, w)) + therm_consts.CONST_KELVIN
+
+def moist_lapse_rate(pressure, temperature):
+    """Calculate the rate of change of temperature with pressure along a pseudo-adiabat.
+
+    Parameters
+    ----------
+    pressure : Atmospheric pressure in Pa
+    temperature : Air temperature in K
+
+    Returns
+    -------
+    dT/dp in K per Pa
+
+    Notes
+    -----
+    Uses the [Bolton1980]_ saturation vapor pressure of `saturation_mixing_ratio`.
+    """
+    rs = saturation_mixing_ratio(pressure, temperature)
+    frac = (therm_consts.CONST_GAS_CONST_AIR * temperature + therm_consts.CONST_LATENT_HEAT_VAP_WATER * rs) / \
+           (therm_consts.CONST_CP_AIR +
+            (therm_consts.CONST_LATENT_HEAT_VAP_WATER ** 2 * rs * therm_consts.CONST_EPSILON
+             / (therm_consts.CONST_GAS_CONST_AIR * temperature * temperature)))
+
+    return np.abs(frac / pressure)
 
 
 def moist_lapse(pressure, temperature, reference_pressure=None):
@@ -221,15 +264,7 @@ def moist_lapse(pressure, temperature, reference_pressure=None):
         return (a > value) | np.isclose(a, value, **kwargs)
 
     def dt(t, p):
-        # t = units.Quantity(t, temperature.units)
-        # p = units.Quantity(p, pressure.units)
-        rs = saturation_mixing_ratio(p, t)
-        frac = (therm_consts.CONST_GAS_CONST_AIR * t + therm_consts.CONST_LATENT_HEAT_VAP_WATER * rs) / \
-               (therm_consts.CONST_CP_AIR +
-                (therm_consts.CONST_LATENT_HEAT_VAP_WATER ** 2 * rs * therm_consts.CONST_EPSILON
-                 / (therm_consts.CONST_GAS_CONST_AIR * t * t)))
-
-        return np.abs(frac / p)
+        return moist_lapse_rate(p, t)
 
     pressure = np.atleast_1d(pressure)
     if reference_pressure is None:
@@ -273,7 +308,7 @@ def moist_lapse(pressure, temperature, reference_pressure=None):
     return ret_temperatures.T.squeeze()
 
 
-def wet_bulb_temperature(pressure, temperature, dewpoint):
+def wet_bulb_temperature(pressure, temperature, dewpoint, method='odeint'):
     """Calculate the wet-bulb temperature using Normand's rule.
     This function calculates the wet-bulb temperature using the Normand method. The LCL is
     computed, and that parcel brought down to the starting pressure along a moist adiabat.
@@ -283,33 +318,48 @@ def wet_bulb_temperature(pressure, temperature, dewpoint):
     pressure : Initial atmospheric pressure
     temperature : Initial atmospheric temperature
     dewpoint : Initial atmospheric dewpoint
+    method : How the parcels are brought down the moist adiabats
+        'odeint' integrates each level separately with `moist_lapse`;
+        'rk4' integrates every level at once with `calc_moist_adiabat.moist_adiabat_parcels`;
+        'table' interpolates in the Bolton `moist_adiabat_table`, falling back to 'rk4' for
+        levels outside the table between 50 and 1050 hPa.
+        All methods agree to within 0.01 K.
     Returns
     -------
         Wet-bulb temperature
     Notes
     -----
-    Since this function iteratively applies a parcel calculation, it should be used with
-    caution on large arrays.
+    Since the 'odeint' method iteratively applies a parcel calculation, it should be used with
+    caution on large arrays, such as high resolution soundings.
     """
-    # if not hasattr(pressure, 'shape'):
-    #     pressure = np.atleast_1d(pressure)
-    #     temperature = np.atleast_1d(temperature)
-    #     dewpoint = np.atleast_1d(dewpoint)
-
     lcl_press, lcl_temp = lcl(pressure, temperature, dewpoint)
 
-    it = np.nditer([np.abs(pressure), np.abs(lcl_press), np.abs(lcl_temp), None],
-                   op_dtypes=['float', 'float', 'float', 'float'],
-                   flags=['buffered'])
-
-    for press, lpress, ltemp, ret in it:
-        moist_adiabat_temperatures = moist_lapse(press,
-                                                 ltemp,
-                                                 lpress)
-        ret[...] = moist_adiabat_temperatures  # .m_as(temperature.units)
+    if method == 'odeint':
+        it = np.nditer([np.abs(pressure), np.abs(lcl_press), np.abs(lcl_temp), None],
+                       op_dtypes=['float', 'float', 'float', 'float'],
+                       flags=['buffered'])
+
+        for press, lpress, ltemp, ret in it:
+            moist_adiabat_temperatures = moist_lapse(press,
+                                                     ltemp,
+                                                     lpress)
+            ret[...] = moist_adiabat_temperatures  # .m_as(temperature.units)
+        ret = it.operands[3]
+    elif method == 'rk4':
+        ret = moist_adiabat_parcels(np.abs(pressure), np.abs(lcl_temp), np.abs(lcl_press),
+                                    lapse_rate=moist_lapse_rate)
+    elif method == 'table':
+        table = get_moist_adiabat_table('bolton')
+        ret = table.moist_lapse(np.abs(pressure) / 100, np.abs(lcl_temp) - therm_consts.CONST_KELVIN,
+                                np.abs(lcl_press) / 100) + therm_consts.CONST_KELVIN
+        outside = np.isnan(ret) & np.isfinite(pressure) & np.isfinite(lcl_press) & np.isfinite(lcl_temp)
+        if outside.any():
+            ret[outside] = moist_adiabat_parcels(np.abs(pressure), np.abs(lcl_temp), np.abs(lcl_press),
+                                                 lapse_rate=moist_lapse_rate)[outside]
+    else:
+        raise ValueError(f"Unknown wet-bulb method '{method}', expected 'odeint', 'rk4' or 'table'")
 
     # If we started with a scalar, return a scalar
-    ret = it.operands[3]
     if ret.size == 1:
-        ret = ret[0]
+        ret = ret.ravel()[0]
     return ret
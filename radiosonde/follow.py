@@ -0,0 +1,154 @@
+import abc
+import os
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+
+def parse_rows(text, names, numeric_names, sep):
+    """
+    Parses complete lines of a sounding table into a structured array.
+
+    Parameters
+    ----------
+    text : Lines of the table, each ending in a newline
+    names : Field names of the columns in file order
+    numeric_names : Names of the columns read as float64, where unreadable or empty values become NaN;
+        the other columns are kept as text
+    sep : Column separator
+
+    Returns
+    -------
+    Structured array with one record per line, whose text fields are as wide as the longest value in the lines
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    # Short rows are padded with empty values and any values beyond the last column are dropped
+    fields = np.array([(line.split(sep) + [''] * len(names))[:len(names)] for line in lines],
+                      dtype=str).reshape(len(lines), len(names))
+    fields = np.char.strip(fields)
+    numeric = [num for num, name in enumerate(names) if name in numeric_names]
+    values = np.where(fields[:, numeric] == '', 'nan', fields[:, numeric])
+    try:
+        values = values.astype(np.float64)
+    except ValueError:
+        # Fall back to coercing any unreadable values in the numeric columns to NaN
+        values = np.array([pd.to_numeric(column, errors='coerce') for column in values.T],
+                          dtype=np.float64).reshape(len(numeric), len(lines)).T
+
+    chunk = np.empty(len(lines), dtype=[(name, np.float64 if name in numeric_names else fields.dtype)
+                                        for name in names])
+    for num, name in enumerate(names):
+        if name not in numeric_names:
+            chunk[name] = fields[:, num]
+    for column, num in enumerate(numeric):
+        chunk[names[num]] = values[:, column]
+    return chunk
+
+
+class SoundingFollower(abc.ABC):
+    """
+    Follows a sounding file while it is being written, e.g. during an ascent, reading only what has been
+    appended since the last poll so that each poll costs O(new rows) rather than a re-read of the whole file.
+    A partially written last line is held back until the rest of it arrives.
+    Subclasses find the table in the lines before it through _read_header and name the renamed columns
+    through column_names.
+    """
+    sep = ','
+    encoding = 'utf-8'
+    # Renames of the file's column names to the field names of the chunks
+    column_names = {}
+
+    def __init__(self, infile):
+        self.infile = infile
+        self.filename = os.path.split(infile)[1]
+        # Bytes of the file read so far, and the start of a line that has not been completed yet
+        self.offset = 0
+        self._partial_line = b''
+        # Lines read before the table is found
+        self._header_lines = []
+        self.names = None
+        self.numeric_names = None
+        self.rows_read = 0
+
+    @abc.abstractmethod
+    def _read_header(self, lines):
+        """
+        Finds the table in the lines read so far
+
+        Parameters
+        ----------
+        lines : Complete lines from the start of the file
+
+        Returns
+        -------
+        (column names, names of the numeric columns, number of lines before the first row of the table),
+        or None if more of the file is needed
+        """
+
+    def _read_lines(self):
+        if os.path.getsize(self.infile) < self.offset:
+            raise ValueError(f"{self.infile} has been truncated since it was last read")
+        with open(self.infile, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        data = self._partial_line + data
+        end = data.rfind(b'\n') + 1
+        self._partial_line = data[end:]
+        return data[:end].decode(self.encoding)
+
+    def poll(self):
+        """
+        Reads the rows appended to the file since the last poll.
+
+        Returns
+        -------
+        Structured array of the new rows, with one float64 field per numeric column, which is empty if no
+        complete row has been added, or None if the header of the table has not been written yet
+        """
+        text = self._read_lines()
+        if self.names is None:
+            self._header_lines.extend(StringIO(text).readlines())
+            header = self._read_header(self._header_lines)
+            if header is None:
+                return None
+            names, numeric_names, table_start = header
+            self.names = [self.column_names.get(name, name) for name in names]
+            self.numeric_names = {self.column_names.get(name, name) for name in numeric_names}
+            text = ''.join(self._header_lines[table_start:])
+            self._on_header(self._header_lines[:table_start])
+            self._header_lines = None
+        chunk = parse_rows(text, self.names, self.numeric_names, self.sep)
+        self.rows_read += len(chunk)
+        return chunk
+
+    def _on_header(self, lines):
+        """Called once with the lines before the first row of the table, e.g. to read metadata from them."""
+        pass
+
+    def follow(self, interval=1.0, idle_timeout=None):
+        """
+        Polls the file until it stops growing, e.g. to append each chunk to a live diagram with
+        Profile.append and refresh_live.
+
+        Parameters
+        ----------
+        interval : Seconds to wait between polls that find no new rows
+        idle_timeout : Seconds without new rows after which to stop, or None to follow the file indefinitely
+
+        Returns
+        -------
+        Generator of structured arrays of the new rows, each non-empty
+        """
+        last_rows = time.monotonic()
+        while True:
+            chunk = self.poll()
+            if chunk is not None and len(chunk):
+                yield chunk
+                last_rows = time.monotonic()
+                continue
+            if idle_timeout is not None and time.monotonic() - last_rows >= idle_timeout:
+                return
+            time.sleep(interval)
@@ -1,7 +1,33 @@
 import os
+from io import StringIO
+
 import pandas as pd
 
 from radiosonde.calc_wetbulb import dewpoint, saturation_vapor_pressure
+from radiosonde.follow import SoundingFollower
+from radiosonde.prune import prune_profile
+
+
+def _split_filename(filename):
+    long_filename = filename
+    if filename[-4:] == ".csv":
+        long_filename = filename[:-4]
+    filename_segments = long_filename.split("-", 5)
+    return tuple(filename_segments[:4])
+
+
+def _release_metadata(location, date_str, time_str):
+    meta_df = pd.DataFrame(
+        {'field': ['LOCATION', 'YEAR', 'MONTH', 'DAY', 'HOUR', 'MINT'],
+         'info': [location,
+                  int(date_str[0:4]),
+                  int(date_str[4:6]),
+                  int(date_str[6:8]),
+                  int(time_str[0:2]),
+                  int(time_str[2:4])
+                  ]})
+    meta_df = meta_df.set_index('field')
+    return meta_df
 
 
 class DorsetRadiosonde(object):
@@ -19,41 +45,37 @@ class DorsetRadiosonde(object):
             self.df['Humidity'] / 100 * saturation_vapor_pressure(self.df['Temperature']))
 
     def get_metadata(self):
-        long_filename = self.filename
-        if self.filename[-4:] == ".csv":
-            long_filename = self.filename[:-4]
-        filename_segments = long_filename.split("-", 5)
-        self.sonde_model = filename_segments[0]
-        self.location = filename_segments[1]
-        self.date_str = filename_segments[2]
-        self.time_str = filename_segments[3]
-
-        meta_df = pd.DataFrame(
-            {'field': ['LOCATION', 'YEAR', 'MONTH', 'DAY', 'HOUR', 'MINT'],
-             'info': [self.location,
-                      int(self.date_str[0:4]),
-                      int(self.date_str[4:6]),
-                      int(self.date_str[6:8]),
-                      int(self.time_str[0:2]),
-                      int(self.time_str[2:4])
-                      ]})
-        meta_df = meta_df.set_index('field')
-        return meta_df
-
-    def prune_data(self, prune_pressure_list):
-        # Collect rows as DataFrames instead of Series to preserve dtypes
-        rows = []
-        for prune_pressure in prune_pressure_list:
-            idx = (self.df['Pressure'] - prune_pressure).abs().idxmin()
-            rows.append(self.df.iloc[[idx]])  # Note the double brackets → keeps it as DataFrame
-
-        # Concatenate vertically, preserving dtypes
-        pruned_profile = pd.concat(rows, ignore_index=True)
-
-        # Drop duplicates properly
-        pruned_profile = pruned_profile.drop_duplicates(subset=['Pressure'])
-
-        return pruned_profile
+        self.sonde_model, self.location, self.date_str, self.time_str = _split_filename(self.filename)
+        return _release_metadata(self.location, self.date_str, self.time_str)
+
+    def prune_data(self, prune_pressure_list, **kwargs):
+        return prune_profile(self.df, 'Pressure', prune_pressure_list, **kwargs)
+
+
+class DorsetRadiosondeFollower(SoundingFollower):
+    """
+    Follows an MW41 SynchronizedSoundingData .csv file while the sounding is being received.
+    A column is read as float64 if all its values in the rows written when the header is read are numbers,
+    with at least one of them not empty, and as text otherwise.
+    """
+
+    def _read_header(self, lines):
+        # At least one row is needed to tell the numeric columns apart
+        if len(lines) < 2:
+            return None
+        rows = pd.read_csv(StringIO(''.join(lines)), sep=self.sep, dtype=str, keep_default_na=False,
+                           index_col=False)
+        numeric_names = []
+        for name in rows.columns:
+            values = rows[name].str.strip()
+            values = values[values != '']
+            if len(values) and pd.to_numeric(values, errors='coerce').notna().all():
+                numeric_names.append(name)
+        return list(rows.columns), numeric_names, 1
+
+    def get_metadata(self):
+        _, location, date_str, time_str = _split_filename(self.filename)
+        return _release_metadata(location, date_str, time_str)
 
 
 if __name__ == '__main__':
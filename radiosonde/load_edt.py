@@ -1,107 +1,129 @@
 import os
+from collections import namedtuple
+from io import StringIO
+
+import numpy as np
 import pandas as pd
 
 from radiosonde.calc_wetbulb import dewpoint, saturation_vapor_pressure
+from radiosonde.follow import SoundingFollower
+from radiosonde.prune import prune_profile
+
+
+# Metadata sections of an .edt file in file order, each ending at the first blank line after its title
+EDT_SECTION_TITLES = ('Radiosonde data', 'Release data', 'Surface data', 'Calibration data')
+# Text in the header line of the sounding data table
+EDT_TABLE_HEADER = 'TimeUTC'
+EDT_NUMERIC_COLUMNS = ("P", "Temp", "RH", "Dewp", "Speed", "Dir", "Ecomp", "Ncomp", "Lat", "Lon", "AscRate",
+                       "HeightMSL", "GpsHeightMSL", "PotTemp", "SpHum", "CompRng", "CompAz", "VirT", "SatVapP",
+                       "VapP", "MixR", "Den", "HeightGnd", "GpsHeightGnd", "HeightE", "Pm", "Pc", "Ddep", "PEPT",
+                       "SSpc", "RI", "MRI", "RIG", "ELR")
+# Columns of the data table renamed to the names shared with the other sounding loaders
+EDT_COLUMN_NAMES = {"P": "Pressure",
+                    "Temp": "Temperature",
+                    "Dewp": "Dewpoint",
+                    "Speed": "WindSpeed",
+                    "Dir": "WindDir"}
+
+# Span of a section of an .edt file, as line numbers and offsets into the decoded text
+EdtSection = namedtuple('EdtSection', ['start_line', 'end_line', 'start_offset', 'end_offset'])
+
+
+def index_edt_sections(text):
+    """
+    Finds the metadata sections and the sounding data table of an .edt file in one pass over its text
+    :param text: decoded contents of the file
+    :type text: str
+    :return: EdtSection spans keyed by section title, excluding the title lines, with the data table
+        under EDT_TABLE_HEADER running from its header line to the end of the file
+    :rtype: dict
+    """
+    sections = {}
+    titles = iter(EDT_SECTION_TITLES)
+    title = next(titles)
+    section_start = None
+    offset = 0
+    for num, line in enumerate(StringIO(text)):
+        if EDT_TABLE_HEADER not in sections and EDT_TABLE_HEADER in line:
+            sections[EDT_TABLE_HEADER] = EdtSection(num, None, offset, len(text))
+        if title is not None:
+            if title in line:
+                section_start = (num + 1, offset + len(line))
+            elif line == '\n' and section_start is not None:
+                sections[title] = EdtSection(section_start[0], num, section_start[1], offset)
+                title = next(titles, None)
+                section_start = None
+        offset += len(line)
+    return sections
+
+
+def _table_header(line):
+    return [name.strip() for name in line.rstrip('\r\n').split('\t')]
+
+
+def _release_station_and_date(df_red):
+    return df_red.loc["Station name", 1], df_red.loc["Balloon release date and time", 1]
+
+
+def _release_metadata(location, date_str):
+    meta_df = pd.DataFrame(
+        {'field': ['LOCATION', 'YEAR', 'MONTH', 'DAY', 'HOUR', 'MINT'],
+         'info': [location,
+                  int(date_str[0:4]),
+                  int(date_str[5:7]),
+                  int(date_str[8:10]),
+                  int(date_str[11:13]),
+                  int(date_str[14:16])
+                  ]})
+    meta_df = meta_df.set_index('field')
+    return meta_df
 
 
 class WesconRadiosonde(object):
     def __init__(self, infile):
         self.filename = os.path.split(infile)[1]
 
-        lines_to_end = 0
-        # Radiosonde data
-        with open(infile, encoding="ISO-8859-1") as edt_file:
-            for num, line in enumerate(edt_file, 1):
-                if 'Radiosonde data' in line:
-                    lines_to_skip = num
-                if line == '\n':
-                    lines_to_end = num - 1
-                    break
-        self.df_rad = pd.read_csv(infile, sep='\t', skiprows=lines_to_skip, nrows=lines_to_end - lines_to_skip,
-                                  header=None, index_col=0,
-                                  encoding="ISO-8859-1")
-        self.df_rad.index = self.df_rad.index.str.lstrip()
-        self.df_rad.index = self.df_rad.index.str.rstrip()
-
-        # Release data
         with open(infile, encoding="ISO-8859-1") as edt_file:
-            for num, line in enumerate(edt_file, 1):
-                if num <= lines_to_end + 1:
-                    continue
-                if 'Release data' in line:
-                    lines_to_skip = num
-                if line == '\n':
-                    lines_to_end = num - 1
-                    break
-        self.df_red = pd.read_csv(infile, sep='\t', skiprows=lines_to_skip, nrows=lines_to_end - lines_to_skip,
-                                  skip_blank_lines=False,
-                                  header=None, index_col=0,
-                                  encoding="ISO-8859-1")
-        self.df_red.index = self.df_red.index.str.lstrip()
-        self.df_red.index = self.df_red.index.str.rstrip()
+            text = edt_file.read()
+        sections = index_edt_sections(text)
+
+        self.df_rad = self._read_section(text, sections['Radiosonde data'])
+        self.df_red = self._read_section(text, sections['Release data'], skip_blank_lines=False)
         self.df_red = self.df_red[self.df_red.index != '']
+        self.df_sud = self._read_section(text, sections['Surface data'])
+        self.df_cad = self._read_section(text, sections['Calibration data'])
 
-        # Surface data
-        with open(infile, encoding="ISO-8859-1") as edt_file:
-            for num, line in enumerate(edt_file, 1):
-                if num <= lines_to_end + 1:
-                    continue
-                if 'Surface data' in line:
-                    lines_to_skip = num
-                if line == '\n':
-                    lines_to_end = num - 1
-                    break
-        self.df_sud = pd.read_csv(infile, sep='\t', skiprows=lines_to_skip, nrows=lines_to_end - lines_to_skip,
-                                  header=None, index_col=0,
-                                  encoding="ISO-8859-1")
-        self.df_sud.index = self.df_sud.index.str.lstrip()
-        self.df_sud.index = self.df_sud.index.str.rstrip()
-
-        # Calibration data
-        with open(infile, encoding="ISO-8859-1") as edt_file:
-            for num, line in enumerate(edt_file, 1):
-                if num <= lines_to_end + 1:
-                    continue
-                if 'Calibration data' in line:
-                    lines_to_skip = num
-                if line == '\n':
-                    lines_to_end = num - 1
-                    break
-        self.df_cad = pd.read_csv(infile, sep='\t', skiprows=lines_to_skip, nrows=lines_to_end - lines_to_skip,
-                                  header=None, index_col=0,
-                                  encoding="ISO-8859-1")
-        self.df_cad.index = self.df_cad.index.str.lstrip()
-        self.df_cad.index = self.df_cad.index.str.rstrip()
-
-        # Line header lookup
-        lookup = 'TimeUTC'
-
-        lines_to_skip = 0
-        with open(infile, encoding="ISO-8859-1") as edt_file:
-            for num, line in enumerate(edt_file, 1):
-                if lookup in line:
-                    lines_to_skip = num - 1
-                    break
-
-        self.df = pd.read_csv(infile, sep='\t', skiprows=lines_to_skip, encoding="ISO-8859-1",
-                              skipinitialspace=True).drop([0])
-        self.df.columns = self.df.columns.str.lstrip()
-        data_col_names = ["P", "Temp", "RH", "Dewp", "Speed", "Dir", "Ecomp", "Ncomp", "Lat", "Lon", "AscRate",
-                          "HeightMSL", "GpsHeightMSL", "PotTemp", "SpHum", "CompRng", "CompAz", "VirT", "SatVapP",
-                          "VapP", "MixR", "Den", "HeightGnd", "GpsHeightGnd", "HeightE", "Pm", "Pc", "Ddep", "PEPT",
-                          "SSpc", "RI", "MRI", "RIG", "ELR"]
-        self.df[data_col_names] = self.df[data_col_names].apply(pd.to_numeric, errors='coerce')
-        self.df.rename(columns={"P": "Pressure",
-                                "Temp": "Temperature",
-                                "Dewp": "Dewpoint",
-                                "Speed": "WindSpeed",
-                                "Dir": "WindDir"},
-                       inplace=True)
+        self.df = self._read_table(text[sections[EDT_TABLE_HEADER].start_offset:])
+        self.df.rename(columns=EDT_COLUMN_NAMES, inplace=True)
         self.sonde_model = None
         self.location = None
         self.date_str = None
         self.time_str = None
 
+    @staticmethod
+    def _read_section(text, section, **kwargs):
+        df = pd.read_csv(StringIO(text[section.start_offset:section.end_offset]), sep='\t', header=None, index_col=0,
+                         **kwargs)
+        df.index = df.index.str.strip()
+        return df
+
+    @staticmethod
+    def _read_table(table_text):
+        # The line after the header holds the units, which is skipped so that columns can be read with their type
+        header = _table_header(table_text[:table_text.find('\n')])
+        dtypes = {name: (np.float64 if name in EDT_NUMERIC_COLUMNS else str) for name in header}
+        try:
+            df = pd.read_csv(StringIO(table_text), sep='\t', skipinitialspace=True, skiprows=[1], dtype=dtypes)
+        except ValueError:
+            # Fall back to coercing any unreadable values in the numeric columns to NaN
+            df = pd.read_csv(StringIO(table_text), sep='\t', skipinitialspace=True, skiprows=[1], dtype=str)
+            numeric_columns = [name for name in EDT_NUMERIC_COLUMNS if name in df.columns]
+            df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce').astype(np.float64)
+        # Rows keep the numbering they had when the units line was read as the first row
+        df.index = pd.RangeIndex(1, len(df) + 1)
+        df.columns = df.columns.str.lstrip()
+        return df
+
     def get_metadata(self):
         # long_filename = self.filename
         # if self.filename[-4:] == ".txt":
@@ -112,35 +134,47 @@ class WesconRadiosonde(object):
         # self.date_str = filename_segments[2]
         # self.time_str = filename_segments[3]
 
-        self.location = self.df_red.loc["Station name", 1]
-        self.date_str = self.df_red.loc["Balloon release date and time", 1]
-
-        meta_df = pd.DataFrame(
-            {'field': ['LOCATION', 'YEAR', 'MONTH', 'DAY', 'HOUR', 'MINT'],
-             'info': [self.location,
-                      int(self.date_str[0:4]),
-                      int(self.date_str[5:7]),
-                      int(self.date_str[8:10]),
-                      int(self.date_str[11:13]),
-                      int(self.date_str[14:16])
-                      ]})
-        meta_df = meta_df.set_index('field')
-        return meta_df
-
-    def prune_data(self, prune_pressure_list):
-        # Collect rows as DataFrames instead of Series to preserve dtypes
-        rows = []
-        for prune_pressure in prune_pressure_list:
-            idx = (self.df['Pressure'] - prune_pressure).abs().idxmin()
-            rows.append(self.df.iloc[[idx]])  # Note the double brackets → keeps it as DataFrame
-
-        # Concatenate vertically, preserving dtypes
-        pruned_profile = pd.concat(rows, ignore_index=True)
-
-        # Drop duplicates properly
-        pruned_profile = pruned_profile.drop_duplicates(subset=['Pressure'])
-
-        return pruned_profile
+        self.location, self.date_str = _release_station_and_date(self.df_red)
+        return _release_metadata(self.location, self.date_str)
+
+    def prune_data(self, prune_pressure_list, **kwargs):
+        return prune_profile(self.df, 'Pressure', prune_pressure_list, **kwargs)
+
+
+class WesconRadiosondeFollower(SoundingFollower):
+    """
+    Follows an .edt file while the sounding is being received, reading the data table as it grows.
+    Chunks have a float64 field for each numeric column, named as in WesconRadiosonde.df.
+    The metadata sections are read once the table header has been written.
+    """
+    sep = '\t'
+    encoding = "ISO-8859-1"
+    column_names = EDT_COLUMN_NAMES
+
+    def __init__(self, infile):
+        super(WesconRadiosondeFollower, self).__init__(infile)
+        self.df_red = None
+
+    def _read_header(self, lines):
+        for num, line in enumerate(lines):
+            if EDT_TABLE_HEADER in line:
+                # The line after the header holds the units
+                if num + 2 > len(lines):
+                    return None
+                names = _table_header(line)
+                return names, [name for name in names if name in EDT_NUMERIC_COLUMNS], num + 2
+        return None
+
+    def _on_header(self, lines):
+        text = ''.join(lines)
+        self.df_red = WesconRadiosonde._read_section(text, index_edt_sections(text)['Release data'],
+                                                     skip_blank_lines=False)
+        self.df_red = self.df_red[self.df_red.index != '']
+
+    def get_metadata(self):
+        if self.df_red is None:
+            raise ValueError("The release data of the sounding has not been written yet")
+        return _release_metadata(*_release_station_and_date(self.df_red))
 
 
 if __name__ == '__main__':
@@ -1,10 +1,94 @@
 import sys
 import os
 import array
+import re
 import numpy as np
 import pandas as pd
 from io import StringIO
 
+from radiosonde.prune import prune_profile
+
+# Fields of a Vaisala .spf sounding record in file order: name, little-endian format and scale factor,
+# where None keeps the value as stored
+SPF_RECORD_FIELDS = (
+    ('elapsed_time_since_sonde_release', '<f4', None),
+    ('scaled_logarithmic_pressure', '<u2', 1 / 4096),
+    ('temperature', '<u2', 0.1),
+    ('humidity', '<u2', None),
+    ('north_component_of_wind', '<u2', 0.01),
+    ('east_component_of_wind', '<u2', 0.01),
+    ('altitude_above_mean_sea_level', '<u2', None),
+    ('pressure', '<u2', 0.1),
+    ('dew_point_temperature', '<u2', 0.1),
+    ('mixing_ratio', '<u2', 0.1),
+    ('wind_direction', '<u2', None),
+    ('wind_speed', '<u2', 0.1),
+    ('azimuth_to_the_sonde', '<u2', None),
+    ('horizontal_distance_to_the_sonde', '<u2', 100),
+    ('sonde_position_longitude', '<u2', 0.01),
+    ('sonde_position_latitude', '<u2', 0.01),
+    ('sond_calculated_significance_key', '<u2', None),
+    ('used_edited_recalculated_significance_key', '<u2', None),
+    ('radar_height', '<u2', None),
+)
+
+
+# Marks the start of each observation in a MetDB Temps_* file
+METDB_OBSERVATION_MARKER = ' Observation '
+# Lines of an observation block holding the metadata, and the first line of its level table
+METDB_METADATA_LINES = slice(3, 17)
+METDB_LEVELS_START = 19
+METDB_METADATA_SEPARATOR = re.compile('.  ')
+METDB_MISSING_VALUE = -9999999.00
+
+
+def _parse_metdb_block(block_lines):
+    # Metadata lines are "NAME.....  value", split as pd.read_table(sep='.  ') would
+    metadata_fields = [METDB_METADATA_SEPARATOR.split(line.strip(), maxsplit=1)
+                       for line in block_lines[METDB_METADATA_LINES]]
+    metadata_values = pd.Series([fields[1] if len(fields) > 1 else None for fields in metadata_fields])
+    try:
+        metadata_values = pd.to_numeric(metadata_values)
+    except (ValueError, TypeError):
+        pass
+    pd_metadata = pd.DataFrame({'info': metadata_values.values},
+                               index=[fields[0].replace('.', '') for fields in metadata_fields])
+
+    pd_sounding = pd.read_csv(StringIO(''.join(block_lines[METDB_LEVELS_START:])), sep=r'\s+', header=0,
+                              na_values=[METDB_MISSING_VALUE])
+    pd_sounding_names = {'lv': 'lv', 'lev': 'lev_id', 'id': 'PnPn', 'PnPn': 'hnhnhn', 'hnhnhn': 'TnTnTn',
+                         'TnTnTn': 'DnDn', 'DnDn': 'dndn', 'dndn': 'fnfnfn'}
+    pd_sounding = pd_sounding.iloc[:, :-1]
+    pd_sounding.rename(columns=pd_sounding_names, inplace=True)
+    return pd_metadata, pd_sounding
+
+
+def iter_metdb_observations(infile):
+    """
+    Reads the observations of a MetDB Temps_* file one at a time in a single pass over the file,
+    so that files with many stations are processed in constant memory
+    :param infile: path to the Temps_* file
+    :type infile: str
+    :return: generator of (metadata, sounding) DataFrames for each observation in the file
+    :rtype: generator
+    """
+    block_lines = []
+    # Number of lines of a block before its observation marker, taken from the first block in the file
+    marker_offset = None
+    with open(infile) as f:
+        for line in f:
+            if METDB_OBSERVATION_MARKER in line:
+                if marker_offset is None:
+                    marker_offset = len(block_lines)
+                else:
+                    next_block_start = len(block_lines) - marker_offset
+                    yield _parse_metdb_block(block_lines[:next_block_start])
+                    block_lines = block_lines[next_block_start:]
+            block_lines.append(line)
+    if marker_offset is None:
+        raise ValueError("No observations found in file!")
+    yield _parse_metdb_block(block_lines)
+
 
 class Radiosonde(object):
 
@@ -27,7 +111,7 @@ class Radiosonde(object):
         header = data[0:50]
         ident = data[50:246]
         syspar = data[246:8333]
-        sounding = data[8333:]
+        sounding = memoryview(data)[8333:]
 
         tab_1_header = array.array("B")
         tab_1_header.frombytes(header[0:20])
@@ -140,79 +224,23 @@ class Radiosonde(object):
         self.number_of_loran_c_chains_in_use = tab_2_bytes[38]
         self.unit_to_control_change_of_phase_integration_time = tab_2_bytes[39]
 
-        df_obj = pd.DataFrame(columns=['elapsed_time_since_sonde_release',
-                                       'scaled_logarithmic_pressure',
-                                       'temperature',
-                                       'humidity',
-                                       'north_component_of_wind',
-                                       'east_component_of_wind',
-                                       'altitude_above_mean_sea_level',
-                                       'pressure',
-                                       'dew_point_temperature',
-                                       'mixing_ratio',
-                                       'wind_direction',
-                                       'wind_speed',
-                                       'azimuth_to_the_sonde',
-                                       'horizontal_distance_to_the_sonde',
-                                       'sonde_position_longitude',
-                                       'sonde_position_latitude',
-                                       'sond_calculated_significance_key',
-                                       'used_edited_recalculated_significance_key',
-                                       'radar_height'])
-
-        for idx in range(self.number_of_data_records + 25):
-            row_pos = self.length_of_data_record_in_bytes * idx
-            data_floats = array.array("f")
-            data_floats.frombytes(sounding[row_pos + 0:row_pos + 4])
-            data_ints = array.array("H")
-            data_ints.frombytes(sounding[row_pos + 4:row_pos + 40])
-            if endianness == 'big':
-                data_floats.byteswap()
-                data_ints.byteswap()
-
-            row_dict = {'elapsed_time_since_sonde_release': data_floats[0],
-                        'scaled_logarithmic_pressure': data_ints[0] / 4096,
-                        'temperature': data_ints[1] * 0.1,
-                        'humidity': data_ints[2],
-                        'north_component_of_wind': data_ints[3] * 0.01,
-                        'east_component_of_wind': data_ints[4] * 0.01,
-                        'altitude_above_mean_sea_level': data_ints[5],
-                        'pressure': data_ints[6] * 0.1,
-                        'dew_point_temperature': data_ints[7] * 0.1,
-                        'mixing_ratio': data_ints[8] * 0.1,
-                        'wind_direction': data_ints[9],
-                        'wind_speed': data_ints[10] * 0.1,
-                        'azimuth_to_the_sonde': data_ints[11],
-                        'horizontal_distance_to_the_sonde': data_ints[12] * 100,
-                        'sonde_position_longitude': data_ints[13] * 0.01,
-                        'sonde_position_latitude': data_ints[14] * 0.01,
-                        'sond_calculated_significance_key': data_ints[15],
-                        'used_edited_recalculated_significance_key': data_ints[16],
-                        'radar_height': data_ints[17]}
-            df_obj = df_obj.append(row_dict, ignore_index=True)
+        # Records are little-endian, mapped in place over the sounding block and copied once into the DataFrame
+        record_dtype = np.dtype({'names': [name for name, _, _ in SPF_RECORD_FIELDS],
+                                 'formats': [field_format for _, field_format, _ in SPF_RECORD_FIELDS],
+                                 'itemsize': self.length_of_data_record_in_bytes})
+        number_of_records = min(self.number_of_data_records + 25,
+                                len(sounding) // self.length_of_data_record_in_bytes)
+        records = np.frombuffer(sounding, dtype=record_dtype, count=number_of_records)
 
-        self.sounding_data = df_obj
+        columns = {}
+        for name, _, scale in SPF_RECORD_FIELDS:
+            columns[name] = records[name].astype(np.float64 if records.dtype[name].kind == 'f' else np.int64)
+            if scale is not None:
+                columns[name] = columns[name] * scale
+        self.sounding_data = pd.DataFrame(columns)
 
     def _from_tsv(self, infile):
-        col_names = ['elapsed_time_since_sonde_release',
-                     'scaled_logarithmic_pressure',
-                     'temperature',
-                     'humidity',
-                     'north_component_of_wind',
-                     'east_component_of_wind',
-                     'altitude_above_mean_sea_level',
-                     'pressure',
-                     'dew_point_temperature',
-                     'mixing_ratio',
-                     'wind_direction',
-                     'wind_speed',
-                     'azimuth_to_the_sonde',
-                     'horizontal_distance_to_the_sonde',
-                     'sonde_position_longitude',
-                     'sonde_position_latitude',
-                     'sond_calculated_significance_key',
-                     'used_edited_recalculated_significance_key',
-                     'radar_height']
+        col_names = [name for name, _, _ in SPF_RECORD_FIELDS]
         df_obj = pd.read_csv(infile, sep='\t', header=1, names=col_names, skiprows=42, index_col=False)
         df_obj['scaled_logarithmic_pressure'] = df_obj['scaled_logarithmic_pressure'] / 4096
         df_obj.replace({-32768: np.nan}, inplace=True)
@@ -229,50 +257,20 @@ class RadiosondeMetDB(object):
             raise ValueError("Wrong file format!")
 
     def _read_metdb(self, infile):
-        with open(infile) as f:
-            all_text = f.read()
-            f.close()
-        final_observation_idx = all_text.rfind(' Observation    ')
-        if final_observation_idx == -1:
-            raise ValueError("No observations found in file!")
-        self.max_observations = int(all_text[final_observation_idx + 16])
-
         self.metadata_list = []
         self.sounding_list = []
-        for i in range(self.max_observations):
-            with open(infile) as f:
-                metadata_lines = f.readlines()[121 * i + 3:121 * i + 17]
-                metadata_lines = ''.join(metadata_lines)
-                f.seek(0)
-                data_lines = f.readlines()[121 * i + 19:121 * i + 121]
-                data_lines = ''.join(data_lines)
-                meta_data = StringIO(metadata_lines)
-                data_data = StringIO(data_lines)
-                f.close()
-            pd_metadata = pd.read_table(meta_data, sep='.  ', index_col=0, header=None, engine='python')
-            pd_metadata.index = [header.replace('.', '') for header in pd_metadata.index]
-            pd_metadata.rename(columns={1: 'info'}, inplace=True)
-            pd_sounding = pd.read_table(data_data, delim_whitespace=True, header=0)
-            pd_sounding_names = {'lv': 'lv', 'lev': 'lev_id', 'id': 'PnPn', 'PnPn': 'hnhnhn', 'hnhnhn': 'TnTnTn',
-                                 'TnTnTn': 'DnDn', 'DnDn': 'dndn', 'dndn': 'fnfnfn'}
-            pd_sounding = pd_sounding.iloc[:, :-1]
-            pd_sounding.rename(columns=pd_sounding_names, inplace=True)
-            pd_sounding.replace({-9999999.00: np.nan}, inplace=True)
+        for pd_metadata, pd_sounding in iter_metdb_observations(infile):
             self.metadata_list.append(pd_metadata)
             self.sounding_list.append(pd_sounding)
+        self.max_observations = len(self.sounding_list)
 
     def get_datacols_no_na(self, obs_num, cols):
         selected_metadata = self.metadata_list[obs_num - 1]
         selected_profile = self.sounding_list[obs_num - 1].dropna(subset=cols)
         return selected_metadata, selected_profile
 
-    def prune_data(self, prune_pressure_list, selected_profile):
-        pruned_profile = pd.DataFrame()
-        for prune_pressure in prune_pressure_list:
-            idx = selected_profile['PnPn'].sub(prune_pressure).abs().argmin()
-            pruned_profile = pruned_profile.append(selected_profile.iloc[idx], ignore_index=True)
-        pruned_profile.drop_duplicates(subset=['PnPn'])
-        return pruned_profile
+    def prune_data(self, prune_pressure_list, selected_profile, **kwargs):
+        return prune_profile(selected_profile, 'PnPn', prune_pressure_list, **kwargs)
 
 
 if __name__ == '__main__':
@@ -2,6 +2,8 @@ import pandas as pd
 from datetime import datetime
 from siphon.simplewebservice.wyoming import WyomingUpperAir
 
+from radiosonde.prune import prune_profile
+
 
 class WyomingUpperAirSonde(object):
     def __init__(self, date, station):
@@ -33,13 +35,8 @@ class WyomingUpperAirSonde(object):
         meta_df = meta_df.set_index('field')
         return meta_df
 
-    def prune_data(self, prune_pressure_list):
-        pruned_profile = pd.DataFrame()
-        for prune_pressure in prune_pressure_list:
-            idx = self.df['pressure'].sub(prune_pressure).abs().argmin()
-            pruned_profile = pruned_profile.append(self.df.iloc[idx], ignore_index=True)
-        pruned_profile.drop_duplicates(subset=['pressure'])
-        return pruned_profile
+    def prune_data(self, prune_pressure_list, **kwargs):
+        return prune_profile(self.df, 'pressure', prune_pressure_list, **kwargs)
 
 
 if __name__ == '__main__':
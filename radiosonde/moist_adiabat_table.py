@@ -0,0 +1,212 @@
+import os
+import threading
+import warnings
+
+import numpy as np
+
+import constants.thermodynamics as therm_consts
+from radiosonde.calc_moist_adiabat import moist_adiabat_lapse_rate, moist_adiabats
+
+# Envelope of the thermodynamic diagrams covered by the tables
+TABLE_MIN_PRESSURE = 50.0  # hPa
+TABLE_MAX_PRESSURE = 1050.0  # hPa
+TABLE_MIN_TEMPERATURE = -90.0  # degC
+TABLE_MAX_TEMPERATURE = 70.0  # degC
+TABLE_PRESSURE_NODES = 512
+TABLE_TEMPERATURE_STEP = 0.25  # degC
+# Bump when the table layout or the integration changes, so that stale files on disk are rebuilt
+TABLE_VERSION = 1
+
+TABLE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lookup')
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _bolton_lapse_rate(pressure, temperature):
+    """Lapse rate of `calc_wetbulb.moist_lapse` converted to degC per hPa."""
+    # Imported here as calc_wetbulb builds on these tables
+    from radiosonde.calc_wetbulb import moist_lapse_rate
+    return 100.0 * moist_lapse_rate(100.0 * np.asarray(pressure),
+                                    np.asarray(temperature) + therm_consts.CONST_KELVIN)
+
+
+# Saturation vapour pressure formulations a table can be built for
+LAPSE_RATES = {
+    # Clausius-Clapeyron with a constant latent heat, as drawn on the diagrams
+    'clausius_clapeyron': moist_adiabat_lapse_rate,
+    # Bolton (1980), as used for the wet-bulb temperatures in calc_wetbulb
+    'bolton': _bolton_lapse_rate,
+}
+
+
+def _bilinear(table, x_nodes, y_nodes, x, y):
+    """Interpolates a table on evenly spaced nodes, returning NaN outside the nodes."""
+    x_index = (x - x_nodes[0]) / (x_nodes[1] - x_nodes[0])
+    y_index = (y - y_nodes[0]) / (y_nodes[1] - y_nodes[0])
+    outside = ~((x_index >= 0) & (x_index <= x_nodes.size - 1) & (y_index >= 0) & (y_index <= y_nodes.size - 1))
+    x_index = np.where(outside, 0.0, x_index)
+    y_index = np.where(outside, 0.0, y_index)
+
+    x_low = np.minimum(x_index.astype(int), x_nodes.size - 2)
+    y_low = np.minimum(y_index.astype(int), y_nodes.size - 2)
+    x_fraction = x_index - x_low
+    y_fraction = y_index - y_low
+    values = ((1 - x_fraction) * ((1 - y_fraction) * table[x_low, y_low] + y_fraction * table[x_low, y_low + 1])
+              + x_fraction * ((1 - y_fraction) * table[x_low + 1, y_low] + y_fraction * table[x_low + 1, y_low + 1]))
+    return np.where(outside, np.nan, values)
+
+
+class MoistAdiabatTable(object):
+    """Precomputed pseudo-adiabats for looking up adiabats and wet-bulb temperatures by interpolation.
+
+    Two tables are held on a shared grid of pressures evenly spaced in log-pressure:
+    the temperature T(theta_w, p) of the adiabat labelled by its wet-bulb potential temperature
+    theta_w (its temperature at 1000 hPa), and the inverse theta_w(p, T).
+    Both use degC and hPa, and lookups outside the envelope return NaN.
+
+    Use `get_moist_adiabat_table` rather than building tables directly, so that a table is
+    only computed once and is shared through the file in `TABLE_DIRECTORY`.
+    """
+
+    def __init__(self, log_pressures, theta_w_nodes, temperatures, temperature_nodes, theta_w):
+        self.log_pressures = log_pressures
+        self.theta_w_nodes = theta_w_nodes
+        self.temperatures = temperatures
+        self.temperature_nodes = temperature_nodes
+        self.theta_w_table = theta_w
+
+    @classmethod
+    def build(cls, lapse_rate=moist_adiabat_lapse_rate):
+        """Integrate the adiabats making up a table.
+
+        Parameters
+        ----------
+        lapse_rate : Function of pressure in hPa and temperature in degC returning dT/dp in degC per hPa
+
+        Returns
+        -------
+        MoistAdiabatTable
+        """
+        log_pressures = np.linspace(np.log(TABLE_MIN_PRESSURE), np.log(TABLE_MAX_PRESSURE), TABLE_PRESSURE_NODES)
+        steps = int(round((TABLE_MAX_TEMPERATURE - TABLE_MIN_TEMPERATURE) / TABLE_TEMPERATURE_STEP))
+        theta_w_nodes = np.linspace(TABLE_MIN_TEMPERATURE, TABLE_MAX_TEMPERATURE, steps + 1)
+        temperature_nodes = theta_w_nodes.copy()
+
+        temperatures = moist_adiabats(np.exp(log_pressures), theta_w_nodes, reference_pressure=therm_consts.CONST_P0,
+                                      max_step=0.01, lapse_rate=lapse_rate)
+
+        # Adiabats never cross, so each pressure column increases monotonically with theta_w and can be inverted
+        theta_w = np.empty((temperature_nodes.size, log_pressures.size))
+        for column in range(log_pressures.size):
+            theta_w[:, column] = np.interp(temperature_nodes, temperatures[:, column], theta_w_nodes,
+                                           left=np.nan, right=np.nan)
+
+        # Single precision is well within the interpolation error and halves the size of the file
+        return cls(log_pressures, theta_w_nodes, temperatures.astype(np.float32), temperature_nodes,
+                   theta_w.astype(np.float32))
+
+    @staticmethod
+    def _signature(lapse_rate_name):
+        return np.array([TABLE_VERSION, TABLE_MIN_PRESSURE, TABLE_MAX_PRESSURE, TABLE_PRESSURE_NODES,
+                         TABLE_MIN_TEMPERATURE, TABLE_MAX_TEMPERATURE, TABLE_TEMPERATURE_STEP,
+                         therm_consts.CONST_KELVIN, therm_consts.CONST_CP_AIR, therm_consts.CONST_P0,
+                         therm_consts.CONST_GAS_CONST_AIR, therm_consts.CONST_ES0, therm_consts.CONST_GAS_CONST_VAP,
+                         therm_consts.CONST_LATENT_HEAT_VAP_WATER, therm_consts.CONST_EPSILON,
+                         sorted(LAPSE_RATES).index(lapse_rate_name)], dtype=float)
+
+    @classmethod
+    def load(cls, path, lapse_rate_name):
+        """Read a table written by `save`, returning None if it is missing or was built with other settings."""
+        try:
+            with np.load(path) as data:
+                if not np.array_equal(data['signature'], cls._signature(lapse_rate_name)):
+                    return None
+                return cls(data['log_pressures'], data['theta_w_nodes'], data['temperatures'],
+                           data['temperature_nodes'], data['theta_w'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path, lapse_rate_name):
+        """Write the table to `path`, replacing any existing file in one step."""
+        temporary_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez_compressed(temporary_path, signature=self._signature(lapse_rate_name),
+                            log_pressures=self.log_pressures, theta_w_nodes=self.theta_w_nodes,
+                            temperatures=self.temperatures, temperature_nodes=self.temperature_nodes,
+                            theta_w=self.theta_w_table)
+        os.replace(temporary_path, path)
+
+    def temperature(self, theta_w, pressure):
+        """Calculate the temperature along moist adiabats.
+
+        Parameters
+        ----------
+        theta_w : Wet-bulb potential temperature of the adiabat in degC
+        pressure : Pressure in hPa
+
+        Returns
+        -------
+        Temperature in degC, broadcast over the inputs
+        """
+        theta_w, log_pressure = np.broadcast_arrays(np.asarray(theta_w, dtype=float),
+                                                    np.log(np.asarray(pressure, dtype=float)))
+        return _bilinear(self.temperatures, self.theta_w_nodes, self.log_pressures, theta_w, log_pressure)
+
+    def theta_w(self, pressure, temperature):
+        """Calculate the wet-bulb potential temperature of the moist adiabat through a point.
+
+        Parameters
+        ----------
+        pressure : Pressure in hPa
+        temperature : Temperature in degC
+
+        Returns
+        -------
+        Wet-bulb potential temperature in degC, broadcast over the inputs
+        """
+        temperature, log_pressure = np.broadcast_arrays(np.asarray(temperature, dtype=float),
+                                                        np.log(np.asarray(pressure, dtype=float)))
+        return _bilinear(self.theta_w_table, self.temperature_nodes, self.log_pressures, temperature, log_pressure)
+
+    def moist_lapse(self, pressure, temperature, reference_pressure):
+        """Calculate the temperature of saturated parcels lifted or lowered along moist adiabats.
+
+        Parameters
+        ----------
+        pressure : Pressure in hPa the parcels are taken to
+        temperature : Starting temperature in degC
+        reference_pressure : Starting pressure in hPa
+
+        Returns
+        -------
+        Temperature in degC, broadcast over the inputs
+        """
+        return self.temperature(self.theta_w(reference_pressure, temperature), pressure)
+
+
+def get_moist_adiabat_table(lapse_rate_name='clausius_clapeyron'):
+    """Return the moist adiabat table for a saturation vapour pressure formulation.
+    The table is read from `TABLE_DIRECTORY` on first use, or built and written there if the file
+    is missing or out of date, and is then kept in memory for the rest of the process.
+
+    Parameters
+    ----------
+    lapse_rate_name : Key of `LAPSE_RATES`, defaults to the formulation used on the diagrams
+
+    Returns
+    -------
+    MoistAdiabatTable
+    """
+    with _tables_lock:
+        table = _tables.get(lapse_rate_name)
+        if table is None:
+            path = os.path.join(TABLE_DIRECTORY, f'moist_adiabat_table_{lapse_rate_name}.npz')
+            table = MoistAdiabatTable.load(path, lapse_rate_name)
+            if table is None:
+                table = MoistAdiabatTable.build(LAPSE_RATES[lapse_rate_name])
+                try:
+                    table.save(path, lapse_rate_name)
+                except OSError as error:
+                    warnings.warn(f'Could not save moist adiabat table to {path}: {error}')
+            _tables[lapse_rate_name] = table
+    return table
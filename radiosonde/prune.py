@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+
+def _nearest_rows(sorted_pressures, order, target_pressures):
+    """Rows holding the pressure nearest each target, taking the first such row as argmin does."""
+    upper = np.clip(np.searchsorted(sorted_pressures, target_pressures), 0, sorted_pressures.size - 1)
+    lower = np.clip(upper - 1, 0, sorted_pressures.size - 1)
+    lower_distance = np.abs(target_pressures - sorted_pressures[lower])
+    upper_distance = np.abs(target_pressures - sorted_pressures[upper])
+
+    # The stable sort puts the first row of any repeated pressure at the start of its run
+    first_lower = order[np.searchsorted(sorted_pressures, sorted_pressures[lower], side='left')]
+    first_upper = order[np.searchsorted(sorted_pressures, sorted_pressures[upper], side='left')]
+    return np.where(lower_distance < upper_distance, first_lower,
+                    np.where(upper_distance < lower_distance, first_upper, np.minimum(first_lower, first_upper)))
+
+
+def _interpolated_profile(profile, pressure_column, sorted_pressures, order, target_pressures, circular_columns):
+    inside = (target_pressures >= sorted_pressures[0]) & (target_pressures <= sorted_pressures[-1])
+    target_pressures = target_pressures[inside]
+    log_pressures = np.log(sorted_pressures)
+    log_targets = np.log(target_pressures)
+
+    # Columns that cannot be interpolated are taken from the nearest level
+    pruned_profile = profile.iloc[_nearest_rows(sorted_pressures, order, target_pressures)].reset_index(drop=True)
+    for column in profile.columns:
+        if column == pressure_column or not pd.api.types.is_numeric_dtype(profile[column]):
+            continue
+        values = profile[column].to_numpy(dtype=np.float64)[order]
+        if column in circular_columns:
+            radians = np.deg2rad(values)
+            sines = np.interp(log_targets, log_pressures, np.sin(radians))
+            cosines = np.interp(log_targets, log_pressures, np.cos(radians))
+            pruned_profile[column] = np.rad2deg(np.arctan2(sines, cosines)) % 360
+        else:
+            pruned_profile[column] = np.interp(log_targets, log_pressures, values)
+    pruned_profile[pressure_column] = target_pressures
+    return pruned_profile
+
+
+def prune_profile(profile, pressure_column, target_pressures=None, mode='nearest', spacing=None,
+                  circular_columns=()):
+    """Select a subset of the levels of a sounding, such as the levels to draw wind barbs at.
+    The pressures are sorted once, and all the targets are then found with a single binary search.
+
+    Parameters
+    ----------
+    profile : DataFrame with one row per level
+    pressure_column : Name of the pressure column
+    target_pressures : Pressures to select levels at, not needed with ``mode='spacing'``
+    mode : How levels are selected
+        'nearest' takes the level with the nearest pressure to each target, the first such level
+        if there are several;
+        'interpolate' interpolates the numeric columns linearly in log-pressure to each target inside
+        the profile, taking other columns from the nearest level;
+        'spacing' takes the levels nearest to a grid of pressures every ``spacing`` from the highest
+        pressure in the profile.
+    spacing : Pressure interval between selected levels with ``mode='spacing'``
+    circular_columns : Columns of angles in degrees, such as wind direction, that are interpolated
+        as unit vectors with ``mode='interpolate'``
+
+    Returns
+    -------
+    DataFrame of the selected levels in the order of the targets, with a fresh index and the column
+    types of `profile`. Levels selected for more than one target are only returned once.
+    """
+    pressures = profile[pressure_column].to_numpy(dtype=np.float64)
+    valid_rows = np.flatnonzero(np.isfinite(pressures))
+    order = valid_rows[np.argsort(pressures[valid_rows], kind='stable')]
+    sorted_pressures = pressures[order]
+
+    if mode == 'spacing':
+        if spacing is None or spacing <= 0:
+            raise ValueError("A positive spacing is needed to prune by spacing")
+        if not sorted_pressures.size:
+            return profile.iloc[[]].reset_index(drop=True)
+        target_pressures = np.arange(sorted_pressures[-1], sorted_pressures[0], -spacing)
+    target_pressures = np.asarray(target_pressures, dtype=np.float64).ravel()
+    target_pressures = target_pressures[np.isfinite(target_pressures)]
+    if not sorted_pressures.size or not target_pressures.size:
+        return profile.iloc[[]].reset_index(drop=True)
+
+    if mode in ('nearest', 'spacing'):
+        rows = _nearest_rows(sorted_pressures, order, target_pressures)
+        pruned_profile = profile.iloc[rows].reset_index(drop=True)
+    elif mode == 'interpolate':
+        pruned_profile = _interpolated_profile(profile, pressure_column, sorted_pressures, order, target_pressures,
+                                               circular_columns)
+    else:
+        raise ValueError(f"Unknown pruning mode '{mode}', expected 'nearest', 'interpolate' or 'spacing'")
+
+    return pruned_profile.drop_duplicates(subset=[pressure_column], ignore_index=True)
+
+
+def _douglas_peucker(x_points, y_points):
+    """Flags the points a Douglas-Peucker simplification with a tolerance of 1 keeps, measured to each segment."""
+    keep = np.zeros(x_points.size, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, x_points.size - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment_x, segment_y = x_points[end] - x_points[start], y_points[end] - y_points[start]
+        offsets_x = x_points[start + 1:end] - x_points[start]
+        offsets_y = y_points[start + 1:end] - y_points[start]
+        segment_length2 = segment_x * segment_x + segment_y * segment_y
+        if segment_length2 > 0:
+            fractions = np.clip((offsets_x * segment_x + offsets_y * segment_y) / segment_length2, 0, 1)
+            offsets_x = offsets_x - fractions * segment_x
+            offsets_y = offsets_y - fractions * segment_y
+        distances2 = offsets_x * offsets_x + offsets_y * offsets_y
+        farthest = np.argmax(distances2)
+        if distances2[farthest] > 1:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def decimate_profile(pressures, temperatures, temperature_tolerance=0.1, pressure_tolerance=0.002):
+    """Select the levels of a high-resolution sounding needed to draw it within a tolerance, such as for
+    plotting 1-2 Hz soundings. The levels are simplified with the Douglas-Peucker algorithm in temperature and
+    log-pressure, the coordinates every diagram is close to linear in, so the significant levels and
+    inflection points of the profile are kept.
+
+    Parameters
+    ----------
+    pressures : Pressures of the levels
+    temperatures : Temperatures of the levels in degC or K
+    temperature_tolerance : Largest temperature difference between a dropped level and the simplified profile
+    pressure_tolerance : Largest pressure difference between a dropped level and the simplified profile,
+        as a fraction of the pressure of the level
+
+    Returns
+    -------
+    Indices of the selected levels in ascending order. The first and last level of every run of valid levels
+    are always selected, as are levels with missing values so that gaps in the profile are kept.
+    """
+    pressures, temperatures = np.asarray(pressures, dtype=np.float64), np.asarray(temperatures, dtype=np.float64)
+    if pressures.shape != temperatures.shape:
+        raise ValueError("Pressures and temperatures must have the same shape")
+    if temperature_tolerance <= 0 or pressure_tolerance <= 0:
+        raise ValueError("Tolerances must be positive")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Measured in units of the tolerances, a dropped level lies within a distance of 1
+        x_points = temperatures / temperature_tolerance
+        y_points = np.log(pressures) / np.log1p(pressure_tolerance)
+    valid = np.isfinite(x_points) & np.isfinite(y_points)
+    keep = ~valid
+
+    # Each run of valid levels between missing values is simplified on its own
+    run_edges = np.flatnonzero(np.diff(np.concatenate(([False], valid, [False])).astype(np.int8)))
+    for start, end in zip(run_edges[::2], run_edges[1::2]):
+        keep[start:end] = _douglas_peucker(x_points[start:end], y_points[start:end])
+    return np.flatnonzero(keep)
@@ -0,0 +1,66 @@
+import os
+import threading
+import types
+
+STATION_LOOKUP_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lookup',
+                                       'SondeStations.txt')
+
+# Station names read from each lookup file, with the size and modification time they were read at
+_station_tables = {}
+_station_tables_lock = threading.Lock()
+
+
+def _read_station_file(filepath):
+    """Reads lines of 'WMO id name' into a dict, with underscores in the names replaced by spaces."""
+    station_names = {}
+    with open(filepath) as f:
+        for line in f:
+            fields = line.split(' ', 1)
+            if len(fields) == 2 and fields[0]:
+                station_names[fields[0]] = fields[1].strip().replace('_', ' ')
+    return types.MappingProxyType(station_names)
+
+
+def get_station_names(filepath=STATION_LOOKUP_FILEPATH):
+    """
+    Returns the station names of a lookup file, shared by the whole process.
+    The file is read on first use and read again only when its size or modification time changes.
+
+    Parameters
+    ----------
+    filepath : Station lookup file, defaults to the one in the package's lookup directory
+
+    Returns
+    -------
+    Read-only mapping of WMO station id, e.g. '03005', to station name, or None if the file does not exist
+    """
+    try:
+        file_stat = os.stat(filepath)
+    except OSError:
+        return None
+    signature = (file_stat.st_size, file_stat.st_mtime_ns)
+    with _station_tables_lock:
+        cached = _station_tables.get(filepath)
+        if cached is None or cached[0] != signature:
+            cached = (signature, _read_station_file(filepath))
+            _station_tables[filepath] = cached
+    return cached[1]
+
+
+def get_station_name(station_id, filepath=STATION_LOOKUP_FILEPATH):
+    """
+    Looks up the name of a radiosonde station.
+
+    Parameters
+    ----------
+    station_id : Five digit WMO station id, e.g. '03005'
+    filepath : Station lookup file, defaults to the one in the package's lookup directory
+
+    Returns
+    -------
+    Station name, or None if the lookup file does not exist. Raises KeyError for an unknown station.
+    """
+    station_names = get_station_names(filepath)
+    if station_names is None:
+        return None
+    return station_names[station_id]
@@ -1,7 +1,55 @@
-import sys
-import array
 import numpy as np
 
+# Header fields of an AutoSat .dat file, which is big-endian: name, format and byte offset
+AUTOSAT_HEADER_FIELDS = (
+    ('filesize', '>i4', 0),
+    ('max_data_recs', '>i4', 4),
+    ('max_rec_len', '>i2', 8),
+    ('max_data_rec_len_used', '>i4', 10),
+    ('num_data_recs_used', '>i2', 14),
+    ('head_size', '>i2', 16),
+    ('num_head_recs', '>i2', 18),
+    ('datetime_mod', ('>i2', 6), 20),
+    ('expiry_time', ('>i4', 2), 32),
+    ('prod_ident', '>i2', 72),
+    ('sat_ident', ('>i2', 10), 74),
+    ('channel', ('>i2', 10), 94),
+    ('trans_id', ('>i2', 10), 114),
+    ('obs_time', ('>i2', 60), 134),
+    ('nom_dt', ('>i2', 10), 254),
+    ('ysize', '>i2', 274),
+    ('xsize', '>i2', 276),
+    # Overlaps xsize, as in the original layout
+    ('miss_data_flag', ('>i2', 11), 276),
+    ('img_desc', ('u1', 18), 300),
+    ('prod_nom_dt', '>i2', 318),
+    ('projection', '>i4', 320),
+    ('hemisphere', '>i4', 324),
+    ('down_long', '>i4', 328),
+    ('tl_lat', '>i4', 332),
+    ('tl_long', '>i4', 336),
+    ('bl_lat', '>i4', 340),
+    ('bl_long', '>i4', 344),
+    ('br_lat', '>i4', 348),
+    ('br_long', '>i4', 352),
+    ('tr_lat', '>i4', 356),
+    ('tr_long', '>i4', 360),
+    ('img_type', ('u1', 2), 400),
+    ('pixratio', '>i2', 402),
+    ('bits_per_pixel', '>i2', 404),
+    ('raw_data_info', '>i2', 406),
+    ('cal_info', ('>i2', 10), 408),
+    ('map_background', ('u1', 20), 428),
+    ('compress_technique', '>i2', 448),
+    ('compress_params', ('>i2', 10), 450),
+    ('comp_ind', '>i2', 470),
+)
+AUTOSAT_HEADER_TEXT_FIELDS = ('img_desc', 'img_type', 'map_background')
+AUTOSAT_HEADER_DTYPE = np.dtype({'names': [name for name, _, _ in AUTOSAT_HEADER_FIELDS],
+                                 'formats': [field_format for _, field_format, _ in AUTOSAT_HEADER_FIELDS],
+                                 'offsets': [offset for _, _, offset in AUTOSAT_HEADER_FIELDS],
+                                 'itemsize': 570})
+
 
 class AutoSat(object):
 
@@ -9,87 +57,34 @@ class AutoSat(object):
         self._from_dat(infile)
 
     def _from_dat(self, infile):
-        with open(infile, "rb") as f:
-            data = f.read()
-        f.close()
-
-        # Check system endianness
-        endianness = sys.byteorder
-
-        header = data[0:570]
-
-        tab_header_bytes = array.array("B")
-        tab_header_ints = array.array("h")
-        tab_header_longs = array.array("i")
-
-        tab_header_bytes.frombytes(
-            header[40:72] + header[300:318] + header[364:402] + header[428:448] + header[472:570])
-
-        tab_header_ints.frombytes(
-            header[8:10] + header[14:32] + header[72:300] + header[318:320] + header[402:428] + header[448:472])
-
-        tab_header_longs.frombytes(
-            header[0:4] + header[4:8] + header[10:14] + header[32:40] + header[320:364])
-
-        if endianness == 'little':
-            tab_header_bytes.byteswap()
-            tab_header_ints.byteswap()
-            tab_header_longs.byteswap()
-
-        self.filesize = tab_header_longs[0]
-        self.max_data_recs = tab_header_longs[1]
-        self.max_rec_len = tab_header_ints[0]
-        self.num_data_recs_used = tab_header_ints[1]
-        self.max_data_rec_len_used = tab_header_longs[2]
-        self.head_size = tab_header_ints[2]
-        self.num_head_recs = tab_header_ints[3]
-        self.datetime_mod = tab_header_ints[4:10]
-        self.expiry_time = tab_header_longs[3:5]
-        # self.spare = tab_header_bytes[0:32]
-        self.prod_ident = tab_header_ints[10]
-        self.sat_ident = tab_header_ints[11:21]
-        self.channel = tab_header_ints[21:31]
-        self.trans_id = tab_header_ints[31:41]
-        self.obs_time = tab_header_ints[41:101]
-        self.nom_dt = tab_header_ints[101:111]
-        self.ysize = tab_header_ints[111]
-        self.xsize = tab_header_ints[112]
-        self.miss_data_flag = tab_header_ints[112:123]
-        self.img_desc = tab_header_bytes[32:50].tobytes()
-        self.prod_nom_dt = tab_header_ints[124]
-        self.projection = tab_header_longs[5]
-        self.hemisphere = tab_header_longs[6]
-        self.down_long = tab_header_longs[7]
-        self.tl_lat = tab_header_longs[8]
-        self.tl_long = tab_header_longs[9]
-        self.bl_lat = tab_header_longs[10]
-        self.bl_long = tab_header_longs[11]
-        self.br_lat = tab_header_longs[12]
-        self.br_long = tab_header_longs[13]
-        self.tr_lat = tab_header_longs[14]
-        self.tr_long = tab_header_longs[15]
-        # self.spare = tab_header_bytes[50:86]
-        self.img_type = tab_header_bytes[86:88].tobytes()
-        self.pixratio = tab_header_ints[125]
-        self.bits_per_pixel = tab_header_ints[126]
-        self.raw_data_info = tab_header_ints[127]
-        self.cal_info = tab_header_ints[128:138]
-        self.map_background = tab_header_bytes[88:108].tobytes()
-        self.compress_technique = tab_header_ints[138]
-        self.compress_params = tab_header_ints[139:149]
-        self.comp_ind = tab_header_ints[149]
-        # self.spare = tab_header_bytes[108:206]
+        # The file is only mapped, pixels are read from disk when the image is accessed
+        self._file_map = np.memmap(infile, dtype=np.uint8, mode='r')
+        header = self._file_map[:AUTOSAT_HEADER_DTYPE.itemsize].view(AUTOSAT_HEADER_DTYPE)[0]
+
+        for name in AUTOSAT_HEADER_DTYPE.names:
+            value = header[name]
+            if name in AUTOSAT_HEADER_TEXT_FIELDS:
+                value = value.tobytes()
+            elif value.ndim:
+                value = value.astype(value.dtype.newbyteorder('='))
+            else:
+                value = int(value)
+            setattr(self, name, value)
 
         if self.num_head_recs == 1:
-            pad_bytes = self.max_rec_len - 570
+            image_offset = self.max_rec_len
         else:
-            pad_bytes = 2 * self.max_rec_len - 570
-        image = data[570 + pad_bytes:]
-
-        sat_image_block = array.array("B")
-        sat_image_block.frombytes(image)
-        sat_image_block.byteswap()
-        self.sat_image = np.array(sat_image_block[:]).reshape((self.ysize, self.xsize))
+            image_offset = 2 * self.max_rec_len
+        # Image lines are stored one after another, or one per data record when records are padded
+        image_bytes = self._file_map.size - image_offset
+        if image_bytes >= self.ysize * self.max_rec_len > self.ysize * self.xsize:
+            line_stride = self.max_rec_len
+        else:
+            line_stride = self.xsize
+        if self.ysize and image_bytes < (self.ysize - 1) * line_stride + self.xsize:
+            raise ValueError(f"Image of {self.ysize} x {self.xsize} pixels does not fit in {image_bytes} bytes")
+        self.sat_image = np.ndarray((self.ysize, self.xsize), dtype=np.uint8, buffer=self._file_map,
+                                    offset=image_offset, strides=(line_stride, 1))
 
         self.obs_time_year = self.obs_time[0]
         self.obs_time_month = self.obs_time[1]
@@ -98,6 +93,21 @@ class AutoSat(object):
         self.obs_time_minute = self.obs_time[4]
         self.obs_time_second = self.obs_time[5]
 
+    def read_image(self, y_slice=slice(None), x_slice=slice(None), step=1):
+        """
+        Reads part of the image into memory, only touching the lines of the file that are needed
+        :param y_slice: lines to read
+        :type y_slice: slice
+        :param x_slice: pixels of each line to read
+        :type x_slice: slice
+        :param step: take every step-th line and pixel within the window, for a decimated image
+        :type step: int
+        :return: pixel values
+        :rtype: np.ndarray
+        """
+        window = self.sat_image[y_slice, x_slice]
+        return np.array(window[::step, ::step])
+
 
 if __name__ == '__main__':
     AutoSat(infile='/Users/brianlo/Desktop/Reading/PhD/WCD/data/eieu502107090100.dat')
@@ -0,0 +1,192 @@
+import timeit
+
+import numpy as np
+import scipy.optimize as so
+
+import constants.thermodynamics as therm_consts
+from radiosonde.calc_moist_adiabat import moist_adiabat_lapse_rate, moist_adiabats, clip_moist_adiabats
+from radiosonde.calc_wetbulb import dewpoint, lcl, mixing_ratio, moist_lapse, saturation_vapor_pressure, \
+    vapor_pressure, wet_bulb_temperature
+from radiosonde.moist_adiabat_table import TABLE_MIN_PRESSURE, TABLE_MAX_PRESSURE, get_moist_adiabat_table
+
+
+def _euler_moist_adiabat(min_temperature, max_pressure, init_pressure, theta_es):
+    """Reference copy of the per-step Euler loop formerly used to draw the moist adiabats."""
+    steps = 1000
+    temps_decreasing = [theta_es]
+    temps_increasing = [theta_es]
+    pressures_decreasing = [init_pressure]
+    pressures_increasing = [init_pressure]
+
+    for temps, pressures, dp in ((temps_decreasing, pressures_decreasing, -1.0),
+                                 (temps_increasing, pressures_increasing, 1.0)):
+        for i in range(steps):
+            dtemperature_by_dpressure = float(moist_adiabat_lapse_rate(pressures[i], temps[i]))
+            dt = dp * dtemperature_by_dpressure
+            if (temps[i] + dt) < min_temperature:
+                dt = min_temperature - temps[i]
+                dp = dt / dtemperature_by_dpressure
+            if (pressures[i] + dp) > max_pressure:
+                dp = max_pressure - pressures[i]
+                dt = dp * dtemperature_by_dpressure
+            temps.append(temps[i] + dt)
+            pressures.append(pressures[i] + dp)
+
+    temps_increasing.reverse()
+    pressures_increasing.reverse()
+    return np.array(pressures_increasing + pressures_decreasing), np.array(temps_increasing + temps_decreasing)
+
+
+def _max_difference(pressures, temperatures, reference_pressures, reference_temperatures, min_pressure=0.0):
+    """Largest temperature difference between two sets of curves, compared at the reference pressures."""
+    worst = 0.0
+    for row_pressures, row_temperatures, ref_pressures, ref_temperatures in zip(
+            pressures, temperatures, reference_pressures, reference_temperatures):
+        finite = np.isfinite(row_pressures)
+        order = np.argsort(row_pressures[finite])
+        inside = (ref_pressures >= max(row_pressures[finite].min(), min_pressure)) & \
+                 (ref_pressures <= row_pressures[finite].max())
+        interpolated = np.interp(np.log(ref_pressures[inside]), np.log(row_pressures[finite][order]),
+                                 row_temperatures[finite][order])
+        worst = max(worst, np.abs(interpolated - ref_temperatures[inside]).max())
+    return worst
+
+
+def _scipy_lcl(pressure, temperature, dew_point, max_iters=50, eps=1e-5):
+    """Reference copy of the scipy.optimize.fixed_point LCL solver formerly in calc_wetbulb."""
+
+    def _lcl_iter(p, p0, w, t):
+        nonlocal nan_mask
+        td = dewpoint(vapor_pressure(p, w)) + therm_consts.CONST_KELVIN
+        p_new = (p0 * (td / t) ** (therm_consts.CONST_CP_AIR / therm_consts.CONST_GAS_CONST_AIR))
+        nan_mask = nan_mask | np.isnan(p_new)
+        return np.where(np.isnan(p_new), p, p_new)
+
+    nan_mask = False
+    w = mixing_ratio(saturation_vapor_pressure(dew_point), pressure)
+    lcl_p = so.fixed_point(_lcl_iter, np.abs(pressure), args=(np.abs(pressure), w, temperature),
+                           xtol=eps, maxiter=max_iters)
+    lcl_p = np.where(nan_mask, np.nan, lcl_p)
+    lcl_p = np.where(np.isclose(lcl_p, np.abs(pressure)), np.abs(pressure), lcl_p)
+    return lcl_p, dewpoint(vapor_pressure(lcl_p, w)) + therm_consts.CONST_KELVIN
+
+
+def benchmark_moist_adiabats(min_temperature=-50, max_pressure=1050, init_pressure=1000,
+                             theta_es_levels=np.arange(-40, 70, 2), repeats=3):
+    """Times the Euler loop against the vectorised Runge-Kutta engine for the tephigram backdrop adiabats."""
+    grid = np.geomspace(1.0, max_pressure, 1000)
+
+    def vectorised(max_step=0.05):
+        temperatures = moist_adiabats(grid, theta_es_levels, reference_pressure=init_pressure, max_step=max_step)
+        return clip_moist_adiabats(grid, temperatures, min_temperature)
+
+    def euler():
+        return [_euler_moist_adiabat(min_temperature, max_pressure, init_pressure, theta_es)
+                for theta_es in theta_es_levels]
+
+    euler_time = min(timeit.repeat(euler, number=1, repeat=repeats))
+    vectorised_time = min(timeit.repeat(vectorised, number=1, repeat=repeats))
+
+    pressures, temperatures = vectorised()
+    converged_pressures, converged_temperatures = vectorised(max_step=1e-3)
+    euler_curves = euler()
+    euler_pressures = [curve[0] for curve in euler_curves]
+    euler_temperatures = [curve[1] for curve in euler_curves]
+    print(f"Moist adiabats ({len(theta_es_levels)} levels)")
+    print(f"  Euler loop:     {euler_time * 1000:8.1f} ms")
+    print(f"  Vectorised RK4: {vectorised_time * 1000:8.1f} ms ({euler_time / vectorised_time:.0f}x faster)")
+    print(f"  max |RK4 - converged|:             "
+          f"{_max_difference(pressures, temperatures, converged_pressures, converged_temperatures):.1e} K")
+    # The 1 hPa Euler steps lose accuracy as the pressure falls, so compare it separately on the plotted range
+    for min_pressure in (500.0, 100.0, 0.0):
+        euler_error = _max_difference(converged_pressures, converged_temperatures,
+                                      euler_pressures, euler_temperatures, min_pressure)
+        difference = _max_difference(pressures, temperatures, euler_pressures, euler_temperatures, min_pressure)
+        print(f"  max |Euler - converged|, p>={min_pressure:5.0f} hPa: {euler_error:.3f} K")
+        print(f"  max |RK4 - Euler|,       p>={min_pressure:5.0f} hPa: {difference:.3f} K")
+
+
+def benchmark_moist_adiabat_table(samples=2000, seed=0):
+    """Times the lookup tables and reports their accuracy against both moist adiabat integrators."""
+    rng = np.random.default_rng(seed)
+    load_time = min(timeit.repeat(get_moist_adiabat_table, number=1, repeat=1))
+    table = get_moist_adiabat_table()
+    print(f"Moist adiabat table (first use {load_time * 1000:.0f} ms)")
+
+    # Adiabats drawn on the diagrams, against a converged Runge-Kutta solution with the same formulation
+    grid = np.geomspace(TABLE_MIN_PRESSURE, TABLE_MAX_PRESSURE, 1000)
+    theta_w = rng.uniform(-40.0, 70.0, 200)
+    converged = moist_adiabats(grid, theta_w, reference_pressure=therm_consts.CONST_P0, max_step=1e-3)
+    lookup_time = min(timeit.repeat(lambda: table.temperature(theta_w[:, np.newaxis], grid), number=1, repeat=3))
+    temperature_error = np.nanmax(np.abs(table.temperature(theta_w[:, np.newaxis], grid) - converged))
+    theta_w_error = np.nanmax(np.abs(table.theta_w(grid, converged) - theta_w[:, np.newaxis]))
+    print(f"  T(theta_w, p) for {converged.size} points: {lookup_time * 1000:6.1f} ms")
+    print(f"  max |T(theta_w, p) - converged|:   {temperature_error:.1e} K")
+    print(f"  max |theta_w(p, T) - converged|:   {theta_w_error:.1e} K")
+
+    # Saturated parcels taken to another level, against the odeint integration used for wet-bulb temperatures
+    bolton_table = get_moist_adiabat_table('bolton')
+    start_pressures = rng.uniform(300.0, TABLE_MAX_PRESSURE, samples)
+    start_temperatures = rng.uniform(-40.0, 30.0, samples)
+    end_pressures = rng.uniform(300.0, TABLE_MAX_PRESSURE, samples)
+
+    def odeint():
+        return np.array([moist_lapse(end_pressure * 100, start_temperature + therm_consts.CONST_KELVIN,
+                                     start_pressure * 100) - therm_consts.CONST_KELVIN
+                         for start_pressure, start_temperature, end_pressure
+                         in zip(start_pressures, start_temperatures, end_pressures)])
+
+    def lookup():
+        return bolton_table.moist_lapse(end_pressures, start_temperatures, start_pressures)
+
+    odeint_time = min(timeit.repeat(odeint, number=1, repeat=1))
+    table_time = min(timeit.repeat(lookup, number=1, repeat=3))
+    print(f"  moist_lapse for {samples} parcels, odeint: {odeint_time * 1000:8.1f} ms")
+    print(f"  moist_lapse for {samples} parcels, table:  {table_time * 1000:8.1f} ms "
+          f"({odeint_time / table_time:.0f}x faster)")
+    print(f"  max |table - odeint|:              {np.nanmax(np.abs(lookup() - odeint())):.1e} K")
+
+
+def benchmark_wet_bulb(levels=3000, seed=0):
+    """Times the wet-bulb methods on a synthetic high resolution sounding, against the per-level odeint method."""
+    rng = np.random.default_rng(seed)
+    pressures = np.linspace(1030.0, 30.0, levels) * 100
+    heights = -7000.0 * np.log(pressures / 101325.0)
+    temperatures = np.maximum(288.15 - 0.0065 * heights, 216.65) + rng.normal(0.0, 1.0, levels)
+    dewpoints = temperatures - rng.uniform(0.1, 25.0, levels)
+
+    print(f"Wet-bulb temperature ({levels} levels)")
+    results = {}
+    for method in ('odeint', 'rk4', 'table'):
+        wet_bulb_temperature(pressures[:2], temperatures[:2], dewpoints[:2], method=method)
+        timings = timeit.repeat(lambda: wet_bulb_temperature(pressures, temperatures, dewpoints, method=method),
+                                number=1, repeat=1 if method == 'odeint' else 3)
+        results[method] = wet_bulb_temperature(pressures, temperatures, dewpoints, method=method)
+        difference = np.nanmax(np.abs(results[method] - results['odeint']))
+        print(f"  {method:6s}: {min(timings) * 1000:8.1f} ms, max |{method} - odeint| = {difference:.1e} K")
+
+
+def benchmark_lcl(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), seed=0):
+    """Reports LCL throughput for growing numbers of parcels, against the scipy fixed point solver."""
+    rng = np.random.default_rng(seed)
+    print("LCL")
+    for size in sizes:
+        pressures = rng.uniform(100.0, 1050.0, size) * 100
+        temperatures = rng.uniform(-70.0, 40.0, size) + therm_consts.CONST_KELVIN
+        dewpoints = temperatures - rng.uniform(0.0, 40.0, size)
+        repeats = 3 if size < 10 ** 6 else 1
+        scipy_time = min(timeit.repeat(lambda: _scipy_lcl(pressures, temperatures, dewpoints),
+                                       number=1, repeat=repeats))
+        vectorised_time = min(timeit.repeat(lambda: lcl(pressures, temperatures, dewpoints),
+                                            number=1, repeat=repeats))
+        difference = np.nanmax(np.abs(lcl(pressures, temperatures, dewpoints)[0]
+                                      - _scipy_lcl(pressures, temperatures, dewpoints)[0]))
+        print(f"  {size:>8d} parcels: scipy {size / scipy_time:10.3g} /s, "
+              f"vectorised {size / vectorised_time:10.3g} /s, max |difference| {difference:.1e} Pa")
+
+
+if __name__ == '__main__':
+    benchmark_moist_adiabats()
+    benchmark_moist_adiabat_table()
+    benchmark_wet_bulb()
+    benchmark_lcl()
@@ -1,43 +1,181 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
-from radiosonde.load_spf import RadiosondeMetDB
+from radiosonde.load_spf import RadiosondeMetDB, iter_metdb_observations
+from radiosonde.prune import prune_profile
 from radiosonde.calc_wetbulb import wet_bulb_temperature
 from plots.radiosonde.tephigram.tephigram_main import Tephigram
 
+WIND_PRESSURES = np.array([1000, 950, 900, 850, 800, 750, 700, 650, 600, 550, 500, 450, 400, 350, 300, 250, 200, 100,
+                           50]) * 100
+
+
+def plot_observation_tephigram(sonde_obj, obs_num, output_dir, figure=None):
+    """
+    Draws and saves the tephigram of one observation in a MetDB Temps file
+    :param sonde_obj: loaded Temps file
+    :type sonde_obj: RadiosondeMetDB
+    :param obs_num: observation number, starting from 1
+    :type obs_num: int
+    :param output_dir: directory the tephigram is saved to
+    :type output_dir: str
+    :param figure: figure to clear and reuse, or None to draw on a new figure
+    :type figure: matplotlib.figure.Figure
+    :return: time in seconds taken by each saved file, keyed by its path
+    :rtype: dict
+    """
+    metadata, sounding = sonde_obj.metadata_list[obs_num - 1], sonde_obj.sounding_list[obs_num - 1]
+    return plot_sounding_tephigram(metadata, sounding, output_dir, figure=figure)
+
+
+def plot_sounding_tephigram(metadata, sounding, output_dir, figure=None):
+    """
+    Draws and saves the tephigram of one observation from its parsed frames
+    :param metadata: metadata of the observation, as read by iter_metdb_observations
+    :type metadata: pandas.DataFrame
+    :param sounding: levels of the observation, as read by iter_metdb_observations
+    :type sounding: pandas.DataFrame
+    :param output_dir: directory the tephigram is saved to
+    :type output_dir: str
+    :param figure: figure to clear and reuse, or None to draw on a new figure
+    :type figure: matplotlib.figure.Figure
+    :return: time in seconds taken by each saved file, keyed by its path
+    :rtype: dict
+    """
+    pressures_temperatures = sounding.dropna(subset=['PnPn', 'TnTnTn'])
+    pressures_temperatures_dews = sounding.dropna(subset=['PnPn', 'TnTnTn', 'DnDn'])
+    pressures_dews = sounding.dropna(subset=['PnPn', 'DnDn'])
+    pressures_winds = sounding.dropna(subset=['PnPn', 'dndn', 'fnfnfn'])
+    pressures_winds = prune_profile(pressures_winds, 'PnPn', WIND_PRESSURES)
+
+    # Calculate Tw
+    wet_bulb = wet_bulb_temperature(pressures_temperatures_dews['PnPn'].values,
+                                    pressures_temperatures_dews['TnTnTn'].values,
+                                    pressures_temperatures_dews['DnDn'].values)
 
-def plot_all_tephigrams(infile='/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_23Z20210726'):
+    tpg = Tephigram(figure=figure)
+
+    tpg.plot_profile(pressures_temperatures['PnPn'] / 100, pressures_temperatures['TnTnTn'] - 273.15,
+                     label='Temperature', color='red', linewidth=0.8)
+    tpg.plot_profile(pressures_dews['PnPn'] / 100, pressures_dews['DnDn'] - 273.15,
+                     label='Dew Point', color='blue', linewidth=0.8)
+    tpg.plot_profile(pressures_temperatures_dews['PnPn'] / 100, wet_bulb - 273.15,
+                     label='Wet Bulb', color='violet', linewidth=0.8)
+    tpg.plot_barbs(pressures_winds['PnPn'] / 100, pressures_winds['fnfnfn'] * 1.94384449,
+                   pressures_winds['dndn'] + 180.0)
+    tpg.plot_main_title(metadata)
+    tpg.read_metadata(metadata)
+    return tpg.save_tephi(output_dir=output_dir)
+
+
+def plot_all_tephigrams(infile='/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_23Z20210726',
+                        output_dir='/Users/brianlo/Desktop/Reading/PhD/WCD/output/tephis/'):
     sonde_obj = RadiosondeMetDB(infile)
     for i in range(sonde_obj.max_observations):
-        metadata, pressures_temperatures = sonde_obj.get_datacols_no_na(i + 1, ['PnPn', 'TnTnTn'])
-        _, pressures_temperatures_dews = sonde_obj.get_datacols_no_na(i + 1, ['PnPn', 'TnTnTn', 'DnDn'])
-        _, pressures_dews = sonde_obj.get_datacols_no_na(i + 1, ['PnPn', 'DnDn'])
-        _, pressures_winds = sonde_obj.get_datacols_no_na(i + 1, ['PnPn', 'dndn', 'fnfnfn'])
-        pressures_winds = sonde_obj.prune_data(
-            np.array(
-                [1000, 950, 900, 850, 800, 750, 700, 650, 600, 550, 500, 450, 400, 350, 300, 250, 200, 100, 50]) * 100,
-            pressures_winds)
-
-        # Calculate Tw
-        wet_bulb = wet_bulb_temperature(pressures_temperatures_dews['PnPn'].values,
-                                        pressures_temperatures_dews['TnTnTn'].values,
-                                        pressures_temperatures_dews['DnDn'].values)
-
-        tpg = Tephigram()
-
-        tpg.plot_profile(pressures_temperatures['PnPn'] / 100, pressures_temperatures['TnTnTn'] - 273.15,
-                         label='Temperature', color='red', linewidth=0.8)
-        tpg.plot_profile(pressures_dews['PnPn'] / 100, pressures_dews['DnDn'] - 273.15,
-                         label='Dew Point', color='blue', linewidth=0.8)
-        tpg.plot_profile(pressures_temperatures['PnPn'] / 100, wet_bulb - 273.15,
-                         label='Wet Bulb', color='violet', linewidth=0.8)
-        tpg.plot_barbs(pressures_winds['PnPn'] / 100, pressures_winds['fnfnfn'] * 1.94384449,
-                       pressures_winds['dndn'] + 180.0)
-        tpg.plot_main_title(metadata)
-        tpg.read_metadata(metadata)
-        tpg.save_tephi(output_dir='/Users/brianlo/Desktop/Reading/PhD/WCD/output/tephis/')
+        plot_observation_tephigram(sonde_obj, i + 1, output_dir)
         plt.close('all')
 
 
+# Figure reused by every tephigram drawn in a batch worker process
+_worker_figure = None
+
+
+def _init_batch_worker():
+    global _worker_figure
+    # Workers only write files, so never start an interactive backend
+    matplotlib.use('Agg')
+    _worker_figure = plt.figure(figsize=(7.8565, 11.1055))
+
+
+def _plot_batch_observation(infile, obs_num, metadata, sounding, output_dir):
+    """Draws one observation in a worker process, returning an entry of the batch manifest."""
+    start = time.perf_counter()
+    outputs, error = {}, None
+    try:
+        outputs = plot_sounding_tephigram(metadata, sounding, output_dir, figure=_worker_figure)
+    except Exception:
+        error = traceback.format_exc()
+    return dict(infile=infile, observation=obs_num, outputs=outputs, seconds=time.perf_counter() - start,
+                error=error)
+
+
+def _batch_error_entry(infile, obs_num):
+    """Builds the manifest entry of an observation whose worker could not draw it, from the current exception."""
+    return dict(infile=infile, observation=obs_num, outputs={}, seconds=0.0, error=traceback.format_exc())
+
+
+def _batch_entry(future, infile, obs_num):
+    """Returns the manifest entry of a submitted observation, recording a worker that died, e.g. when it ran
+    out of memory, as the error of that observation."""
+    try:
+        return future.result()
+    except Exception:
+        return _batch_error_entry(infile, obs_num)
+
+
+def plot_all_tephigrams_parallel(infiles, output_dir='/Users/brianlo/Desktop/Reading/PhD/WCD/output/tephis/',
+                                 max_workers=None, manifest_path=None):
+    """
+    Draws the tephigrams of every observation in several Temps files in a pool of worker processes.
+    Each worker draws on one reused figure with the Agg backend, and the tephigrams are the same as
+    those of plot_all_tephigrams.
+    :param infiles: MetDB Temps files
+    :type infiles: list of str
+    :param output_dir: directory the tephigrams are saved to
+    :type output_dir: str
+    :param max_workers: number of worker processes, defaults to the number of CPUs
+    :type max_workers: int
+    :param manifest_path: JSON file listing the outputs, timings and errors of every observation,
+        defaults to manifest.json in output_dir
+    :type manifest_path: str
+    :return: manifest entries in the order of the observations
+    :rtype: list of dict
+    """
+    manifest_path = os.path.join(output_dir, 'manifest.json') if manifest_path is None else manifest_path
+    max_workers = os.cpu_count() if max_workers is None else max_workers
+    manifest = []
+    # Submitted observations waiting for a worker, with their position in the manifest
+    pending = {}
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker) as executor:
+            # Each file is parsed once here, one observation at a time, and only the observations waiting for
+            # a worker are held in memory
+            order = 0
+            for infile in infiles:
+                for obs_num, (metadata, sounding) in enumerate(iter_metdb_observations(infile), start=1):
+                    if len(pending) >= 2 * max_workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            done_order, done_infile, done_obs_num = pending.pop(future)
+                            manifest.append((done_order, _batch_entry(future, done_infile, done_obs_num)))
+                    try:
+                        future = executor.submit(_plot_batch_observation, infile, obs_num, metadata, sounding,
+                                                 output_dir)
+                    except BrokenProcessPool:
+                        manifest.append((order, _batch_error_entry(infile, obs_num)))
+                    else:
+                        pending[future] = (order, infile, obs_num)
+                    order += 1
+    finally:
+        # The pool has shut down, so the remaining observations have either been drawn or failed, and the
+        # manifest is written even if the batch was stopped
+        for future, (done_order, done_infile, done_obs_num) in pending.items():
+            manifest.append((done_order, _batch_entry(future, done_infile, done_obs_num)))
+        manifest = [entry for _, entry in sorted(manifest, key=lambda order_entry: order_entry[0])]
+        with open(manifest_path, 'w') as f:
+            json.dump(dict(total_seconds=time.perf_counter() - start, tephigrams=manifest), f, indent=2)
+    return manifest
+
+
 if __name__ == '__main__':
     plot_all_tephigrams('/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_05Z20210726')
     plot_all_tephigrams('/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_23Z20210726')
@@ -45,3 +183,9 @@ if __name__ == '__main__':
     plot_all_tephigrams('/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_09Z20210726')
     plot_all_tephigrams('/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_23Z20210101')
     plot_all_tephigrams('/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_11Z20210101')
+    # plot_all_tephigrams_parallel(['/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_05Z20210726',
+    #                               '/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_23Z20210726',
+    #                               '/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_11Z20210726',
+    #                               '/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_09Z20210726',
+    #                               '/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_23Z20210101',
+    #                               '/Users/brianlo/Desktop/Reading/PhD/WCD/data/Temps_11Z20210101'])
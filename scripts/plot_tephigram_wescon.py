@@ -23,7 +23,8 @@ def plot_wescon_tephigram(infile, outpath, outfile=None, theta_w=False):
     if theta_w:
         wet_bulb = wet_bulb_temperature(sonde_data['Pressure'].values * 100,
                                         sonde_data['Temperature'].values + 273.15,
-                                        sonde_data['Dewpoint'].values + 273.15)
+                                        sonde_data['Dewpoint'].values + 273.15,
+                                        method='rk4')
         tpg.plot_profile(sonde_data['Pressure'].values, wet_bulb - 273.15,
                          label='Wet Bulb', color='violet', linewidth=0.8)
 
@@ -1,6 +1,14 @@
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
 import numpy as np
+import matplotlib
 
 from sat.load_autosat import AutoSat
+from um_global.field_cache import FieldCache
 from um_global.ukmo_global_model import UkmoGlobalModel
 from cmaps.thickness import ThicknessCmap, ThicknessBounds
 from cmaps.heights import HeightBounds
@@ -10,11 +18,16 @@ from cmaps.pressure import PressureBounds
 from plots.plot_global_model import GlobalModelPlot
 from plots.plot_sat import SatPlot
 
+OUTPUT_DIRECTORY = '/Users/brianlo/Desktop/Reading/PhD/WCD/output/global/'
 
-def plot1(infile):
-    global_model_obj = UkmoGlobalModel(infile)
-    global_model_obj.read_dataset('geopotential_height', cell_method='', pressure_level=1000)
-    global_model_obj.read_dataset('geopotential_height', cell_method='', pressure_level=500)
+# A chart of the WCD pack: the fields it needs, and a function drawing it from a model object holding them
+WcdChart = namedtuple('WcdChart', ['field_requests', 'render'])
+# Outcome of rendering one chart, with the error traceback if it failed
+ChartResult = namedtuple('ChartResult', ['chart_name', 'lead_time', 'output_path', 'load_seconds',
+                                         'render_seconds', 'error'])
+
+
+def render_thickness(global_model_obj, output_plot_directory, sat_filepath=None):
     global_model_obj.calculate_thickness(500, 1000)
     global_model_obj.convert_units('thickness_1000_500hPa', new_units='dam')
     global_model_obj.convert_units('geopotential_height_500hPa', new_units='km')
@@ -26,14 +39,10 @@ def plot1(infile):
                          contour_field1='geopotential_height_500hPa',
                          contour_field1_levels=HeightBounds.height_bounds,
                          plot_title='1000-500 hPa Thickness (dam), 500 hPa Geopotential Height (km)',
-                         output_plot_directory=
-                         f'/Users/brianlo/Desktop/Reading/PhD/WCD/output/global/thickness_{infile[-18:-3]}.png')
+                         output_plot_directory=output_plot_directory)
 
 
-def plot2(infile):
-    global_model_obj = UkmoGlobalModel(infile)
-    global_model_obj.read_dataset('wet_bulb_potential_temperature', cell_method='', pressure_level=850)
-    global_model_obj.read_dataset('geopotential_height', cell_method='', pressure_level=300)
+def render_wet_bulb(global_model_obj, output_plot_directory, sat_filepath=None):
     global_model_obj.convert_units('geopotential_height_300hPa', new_units='km')
     plot_obj = GlobalModelPlot(global_model_obj)
     plot_obj.plot_fields('wet_bulb_potential_temperature_850hPa', color_field_cmap=TemperatureCmap.temperature_cmap,
@@ -42,19 +51,12 @@ def plot2(infile):
                          contour_field1='geopotential_height_300hPa',
                          contour_field1_levels=HeightBounds.height_bounds,
                          plot_title='850 hPa Wet-bulb Potential Temperature (K), 300 hPa Geopotential Height (km)',
-                         output_plot_directory=
-                         f'/Users/brianlo/Desktop/Reading/PhD/WCD/output/global/wet_bulb_{infile[-18:-3]}.png')
+                         output_plot_directory=output_plot_directory)
 
 
-def plot3(infile):
-    global_model_obj = UkmoGlobalModel(infile)
-    global_model_obj.read_dataset('geopotential_height', cell_method='', pressure_level=1000)
-    global_model_obj.read_dataset('geopotential_height', cell_method='', pressure_level=500)
+def render_rainrate(global_model_obj, output_plot_directory, sat_filepath=None):
     global_model_obj.calculate_thickness(500, 1000)
     global_model_obj.convert_units('thickness_1000_500hPa', new_units='dam')
-    global_model_obj.read_dataset('air_pressure_at_sea_level', cell_method='')
-    global_model_obj.read_dataset('convective_rainfall_flux', cell_method='')
-    global_model_obj.read_dataset('stratiform_rainfall_flux', cell_method='')
     global_model_obj.convert_units('air_pressure_at_sea_level', new_units='hPa')
     global_model_obj.calculate_total_rainfall_rate()
     global_model_obj.convert_units('total_rainfall_rate', new_units='kg m-2 hr-1')
@@ -67,21 +69,184 @@ def plot3(infile):
                          contour_field2='thickness_1000_500hPa',
                          contour_field2_levels=ThicknessBounds.thickness_1000_500_bounds,
                          plot_title='Total Rain Rate (mm/hr), MSLP (hPa), 1000-500 hPa Thickness (dam)',
-                         output_plot_directory=
-                         f'/Users/brianlo/Desktop/Reading/PhD/WCD/output/global/rainrate_{infile[-18:-3]}.png')
+                         output_plot_directory=output_plot_directory)
 
 
-def plot4(infile_sat, infile_model):
-    sat_obj = AutoSat(infile_sat)
-    global_model_obj = UkmoGlobalModel(infile_model)
-    global_model_obj.read_dataset('air_pressure_at_sea_level', cell_method='')
+def render_sat(global_model_obj, output_plot_directory, sat_filepath=None):
+    if sat_filepath is None:
+        raise ValueError("The satellite chart needs an AutoSat file for this lead time")
+    sat_obj = AutoSat(sat_filepath)
     global_model_obj.convert_units('air_pressure_at_sea_level', new_units='hPa')
     plot_obj = SatPlot(sat_obj, global_model_obj)
     plot_obj.plot_fields(contour_field1='air_pressure_at_sea_level',
                          contour_field1_levels=PressureBounds.mslp_bounds,
                          plot_title='MSLP (hPa)',
-                         output_plot_directory=
-                         f'/Users/brianlo/Desktop/Reading/PhD/WCD/output/global/sat_{infile_model[-18:-3]}.png')
+                         output_plot_directory=output_plot_directory)
+
+
+WCD_CHARTS = {
+    'thickness': WcdChart(field_requests=[
+        dict(standard_name='geopotential_height', cell_method='', pressure_level=1000),
+        dict(standard_name='geopotential_height', cell_method='', pressure_level=500)],
+        render=render_thickness),
+    'wet_bulb': WcdChart(field_requests=[
+        dict(standard_name='wet_bulb_potential_temperature', cell_method='', pressure_level=850),
+        dict(standard_name='geopotential_height', cell_method='', pressure_level=300)],
+        render=render_wet_bulb),
+    'rainrate': WcdChart(field_requests=[
+        dict(standard_name='geopotential_height', cell_method='', pressure_level=1000),
+        dict(standard_name='geopotential_height', cell_method='', pressure_level=500),
+        dict(standard_name='air_pressure_at_sea_level', cell_method=''),
+        dict(standard_name='convective_rainfall_flux', cell_method=''),
+        dict(standard_name='stratiform_rainfall_flux', cell_method='')],
+        render=render_rainrate),
+    'sat': WcdChart(field_requests=[
+        dict(standard_name='air_pressure_at_sea_level', cell_method='')],
+        render=render_sat),
+}
+
+
+def _plot_chart(chart_name, infile, output_plot_directory, sat_filepath=None):
+    global_model_obj = UkmoGlobalModel(infile, field_cache=FieldCache())
+    global_model_obj.read_datasets(WCD_CHARTS[chart_name].field_requests)
+    WCD_CHARTS[chart_name].render(global_model_obj, output_plot_directory, sat_filepath)
+
+
+def plot1(infile):
+    _plot_chart('thickness', infile, f'{OUTPUT_DIRECTORY}thickness_{infile[-18:-3]}.png')
+
+
+def plot2(infile):
+    _plot_chart('wet_bulb', infile, f'{OUTPUT_DIRECTORY}wet_bulb_{infile[-18:-3]}.png')
+
+
+def plot3(infile):
+    _plot_chart('rainrate', infile, f'{OUTPUT_DIRECTORY}rainrate_{infile[-18:-3]}.png')
+
+
+def plot4(infile_sat, infile_model):
+    _plot_chart('sat', infile_model, f'{OUTPUT_DIRECTORY}sat_{infile_model[-18:-3]}.png', sat_filepath=infile_sat)
+
+
+def _init_chart_worker():
+    # Workers only write files, so never start an interactive backend
+    matplotlib.use('Agg')
+
+
+def _render_chart_worker(chart_name, infile, iris_cubes, output_plot_directory, sat_filepath):
+    """Draws one chart in a worker process from the cubes of its fields loaded by the parent process."""
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    try:
+        global_model_obj = UkmoGlobalModel(infile)
+        # The cubes arrive as private copies, so unit conversions here do not affect other charts
+        global_model_obj.iris_cubes = iris_cubes
+        WCD_CHARTS[chart_name].render(global_model_obj, output_plot_directory, sat_filepath)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        plt.close('all')
+    return time.perf_counter() - start, error
+
+
+def run_chart_suite(model_filepath_pattern, lead_times, chart_names=tuple(WCD_CHARTS),
+                    output_directory=OUTPUT_DIRECTORY, sat_filepaths=None, max_workers=None,
+                    field_cache=None):
+    """
+    Renders a pack of WCD charts for several lead times of a model run.
+    Each forecast file is read once for all the charts of its lead time, and the charts are drawn in a
+    bounded pool of worker processes while the next lead time is loaded. At most two lead times are held
+    in memory at once, and each chart is sent only the cubes of its own fields.
+    :param model_filepath_pattern: path of the forecast files, formatted with the lead time in hours,
+        e.g. '.../prods_op_gl-mn_20210708_00_{lead_time:03d}.pp'
+    :type model_filepath_pattern: str
+    :param lead_times: forecast lead times in hours
+    :type lead_times: list of int
+    :param chart_names: keys of WCD_CHARTS to draw for every lead time
+    :type chart_names: list of str
+    :param output_directory: directory the charts are saved to
+    :type output_directory: str
+    :param sat_filepaths: AutoSat file to use for the satellite chart at each lead time
+    :type sat_filepaths: dict
+    :param max_workers: number of worker processes, defaults to the number of CPUs up to 4
+    :type max_workers: int
+    :param field_cache: on-disk cache of subsetted fields, defaults to a FieldCache in its default directory
+    :type field_cache: FieldCache
+    :return: the outcome of every chart, in submission order
+    :rtype: list of ChartResult
+    """
+    sat_filepaths = {} if sat_filepaths is None else sat_filepaths
+    max_workers = min(4, os.cpu_count() or 1) if max_workers is None else max_workers
+    field_cache = FieldCache() if field_cache is None else field_cache
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_chart_worker) as executor:
+        submitted = []
+        # Futures of the last two lead times submitted, which hold their cubes until the workers take them
+        older_futures, previous_futures = [], []
+        for lead_time in lead_times:
+            infile = model_filepath_pattern.format(lead_time=lead_time)
+            output_paths = {chart_name: os.path.join(output_directory, f'{chart_name}_{infile[-18:-3]}.png')
+                            for chart_name in chart_names}
+
+            # Wait for the charts of the lead time before last to be drawn, then load the fields
+            # of every chart in one pass, and realise them so workers never reopen the file
+            wait(older_futures)
+            start = time.perf_counter()
+            try:
+                field_requests = []
+                for chart_name in chart_names:
+                    field_requests.extend(fr for fr in WCD_CHARTS[chart_name].field_requests
+                                          if fr not in field_requests)
+                global_model_obj = UkmoGlobalModel(infile, field_cache=field_cache)
+                global_model_obj.read_datasets(field_requests)
+                for cube in global_model_obj.iris_cubes.values():
+                    cube.data
+            except Exception:
+                error = traceback.format_exc()
+                load_seconds = time.perf_counter() - start
+                results.extend(ChartResult(chart_name, lead_time, output_paths[chart_name], load_seconds, 0.0, error)
+                               for chart_name in chart_names)
+                continue
+            load_seconds = time.perf_counter() - start
+
+            lead_time_futures = []
+            for chart_name in chart_names:
+                cube_names = [UkmoGlobalModel.cube_name(**fr) for fr in WCD_CHARTS[chart_name].field_requests]
+                future = executor.submit(_render_chart_worker, chart_name, infile,
+                                         {name: global_model_obj.iris_cubes[name] for name in cube_names},
+                                         output_paths[chart_name], sat_filepaths.get(lead_time))
+                submitted.append((chart_name, lead_time, output_paths[chart_name], load_seconds, future))
+                lead_time_futures.append(future)
+            del global_model_obj
+            older_futures, previous_futures = previous_futures, lead_time_futures
+
+        for chart_name, lead_time, output_path, load_seconds, future in submitted:
+            try:
+                render_seconds, error = future.result()
+            except Exception:
+                # The worker process itself died
+                render_seconds, error = 0.0, traceback.format_exc()
+            results.append(ChartResult(chart_name, lead_time, output_path, load_seconds, render_seconds, error))
+
+    return results
+
+
+def print_chart_suite_report(results):
+    """
+    Prints the time taken by each chart of a suite and the errors of any that failed
+    :param results: outcome of run_chart_suite
+    :type results: list of ChartResult
+    """
+    for result in results:
+        status = 'ok' if result.error is None else 'FAILED'
+        print(f"T+{result.lead_time:03d} {result.chart_name:10s} load {result.load_seconds:7.1f} s, "
+              f"render {result.render_seconds:7.1f} s  {status}  {result.output_path}")
+    for result in results:
+        if result.error is not None:
+            print(f"\nT+{result.lead_time:03d} {result.chart_name} failed:\n{result.error}")
 
 
 if __name__ == '__main__':
@@ -93,3 +258,7 @@ if __name__ == '__main__':
     # plot1(infile='/Users/brianlo/Desktop/Reading/PhD/WCD/data/prods_op_gl-mn_20210708_00_012.pp')
     # plot2(infile='/Users/brianlo/Desktop/Reading/PhD/WCD/data/prods_op_gl-mn_20210708_00_012.pp')
     # plot3(infile='/Users/brianlo/Desktop/Reading/PhD/WCD/data/prods_op_gl-mn_20210708_00_012.pp')
+    # print_chart_suite_report(run_chart_suite(
+    #     '/Users/brianlo/Desktop/Reading/PhD/WCD/data/prods_op_gl-mn_20210708_00_{lead_time:03d}.pp',
+    #     lead_times=[0, 12],
+    #     sat_filepaths={12: '/Users/brianlo/Desktop/Reading/PhD/WCD/data/eieu502107090100.dat'}))
@@ -19,9 +19,7 @@ import thermodynamics as th
 
 import csv
 
-import metpy
-import metpy.calc as mpcalc
-from metpy.units import units
+from radiosonde.calc_parcel import parcel_ascents
 
 
 class named_Tephigram(tephi.Tephigram):
@@ -158,61 +156,56 @@ def get_column(pr, u, v, T, pt, q, top_level, xpos, ypos):
     return grid_index, true_lonlat, Temps, Dews, Winds
 
 def profile_data(Temps, Dews, Winds, tpg):
-   
-    def get_ascent_info():
+
+    def get_ascent_info(ascent):
         strp = ""
-        strp += f"P: {p_parcel:~4.2f}, T: {T_parcel:~3.1f}, TD: {TD_parcel:~3.1f} \n"
-        strp += f"CAPE: {CAPE:~5.2f}, CIN: {CIN:~5.2f} \n"
-        strp += f"LCL P:{lcl_pressure:~5.2f}, T: {lcl_temperature:~3.1f} \n"
-        strp += f"LFC P:{lfc_pressure:~5.2f}, T: {lfc_temperature:~3.1f} \n"
-        strp += f"EL P:{el_pressure:~5.2f}, T: {el_temperature:~3.1f} \n\n"
-        return strp  
-    
-    ptcol_hPa = [ d[0] for d in Temps ] * units.hPa
-    
-    Tcol_C = [ d[1] for d in Temps ] * units.degC
-    
-    TDcol_C = [ d[1] for d in Dews ] * units.degC
-    
+        strp += f"P: {ascent.start_pressure / 100:4.2f} hPa, T: {ascent.start_temperature - 273.15:3.1f} °C, " \
+                f"TD: {ascent.start_dewpoint - 273.15:3.1f} °C \n"
+        strp += f"CAPE: {ascent.cape:5.2f} J / kg, CIN: {ascent.cin:5.2f} J / kg \n"
+        strp += f"LCL P:{ascent.lcl_pressure / 100:5.2f} hPa, T: {ascent.lcl_temperature - 273.15:3.1f} °C \n"
+        strp += f"LFC P:{ascent.lfc_pressure / 100:5.2f} hPa, T: {ascent.lfc_temperature - 273.15:3.1f} °C \n"
+        strp += f"EL P:{ascent.el_pressure / 100:5.2f} hPa, T: {ascent.el_temperature - 273.15:3.1f} °C \n\n"
+        return strp
+
+    def parcel_with_lcl(ascent, index_parcel):
+        # Parcel trace from its starting level upwards, with its LCL added as in parcel_profile_with_lcl
+        p = ptcol_Pa[index_parcel:]
+        Tp = ascent.parcel_temperature[index_parcel:]
+        lcl_index = np.searchsorted(-p, -ascent.lcl_pressure)
+        p = np.insert(p, lcl_index, ascent.lcl_pressure)
+        Tp = np.insert(Tp, lcl_index, ascent.lcl_temperature)
+        return list(zip(p / 100, Tp - 273.15))
+
+    ptcol_Pa = np.array([ d[0] for d in Temps ]) * 100
+
+    Tcol_K = np.array([ d[1] for d in Temps ]) + 273.15
+
+    TDcol_K = np.array([ d[1] for d in Dews ]) + 273.15
+
     surface_plotted = False
-    
-      
-    p_parcel, T_parcel, TD_parcel, index_parcel = mpcalc.most_unstable_parcel(ptcol_hPa, Tcol_C, TDcol_C, depth=600 * units.hPa)
- 
+
+    # Every parcel is lifted once, and its CAPE, CIN, LCL, LFC and EL all come from that one ascent
+    ascents, indices = parcel_ascents(ptcol_Pa, Tcol_K, TDcol_K, most_unstable_depth=60000)
+    index_parcel = indices['most_unstable']
+
     strparcel = ""
     if index_parcel > 2 :
         strparcel += "Most Unstable Parcel\n"
     else :
         strparcel += "Surface and Most Unstable Parcel\n"
-        surface_plotted = True        
-    
-#    print(p_parcel, T_parcel, TD_parcel, index_parcel) 
-    
-    CAPE , CIN = mpcalc.most_unstable_cape_cin(ptcol_hPa, Tcol_C, TDcol_C)
-        
-    lcl_pressure, lcl_temperature = mpcalc.lcl(ptcol_hPa[index_parcel], Tcol_C[index_parcel], TDcol_C[index_parcel])
+        surface_plotted = True
+
+    strparcel += get_ascent_info(ascents['most_unstable'])
+    parcel = parcel_with_lcl(ascents['most_unstable'], index_parcel)
 
-    lfc_pressure, lfc_temperature = mpcalc.lfc(ptcol_hPa[index_parcel:], Tcol_C[index_parcel:], TDcol_C[index_parcel:], which = 'most_cape')
-    el_pressure, el_temperature = mpcalc.el(ptcol_hPa[index_parcel:], Tcol_C[index_parcel:], TDcol_C[index_parcel:], which = 'most_cape')
-    strparcel += get_ascent_info()
-    p, Ta, TDa, Tp = mpcalc.parcel_profile_with_lcl(ptcol_hPa[index_parcel:], Tcol_C[index_parcel:], TDcol_C[index_parcel:])
-    parcel = list(zip(p.to(units.hPa).magnitude, Tp.to(units.degC).magnitude))
-    
 #    print('Plotting parcel:',parcel)
     Tparcel = [tpg.plot(parcel)]
-    
+
     if not surface_plotted:
         strparcel += "Surface Parcel\n"
-        index_parcel = 0
-        CAPE , CIN = mpcalc.surface_based_cape_cin(ptcol_hPa, Tcol_C, TDcol_C)
-        lcl_pressure, lcl_temperature = mpcalc.lcl(ptcol_hPa[index_parcel], Tcol_C[index_parcel], TDcol_C[index_parcel])
+        strparcel += get_ascent_info(ascents['surface_based'])
 
-        lfc_pressure, lfc_temperature = mpcalc.lfc(ptcol_hPa[index_parcel:], Tcol_C[index_parcel:], TDcol_C[index_parcel:])
-        el_pressure, el_temperature = mpcalc.el(ptcol_hPa[index_parcel:], Tcol_C[index_parcel:], TDcol_C[index_parcel:])
-        strparcel += get_ascent_info()
-    
-        p, Ta, TDa, Tp = mpcalc.parcel_profile_with_lcl(ptcol_hPa[index_parcel:], Tcol_C[index_parcel:], TDcol_C[index_parcel:])
-        parcel = list(zip(p.to(units.hPa).magnitude, Tp.to(units.degC).magnitude))
+        parcel = parcel_with_lcl(ascents['surface_based'], indices['surface_based'])
         Tparcel.append(tpg.plot(parcel))
     print(strparcel)
 
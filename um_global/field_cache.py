@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+import warnings
+
+import iris
+
+# Bump when the subsetting in UkmoGlobalModel changes, so that stale fields are not reused
+FIELD_CACHE_VERSION = 1
+FIELD_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache',
+                                     'um_global')
+FIELD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+class FieldCache(object):
+    """
+    On-disk cache of subsetted model fields, stored as one NetCDF file per field.
+    A field is keyed by the source file's path, size and modification time together with the field request,
+    so a rewritten source file is never served from the cache. The least recently used fields are evicted
+    once the cache grows beyond its size limit.
+    """
+
+    def __init__(self, cache_directory=FIELD_CACHE_DIRECTORY, max_bytes=FIELD_CACHE_MAX_BYTES):
+        """
+        :param cache_directory: directory holding the cached fields, created on first use
+        :type cache_directory: str
+        :param max_bytes: size the cache is trimmed to after adding a field
+        :type max_bytes: int
+        """
+        self.cache_directory = cache_directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def field_key(model_filepath, standard_name=None, stash_code=None, cell_method=None, lonlat_bounds=None,
+                  pressure_level=None):
+        """
+        Builds the cache key of a field request on a source file
+        :return: hexadecimal digest naming the cached field
+        :rtype: str
+        """
+        source_stat = os.stat(model_filepath)
+        if lonlat_bounds is not None:
+            lonlat_bounds = tuple(float(bound) for bound in lonlat_bounds)
+        key = repr((FIELD_CACHE_VERSION, os.path.realpath(model_filepath), source_stat.st_size,
+                    source_stat.st_mtime_ns, standard_name, None if stash_code is None else str(stash_code),
+                    cell_method, lonlat_bounds, pressure_level))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_directory, f'{key}.nc')
+
+    def get(self, key):
+        """
+        Loads a cached field, reading its data before returning so that the cube does not depend on a file
+        that a later put, here or in another process sharing the cache, may evict
+        :param key: key from field_key
+        :type key: str
+        :return: the cached cube, or None if the field is not cached
+        :rtype: iris.cube.Cube
+        """
+        path = self._path(key)
+        try:
+            cube = iris.load_cube(path)
+            cube.data
+        except (OSError, ValueError, iris.exceptions.IrisError):
+            return None
+        # Mark the field as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cube
+
+    def put(self, key, cube):
+        """
+        Writes a field to the cache, then evicts the least recently used fields beyond the size limit.
+        Caching is best-effort, so a field that cannot be written is only warned about
+        :param key: key from field_key
+        :type key: str
+        :param cube: subsetted field
+        :type cube: iris.cube.Cube
+        """
+        path = self._path(key)
+        temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp.nc'
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            iris.save(cube, temporary_path)
+            os.replace(temporary_path, path)
+        except Exception as error:
+            warnings.warn(f'Could not cache field to {path}: {error!r}')
+            return
+        finally:
+            if os.path.exists(temporary_path):
+                try:
+                    os.remove(temporary_path)
+                except OSError:
+                    pass
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """
+        Removes the least recently used fields until the cache is no larger than max_bytes
+        :param max_bytes: size limit, defaults to the limit of the cache
+        :type max_bytes: int
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries = []
+            with os.scandir(self.cache_directory) as scanned_entries:
+                for entry in scanned_entries:
+                    if entry.name.endswith('.nc') and not entry.name.endswith('.tmp.nc'):
+                        entry_stat = entry.stat()
+                        entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total_bytes -= size
+
+    def clear(self):
+        """Removes every cached field."""
+        if os.path.isdir(self.cache_directory):
+            self.evict(max_bytes=0)
@@ -3,6 +3,7 @@ import datetime
 import iris
 
 from errors.io import PressureLevelNotFound
+from um_global.field_cache import FieldCache
 
 
 class UkmoGlobalModel(object):
@@ -10,13 +11,16 @@ class UkmoGlobalModel(object):
     This class contains the UKMO Global Model output data
     """
 
-    def __init__(self, model_filepath):
+    def __init__(self, model_filepath, field_cache=None):
         """
         Initialises UkmoGlobalModel object to store relevant data
         :param model_filepath: Filepath to relevant .pp file
         :type model_filepath: str
+        :param field_cache: on-disk cache of subsetted fields shared between runs, or None to always read the .pp file
+        :type field_cache: FieldCache
         """
         self.model_filepath = model_filepath
+        self.field_cache = field_cache
         self.iris_cubes = {}
 
     def print_cube_menu(self, standard_name=None):
@@ -27,19 +31,19 @@ class UkmoGlobalModel(object):
             for sc in selected_cubes:
                 print(sc)
 
-    def read_dataset(self, standard_name=None, stash_code=None, cell_method=None,
-                     lonlat_bounds=(-120, 50, 20, 90),
-                     pressure_level=None):
-
+    @staticmethod
+    def _name_constraint(standard_name=None, stash_code=None):
         # Standard_name or stash_code
         if stash_code is not None:
-            constraint = iris.NameConstraint(STASH=stash_code)
-        else:
-            constraint = iris.NameConstraint(standard_name=standard_name)
+            return iris.NameConstraint(STASH=stash_code)
+        return iris.NameConstraint(standard_name=standard_name)
 
+    @staticmethod
+    def _select_cube(loaded_cubes, constraint, cell_method):
+        """Picks the cube of one field out of the cubes loaded from the file, without touching their data."""
         # Cell Method
         if cell_method is not None:
-            datetime_obj = iris.load(self.model_filepath, constraint)[0].coord('time')
+            datetime_obj = loaded_cubes.extract(constraint)[0].coord('time')
             latest_dt = datetime_obj.points[-1]
             datetime_string = datetime_obj.units.num2date(latest_dt).strftime('%Y-%m-%d (%a) %H:%M:%SZ')
             latest_dt = datetime.datetime.strptime(datetime_string, '%Y-%m-%d (%a) %H:%M:%SZ')
@@ -47,55 +51,110 @@ class UkmoGlobalModel(object):
             datetime_negative = latest_dt - datetime.timedelta(minutes=1)
             constraint = constraint & iris.Constraint(
                 time=lambda cell: datetime_negative <= cell.point < datetime_positive)
-            selected_cubes = iris.load(self.model_filepath, constraint)
-            for idx, sc in enumerate(selected_cubes):
+            for sc in loaded_cubes.extract(constraint):
                 if any(cm.method == cell_method for cm in sc.cell_methods):
-                    iris_loaded_cube = sc
-                    break
+                    return sc
                 elif sc.cell_methods == () and cell_method == '':
-                    iris_loaded_cube = sc
-                    break
+                    return sc
+            raise iris.exceptions.ConstraintMismatchError(f"No cube has the cell method '{cell_method}'")
+
+        try:
+            return loaded_cubes.extract_cube(constraint)
+        except iris.exceptions.ConstraintMismatchError as cme:
+            print(f"You have selected more than one cube! "
+                  f"Here are the available cubes you could further constrain using cell_method...\n")
+            for ic in loaded_cubes.extract(constraint):
+                print(ic)
+            raise cme
 
-        else:
-            try:
-                iris_loaded_cube = iris.load_cubes(self.model_filepath, constraint)
-            except iris.exceptions.ConstraintMismatchError as cme:
-                print(f"You have selected more than one cube! "
-                      f"Here are the available cubes you could further constrain using cell_method...\n")
-                for ic in iris.load(self.model_filepath, constraint):
-                    print(ic)
-                raise cme
-
-        # LonLat selection
-        if lonlat_bounds is not None:
-            iris_loaded_cube = iris_loaded_cube.intersection(
-                longitude=(lonlat_bounds[0], lonlat_bounds[1]), latitude=(lonlat_bounds[2], lonlat_bounds[3]))
-
-        # Pressure level
-        if pressure_level is not None:
-            try:
-                pressure_coords = iris_loaded_cube.coord('pressure')
-            except iris.exceptions.CoordinateNotFoundError as iris_cnfe:
-                print("There is no pressure coordinate in this cube! You cannot use select_pressure_level().")
-                raise iris_cnfe
-
-            constraint = iris.Constraint(pressure=pressure_level)
-            try:
-                if iris_loaded_cube.extract(constraint) is None:
+    def read_dataset(self, standard_name=None, stash_code=None, cell_method=None,
+                     lonlat_bounds=(-120, 50, 20, 90),
+                     pressure_level=None):
+        self.read_datasets([dict(standard_name=standard_name, stash_code=stash_code, cell_method=cell_method,
+                                 lonlat_bounds=lonlat_bounds, pressure_level=pressure_level)])
+
+    def read_datasets(self, field_requests):
+        """
+        Reads several fields from the .pp file in a single pass over the file.
+        The cubes are kept lazy, so only the data of the selected region and level is realised when used.
+        With a field cache, fields already cached for this file are loaded from the cache, and the .pp file
+        is not read at all if every field is cached.
+        :param field_requests: one dictionary per field holding any of the keyword arguments of read_dataset,
+            i.e. standard_name or stash_code, cell_method, lonlat_bounds and pressure_level
+        :type field_requests: list of dict
+        """
+        field_requests = [dict(dict(standard_name=None, stash_code=None, cell_method=None,
+                                    lonlat_bounds=(-120, 50, 20, 90), pressure_level=None), **field_request)
+                          for field_request in field_requests]
+        cache_keys = [None] * len(field_requests)
+        cached_cubes = [None] * len(field_requests)
+        if self.field_cache is not None:
+            cache_keys = [FieldCache.field_key(self.model_filepath, **fr) for fr in field_requests]
+            cached_cubes = [self.field_cache.get(cache_key) for cache_key in cache_keys]
+
+        constraints = [self._name_constraint(fr['standard_name'], fr['stash_code']) for fr in field_requests]
+        missing_constraints = [constraint for constraint, cached_cube in zip(constraints, cached_cubes)
+                               if cached_cube is None]
+        if missing_constraints:
+            loaded_cubes = iris.load(self.model_filepath, missing_constraints)
+
+        for fr, constraint, cache_key, cached_cube in zip(field_requests, constraints, cache_keys, cached_cubes):
+            standard_name, cell_method = fr['standard_name'], fr['cell_method']
+            lonlat_bounds, pressure_level = fr['lonlat_bounds'], fr['pressure_level']
+            if cached_cube is not None:
+                self._store_cube(cached_cube, standard_name, cell_method, pressure_level)
+                continue
+
+            iris_loaded_cube = self._select_cube(loaded_cubes, constraint, cell_method)
+
+            # Pressure level, selected before the region so that the other levels are never subsetted
+            if pressure_level is not None:
+                try:
+                    pressure_coords = iris_loaded_cube.coord('pressure')
+                except iris.exceptions.CoordinateNotFoundError as iris_cnfe:
+                    print("There is no pressure coordinate in this cube! You cannot use select_pressure_level().")
+                    raise iris_cnfe
+
+                level_cube = iris_loaded_cube.extract(iris.Constraint(pressure=pressure_level))
+                if level_cube is None:
+                    print(f"Pressure level {pressure_level}hPa does not exist!")
+                    print(f"Here are the available pressure levels:")
+                    print(f"{pressure_coords}")
                     raise PressureLevelNotFound(f"Pressure level {pressure_level}hPa does not exist!")
-                else:
-                    self.iris_cubes[f"{standard_name}_{pressure_level}hPa"] = iris_loaded_cube.extract(constraint)
-            except PressureLevelNotFound as plnf:
-                print(f"Pressure level {pressure_level}hPa does not exist!")
-                print(f"Here are the available pressure levels:")
-                print(f"{pressure_coords}")
-                raise plnf
+                iris_loaded_cube = level_cube
+
+            # LonLat selection
+            if lonlat_bounds is not None:
+                iris_loaded_cube = iris_loaded_cube.intersection(
+                    longitude=(lonlat_bounds[0], lonlat_bounds[1]), latitude=(lonlat_bounds[2], lonlat_bounds[3]))
 
+            if self.field_cache is not None:
+                self.field_cache.put(cache_key, iris_loaded_cube)
+            self._store_cube(iris_loaded_cube, standard_name, cell_method, pressure_level)
+
+    @staticmethod
+    def cube_name(standard_name=None, cell_method=None, pressure_level=None, **field_request):
+        """
+        Returns the key of iris_cubes that a field is stored under when it is read
+        :param standard_name: standard name of the field
+        :type standard_name: str
+        :param cell_method: cell method of the field
+        :type cell_method: str
+        :param pressure_level: pressure level in hPa of the field
+        :type pressure_level: int
+        :param field_request: any other keyword arguments of read_dataset, which do not affect the key
+        :return: key of the field in iris_cubes
+        :rtype: str
+        """
+        if pressure_level is not None:
+            return f"{standard_name}_{pressure_level}hPa"
+        elif cell_method is None or cell_method == '':
+            return f"{standard_name}"
         else:
-            if cell_method is None or cell_method == '':
-                self.iris_cubes[f"{standard_name}"] = iris_loaded_cube
-            else:
-                self.iris_cubes[f"{standard_name}_{cell_method}"] = iris_loaded_cube
+            return f"{standard_name}_{cell_method}"
+
+    def _store_cube(self, iris_loaded_cube, standard_name, cell_method, pressure_level):
+        self.iris_cubes[self.cube_name(standard_name, cell_method, pressure_level)] = iris_loaded_cube
 
     def convert_units(self, field_name, new_units):
         self.iris_cubes[field_name].convert_units(new_units)